@@ -1,8 +1,10 @@
 # /app.py
 
-from cdx_web_scan import app, db
+from cdx_web_scan import create_app, db
 from cdx_web_scan.models import Scan, ScanSource, IntakeStatus
 
+app = create_app()
+
 @app.shell_context_processor
 def make_shell_context():
     """Create a shell context for the application - 
@@ -0,0 +1 @@
+"""Benchmarks and load tools for CDX Web Scan (run from the repo root, e.g. ``python -m benchmarks.intake_client``)."""
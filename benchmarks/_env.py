@@ -0,0 +1,30 @@
+"""Point the app at a throwaway data folder before ``cdx_web_scan`` is imported.
+
+Benchmark modules import this first, so that ``create_app()`` (which reads
+``APP_MODE`` and the rest of the configuration from the environment) and any
+child processes they start pick these settings up.
+"""
+import os
+import tempfile
+
+DATA_DIR = os.environ.get("CDX_BENCH_DATA_DIR") or tempfile.mkdtemp(prefix="cdx_web_scan_bench_")
+
+os.environ.setdefault("APP_MODE", "config.ProdConfig")
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("APP_SERVER_OS", "Linux")
+os.environ["CDX_WEB_SCAN_FOLDER"] = DATA_DIR
+os.environ["CDX_WEB_SCAN_DB_FILE_NAME"] = "bench.sqlite"
+os.environ["CDX_WEB_SCAN_LOG_FILE"] = os.path.join(DATA_DIR, "bench.log")
+os.environ["ASSET_DIST_DIR"] = os.path.join(DATA_DIR, "static-dist")
+os.environ.setdefault("INTAKE_DISPATCHER_ENABLED", "0")
+
+
+def bench_app():
+    """The app for benchmarks, with its schema created (as ``flask init-db`` would)."""
+    from cdx_web_scan import create_app
+    from cdx_web_scan.schema import create_schema
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+    return app
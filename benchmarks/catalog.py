@@ -0,0 +1,91 @@
+"""Local catalog: bulk import throughput and title lookup latency.
+
+Writes a gzipped CSV of ``--rows`` catalog rows, loads it with
+``import_catalog`` (the ``flask import-catalog`` path) and reports rows/s. Then
+it times single-GTIN lookups, as ``/submit`` does them:
+
+* ``primary_key``: the LRU is off, so every lookup is a primary-key query
+* ``lru_hot``: the same codes again, answered from the per-process LRU
+* ``miss``: codes not in the catalog, the first time they are looked up
+
+    python -m benchmarks.catalog --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import time
+
+from benchmarks._env import DATA_DIR, bench_app
+
+from cdx_web_scan.web_scan import catalog
+from cdx_web_scan.web_scan.gtin import check_digit
+
+
+def _code(n: int) -> str:
+    body = f"{n:012d}"
+    return body + str(check_digit(body))
+
+
+def _write_csv(path: str, rows: int) -> None:
+    with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=1) as f:
+        f.write("barcode,title,artist,label\n")
+        for start in range(0, rows, 10_000):
+            f.write("".join(f"{_code(n)},Album {n},Artist {n % 5000},Label {n % 300}\n" for n in range(start, min(rows, start + 10_000))))
+
+
+def _lookup_us(cat: catalog.Catalog, gtins: list[str]) -> float:
+    samples = []
+    for gtin in gtins:
+        started = time.perf_counter()
+        cat.lookup(gtin)
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1e6, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = bench_app()
+    path = os.path.join(DATA_DIR, "catalog.csv.gz")
+    _write_csv(path, args.rows)
+
+    with app.app_context():
+        started = time.perf_counter()
+        with catalog.open_import(path) as f:
+            seen, stored = catalog.import_catalog(catalog.read_rows(f, "csv"), args.batch_size)
+        import_s = time.perf_counter() - started
+
+        rng = random.Random(1)
+        hits = [_code(rng.randrange(args.rows)).zfill(14) for _ in range(args.lookups)]
+        misses = [_code(args.rows + n).zfill(14) for n in range(args.lookups)]
+        app.config["CATALOG_CACHE_TTL_SECONDS"] = 0
+        uncached = catalog.Catalog(app)
+        app.config["CATALOG_CACHE_TTL_SECONDS"] = 3600
+        cached = catalog.Catalog(app)
+        _lookup_us(cached, hits)  # Fill the LRU.
+        report = {
+            "rows": seen,
+            "stored": stored,
+            "import_seconds": round(import_s, 2),
+            "import_rows_per_sec": round(seen / import_s),
+            "lookup_median_us": {
+                "primary_key": _lookup_us(uncached, hits),
+                "lru_hot": _lookup_us(cached, hits),
+                "miss": _lookup_us(cached, misses),
+            },
+        }
+    os.remove(path)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Endpoint benchmark suite: /submit, /batch, /batch/delete/<code> and /batch/submit.
+
+Boots the app on a throwaway data folder (like ``tests/conftest.py``), points it at
+a local stub intake API and, for each batch size, runs ``--rounds`` fresh
+sessions that:
+
+1. add ``size`` codes with ``POST /submit``
+2. page through the batch with ``GET /batch?page=N``
+3. remove up to ``--deletes`` codes with ``POST /batch/delete/<code>``
+4. submit the rest with ``POST /batch/submit``, then deliver the queued intake
+   calls to the stub (``intake_drain``: one sample per round)
+
+Each (step, batch size) reports throughput, p50/p95/p99 latency and response
+bytes. ``--save`` stores the results as a baseline; ``--baseline`` compares
+against one and exits 1 if any p50/p95 got slower, or throughput dropped, by more
+than ``--tolerance``.
+
+    python -m benchmarks.endpoints --sizes 10 50 200 --save benchmarks/baseline.json
+    python -m benchmarks.endpoints --sizes 10 50 200 --baseline benchmarks/baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks._env import bench_app
+from benchmarks.stub_intake import StubIntakeServer
+from cdx_web_scan.intake.dispatcher import IntakeDispatcher
+from cdx_web_scan.web_scan.gtin import check_digit
+
+app = bench_app()
+
+_next_code = 0
+
+
+def _code() -> str:
+    """A fresh, valid UPC-A for every call, so no scan is a duplicate."""
+    global _next_code
+    _next_code += 1
+    body = f"{_next_code:011d}"
+    return body + str(check_digit(body))
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def _summary(samples: list[tuple[float, int]]) -> dict:
+    seconds = sorted(s for s, _ in samples)
+    total = sum(seconds)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / total, 1) if total else None,
+        "p50_ms": round(_percentile(seconds, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(seconds, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(seconds, 0.99) * 1000, 3),
+        "mean_bytes": round(sum(b for _, b in samples) / len(samples)),
+    }
+
+
+def _timed(samples: list, call) -> object:
+    started = time.perf_counter()
+    response = call()
+    samples.append((time.perf_counter() - started, len(response.get_data())))
+    return response
+
+
+def _round(size: int, deletes: int, samples: dict[str, list], dispatcher: IntakeDispatcher) -> None:
+    client = app.test_client()
+    codes = [_code() for _ in range(size)]
+    for code in codes:
+        _timed(samples["submit"], lambda: client.post("/submit", data={"barcode": code, "source": "scanner"}))
+
+    pages = max(1, -(-size // 5))
+    for page in range(1, min(pages, 50) + 1):
+        _timed(samples["batch_page"], lambda: client.get(f"/batch?page={page}"))
+
+    for code in codes[:min(deletes, size - 1)]:
+        _timed(samples["batch_delete"], lambda: client.post(f"/batch/delete/{code}"))
+
+    _timed(samples["batch_submit"], lambda: client.post("/batch/submit"))
+
+    started = time.perf_counter()
+    sent = 0
+    while (n := dispatcher.dispatch_once(wait_for_sends=True)):
+        sent += n
+    samples["intake_drain"].append((time.perf_counter() - started, sent))
+
+
+def run(sizes: list[int], rounds: int, deletes: int) -> dict[str, dict]:
+    dispatcher = IntakeDispatcher(app)
+    results: dict[str, dict] = {}
+    for size in sizes:
+        samples: dict[str, list] = defaultdict(list)
+        for _ in range(rounds):
+            _round(size, deletes, samples, dispatcher)
+        for step, values in samples.items():
+            summary = _summary(values)
+            if step == "intake_drain":
+                # "bytes" here is the number of intake calls delivered per round.
+                summary["calls"] = summary.pop("mean_bytes")
+            results[f"{step}@{size}"] = summary
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[dict]:
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if base.get(metric) and current[metric] > base[metric] * (1 + tolerance):
+                regressions.append({"case": key, "metric": metric, "baseline": base[metric], "current": current[metric]})
+        if base.get("rps") and current["rps"] and current["rps"] < base["rps"] / (1 + tolerance):
+            regressions.append({"case": key, "metric": "rps", "baseline": base["rps"], "current": current["rps"]})
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--deletes", type=int, default=10, help="Codes deleted per round.")
+    parser.add_argument("--latency-ms", type=float, default=40, help="Stub intake API latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub intake API 503 rate.")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a baseline file.")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a saved baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed slowdown before flagging (0.20 = 20%%).")
+    args = parser.parse_args()
+
+    stub = StubIntakeServer(latency_ms=args.latency_ms, error_rate=args.error_rate).start()
+    app.config["INTAKE_API_URL"] = stub.url
+    try:
+        results = run(args.sizes, args.rounds, args.deletes)
+    finally:
+        stub.stop()
+
+    report = {
+        "config": {"sizes": args.sizes, "rounds": args.rounds, "deletes": args.deletes, "latency_ms": args.latency_ms, "error_rate": args.error_rate},
+        "stub": {"requests": stub.requests, "items": stub.items},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f)["results"], args.tolerance)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Export throughput and peak Python memory per format, at two table sizes.
+
+Flat memory means the peak stays about the same when the row count grows.
+
+    python -m benchmarks.export --rows 20000 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import timedelta
+
+from benchmarks._env import bench_app
+from cdx_web_scan import db
+from cdx_web_scan.models import BarcodeCapture, CaptureMethod, Scan, ScanSource, utcnow
+from cdx_web_scan.web_scan import export
+from cdx_web_scan.web_scan.scan_writer import PendingScan, insert_scans
+
+app = bench_app()
+
+
+def _seed(rows: int) -> None:
+    db.session.execute(BarcodeCapture.__table__.delete())
+    db.session.execute(Scan.__table__.delete())
+    now = utcnow()
+    for start in range(0, rows, 5000):
+        insert_scans([
+            PendingScan(
+                value=f"{n:012d}",
+                symbology="UPC_A",
+                source=ScanSource.scanner,
+                capture_method=CaptureMethod.scanner,
+                created_at=now - timedelta(seconds=rows - n),
+            )
+            for n in range(start, min(rows, start + 5000))
+        ])
+    db.session.commit()
+
+
+def _measure(fmt: str, gzip: bool, chunk_size: int) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+    for data in export.export_stream("scans", fmt, gzip=gzip, chunk_size=chunk_size):
+        size += len(data)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "bytes": size, "peak_mib": round(peak / 2**20, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    formats = [("csv", False), ("csv", True), ("ndjson", False)] + ([("parquet", False)] if export.pq is not None else [])
+    results = []
+    with app.app_context():
+        for rows in args.rows:
+            _seed(rows)
+            for fmt, gzip in formats:
+                result = _measure(fmt, gzip, args.chunk_size)
+                results.append({"rows": rows, "format": fmt + (".gz" if gzip else ""), "rows_per_sec": round(rows / result["seconds"]), **result})
+    print(json.dumps({"chunk_size": args.chunk_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""GTIN validation throughput: scalar ``parse_gtin`` loop vs. batched ``parse_many``.
+
+``parse_many`` checks all the digits as one NumPy matrix when NumPy is installed
+(``pip install .[fast]``); without it, the batched row falls back to the scalar path.
+
+    python -m benchmarks.gtin --codes 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import _env  # noqa: F401  (must precede cdx_web_scan imports)
+from cdx_web_scan.web_scan import gtin
+
+
+def _codes(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    codes = []
+    for _ in range(count):
+        length = rng.choice((8, 12, 12, 12, 13, 13, 14))
+        body = "".join(rng.choice("0123456789") for _ in range(length - 1))
+        # ~2% misreads, like a wedge scanner on worn labels.
+        check = gtin.check_digit(body) if rng.random() > 0.02 else rng.randrange(10)
+        codes.append(body + str(check))
+    return codes
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--codes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    codes = _codes(args.codes, args.seed)
+    runs = {
+        "scalar": lambda: [gtin.parse_gtin(c) for c in codes],
+        "batched": lambda: gtin.parse_many(codes),
+    }
+    results = []
+    for mode, fn in runs.items():
+        elapsed = _time(fn, args.repeat)
+        results.append({"mode": mode, "codes": len(codes), "codes_per_sec": round(len(codes) / elapsed), "us_per_code": round(elapsed / len(codes) * 1e6, 3)})
+    print(json.dumps({"numpy": gtin.np is not None, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Per-request latency: one-shot urllib (``post_json``) vs. pooled ``IntakeClient``.
+
+Both paths POST the same batch payload to a local stub intake server. With
+``--tls-cert/--tls-key`` the stub speaks HTTPS, which is where skipping the
+handshake on warm connections matters most.
+
+    python -m benchmarks.intake_client --requests 300 --items 50
+    python -m benchmarks.intake_client --tls-cert cert.pem --tls-key key.pem
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import ssl
+import statistics
+import time
+import urllib.request
+
+from benchmarks import _env  # noqa: F401  (must precede cdx_web_scan imports)
+from benchmarks.stub_intake import StubIntakeServer
+from cdx_web_scan.intake.client import IntakeClient, post_json
+
+
+def _payload(items: int) -> dict:
+    rows = [
+        {"code": f"{n:012d}", "source": "wedge", "captured_at": "2026-01-01T00:00:00+00:00", "title": None, "format": "UPC"}
+        for n in range(items)
+    ]
+    return {"source": "cdx-web-scan", "barcodes": [r["code"] for r in rows], "items": rows}
+
+
+def _summary(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {
+        "requests": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def _run(label: str, server: StubIntakeServer, send, requests: int) -> dict:
+    before = server.connections
+    samples: list[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        resp = send()
+        samples.append((time.perf_counter() - started) * 1000)
+        if not resp.ok:
+            raise SystemExit(f"{label}: unexpected HTTP {resp.status}: {resp.body}")
+    return {"client": label, **_summary(samples), "connections_opened": server.connections - before}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--items", type=int, default=25, help="batch items per request body")
+    parser.add_argument("--latency-ms", type=float, default=0, help="stub server think time")
+    parser.add_argument("--gzip", action="store_true", help="gzip pooled request bodies (INTAKE_GZIP_REQUESTS)")
+    parser.add_argument("--tls-cert")
+    parser.add_argument("--tls-key")
+    args = parser.parse_args()
+
+    server = StubIntakeServer(latency_ms=args.latency_ms)
+    ssl_context = None
+    if args.tls_cert and args.tls_key:
+        server.use_tls(args.tls_cert, args.tls_key)
+        # Self-signed stub certificate: skip verification on both paths equally.
+        ssl_context = ssl._create_unverified_context()
+        urllib.request.install_opener(urllib.request.build_opener(urllib.request.HTTPSHandler(context=ssl_context)))
+    server.start()
+
+    payload = _payload(args.items)
+    url = server.url
+    pooled = IntakeClient(pool_size=1, gzip_requests=args.gzip, ssl_context=ssl_context)
+    try:
+        results = [
+            _run("urllib", server, lambda: post_json(url, payload), args.requests),
+            _run("pooled", server, lambda: pooled.post_json(url, payload), args.requests),
+        ]
+    finally:
+        pooled.close()
+        server.stop()
+
+    print(json.dumps({"url": url, "items_per_request": args.items, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Multi-operator load test against a real gunicorn deployment.
+
+Launches gunicorn (``--workers``/``--threads``, gthread, as in the Dockerfile) on
+a throwaway data folder plus the local stub intake API, then steps through
+``--operators`` levels. At each level it runs for ``--duration`` seconds with:
+
+- N operators, each with its own cookie session and keep-alive connection,
+  scanning with wedge-like gaps (gamma-distributed around ``--scan-interval``)
+  and submitting the batch every ``--batch-size`` scans
+- ``--log-viewers`` clients polling ``/get-log?since=<offset>``
+
+Each level reports offered vs. achieved scans/s, /submit and /batch/submit
+latency, HTTP errors and "database is locked" errors. Those come from the
+``/metrics`` counter and the app log, so errors that never reach a client are
+counted too. The first level that misses ``--slo-ms`` at p95, achieves less
+than 90% of the offered rate or has over 1% errors is reported as saturated.
+
+    python -m benchmarks.load_operators --operators 1 2 4 8 16 32 --duration 30
+    python -m benchmarks.load_operators --url http://127.0.0.1:8000   # existing server
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.stub_intake import StubIntakeServer
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+_codes = itertools.count(1)
+_codes_lock = threading.Lock()
+
+
+def _next_code() -> str:
+    with _codes_lock:
+        body = f"{next(_codes) + 500_000_000:011d}"
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+class Client:
+    """One browser: a keep-alive connection and its cookies."""
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.cookies = SimpleCookie()
+        self._conn: http.client.HTTPConnection | None = None
+
+    def request(self, method: str, path: str, form: dict | None = None, headers: dict | None = None):
+        body = urlencode(form).encode() if form is not None else None
+        send = {"HX-Request": "true", **(headers or {})}
+        if body is not None:
+            send["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            send["Cookie"] = "; ".join(f"{k}={m.value}" for k, m in self.cookies.items())
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=send)
+                resp = self._conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Server closed an idle keep-alive connection; reconnect once.
+                self._conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            self.cookies.load(header)
+        return resp.status, resp.headers, data
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, kind: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.latency.setdefault(kind, []).append(seconds)
+            if not ok:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def timed(self, kind: str, client: Client, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, headers, data = client.request(*args, **kwargs)
+        except OSError:
+            self.record(kind, time.perf_counter() - started, False)
+            return None
+        # /submit answers 200 with an error fragment for rejected codes.
+        ok = status < 400 and b"result-error" not in data
+        self.record(kind, time.perf_counter() - started, ok)
+        return status, headers, data
+
+
+def _operator(base_url: str, stop: threading.Event, stats: Stats, interval: float, batch_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+    client = Client(base_url)
+    scans = 0
+    try:
+        # Stagger start-up so operators don't scan in lockstep.
+        stop.wait(rng.uniform(0, interval))
+        while not stop.is_set():
+            stats.timed("submit", client, "POST", "/submit", {"barcode": _next_code(), "source": "scanner"})
+            scans += 1
+            if scans % batch_size == 0:
+                stats.timed("batch_submit", client, "POST", "/batch/submit", {})
+            # Wedge scans: a steady rhythm with some spread (gamma, shape 4).
+            stop.wait(rng.gammavariate(4, interval / 4))
+    finally:
+        client.close()
+
+
+def _log_viewer(base_url: str, stop: threading.Event, stats: Stats, poll: float) -> None:
+    client = Client(base_url)
+    offset = None
+    try:
+        while not stop.is_set():
+            path = "/get-log" if offset is None else f"/get-log?since={offset}"
+            result = stats.timed("get_log", client, "GET", path)
+            if result is not None and result[1].get("X-Log-Offset"):
+                offset = int(result[1]["X-Log-Offset"])
+            stop.wait(poll)
+    finally:
+        client.close()
+
+
+def _locked_from_metrics(base_url: str) -> int | None:
+    try:
+        status, _, data = Client(base_url).request("GET", "/metrics")
+    except OSError:
+        return None
+    if status != 200:
+        return None
+    match = re.search(rb"^cdx_db_locked_errors_total (\d+)", data, re.M)
+    return int(match.group(1)) if match else 0
+
+
+def _locked_in_log(log_file: Path | None) -> int | None:
+    if log_file is None or not log_file.exists():
+        return None
+    with open(log_file, "rb") as f:
+        return sum(line.count(b"database is locked") for line in f)
+
+
+def _pct(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+
+def run_level(base_url: str, operators: int, args, log_file: Path | None) -> dict:
+    stats = Stats()
+    stop = threading.Event()
+    locked_before = (_locked_from_metrics(base_url), _locked_in_log(log_file))
+    threads = [
+        threading.Thread(target=_operator, args=(base_url, stop, stats, args.scan_interval, args.batch_size, args.seed + i), daemon=True)
+        for i in range(operators)
+    ] + [
+        threading.Thread(target=_log_viewer, args=(base_url, stop, stats, args.log_poll), daemon=True)
+        for _ in range(args.log_viewers)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    stop.wait(args.duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=60)
+    elapsed = time.perf_counter() - started
+    # Let dispatchers and log writes catch up before reading the counters.
+    time.sleep(args.settle)
+    locked_after = (_locked_from_metrics(base_url), _locked_in_log(log_file))
+
+    submits = stats.latency.get("submit", [])
+    requests = sum(len(v) for v in stats.latency.values())
+    errors = sum(stats.errors.values())
+    offered = operators / args.scan_interval
+    achieved = len(submits) / elapsed
+    level = {
+        "operators": operators,
+        "offered_scans_per_sec": round(offered, 2),
+        "achieved_scans_per_sec": round(achieved, 2),
+        "latency_ms": {
+            kind: {"count": len(v), "p50": _pct(v, 0.50), "p95": _pct(v, 0.95), "p99": _pct(v, 0.99)}
+            for kind, v in sorted(stats.latency.items())
+        },
+        "errors": dict(sorted(stats.errors.items())),
+        "error_rate": round(errors / requests, 4) if requests else 0,
+        "database_locked": {
+            "metrics": None if None in (locked_before[0], locked_after[0]) else locked_after[0] - locked_before[0],
+            "log": None if None in (locked_before[1], locked_after[1]) else locked_after[1] - locked_before[1],
+        },
+    }
+    p95 = _pct(submits, 0.95)
+    level["saturated"] = bool(
+        (p95 is not None and p95 > args.slo_ms) or achieved < 0.9 * offered or level["error_rate"] > 0.01
+    )
+    return level
+
+
+def _launch(args, data_dir: Path, intake_url: str) -> tuple[subprocess.Popen, str, Path]:
+    gunicorn = shutil.which("gunicorn")
+    if gunicorn is None:
+        sys.exit("gunicorn is not installed (pip install gunicorn), or pass --url")
+    log_file = data_dir / "cdx_web_scan.log"
+    env = {
+        **os.environ,
+        "APP_MODE": "config.ProdConfig",
+        "SECRET_KEY": "load-test-secret-key",
+        "APP_SERVER_OS": "Linux",
+        "CDX_WEB_SCAN_FOLDER": str(data_dir),
+        "CDX_WEB_SCAN_DB_FILE_NAME": "load.sqlite",
+        "CDX_WEB_SCAN_LOG_FILE": str(log_file),
+        "ASSET_DIST_DIR": str(data_dir / "static-dist"),
+        "METRICS_DIR": str(data_dir / "metrics"),
+        "METRICS_FLUSH_SECONDS": "1",
+        "INTAKE_API_URL": intake_url,
+    }
+    # Create the schema once up front, as the Docker image does.
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "init-db"], cwd=PROJECT_ROOT, env=env, check=True, capture_output=True)
+    bind = f"127.0.0.1:{args.port}"
+    proc = subprocess.Popen(
+        [gunicorn, "--bind", bind, "--workers", str(args.workers), "--threads", str(args.threads),
+         "--worker-class", "gthread", "--timeout", "60", "--preload", "cdx_web_scan:create_app()"],
+        cwd=PROJECT_ROOT, env=env,
+        stdout=open(data_dir / "gunicorn.out", "wb"), stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://{bind}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"gunicorn exited early; see {data_dir / 'gunicorn.out'}")
+        try:
+            if Client(base_url, timeout=2).request("GET", "/")[0] == 200:
+                return proc, base_url, log_file
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    sys.exit("gunicorn did not come up within 30s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operators", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level.")
+    parser.add_argument("--scan-interval", type=float, default=2.5, help="Mean seconds between one operator's scans.")
+    parser.add_argument("--batch-size", type=int, default=25, help="Scans per batch submit.")
+    parser.add_argument("--log-viewers", type=int, default=1)
+    parser.add_argument("--log-poll", type=float, default=2)
+    parser.add_argument("--slo-ms", type=float, default=500, help="/submit p95 budget.")
+    parser.add_argument("--settle", type=float, default=2, help="Seconds to wait after a level before reading counters.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="Target an already running server instead of launching gunicorn.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=150, help="Stub intake API latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub intake API 503 rate.")
+    args = parser.parse_args()
+
+    stub = proc = None
+    data_dir = None
+    log_file = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            stub = StubIntakeServer(latency_ms=args.latency_ms, error_rate=args.error_rate).start()
+            data_dir = Path(tempfile.mkdtemp(prefix="cdx_web_scan_load_"))
+            proc, base_url, log_file = _launch(args, data_dir, stub.url)
+
+        levels = []
+        for operators in args.operators:
+            level = run_level(base_url, operators, args, log_file)
+            levels.append(level)
+            print(json.dumps(level), file=sys.stderr)
+        first_saturated = next((lv["operators"] for lv in levels if lv["saturated"]), None)
+        sustainable = [lv["operators"] for lv in levels if not lv["saturated"]]
+        print(json.dumps({
+            "target": base_url,
+            "server": None if args.url else {"workers": args.workers, "threads": args.threads, "data_dir": str(data_dir)},
+            "stub": None if stub is None else {"latency_ms": args.latency_ms, "error_rate": args.error_rate, "requests": stub.requests},
+            "max_sustained_operators": max((n for n in sustainable if first_saturated is None or n < first_saturated), default=None),
+            "first_saturated_at": first_saturated,
+            "curve": levels,
+        }, indent=2))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if stub is not None:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
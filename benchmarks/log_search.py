@@ -0,0 +1,120 @@
+"""Log search: indexed, memory-mapped queries against a full read of the file.
+
+Writes a synthetic text log of ``--mb`` megabytes (one record per 10 ms, with
+IP prefixes and the odd traceback), then times each query three ways:
+
+* ``full_scan``: read every line and test it, as ``grep`` on the host would
+* ``indexed_cold``: ``log_search.search`` with a new index, so it includes
+  building the sparse index
+* ``indexed_warm``: the same query again, with the index already built
+
+The queries are a one-minute time window in the middle of the file, a barcode
+that occurs once, and errors from one client IP in that window.
+
+    python -m benchmarks.log_search --mb 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import _env
+
+from cdx_web_scan import log_search
+
+START = datetime(2026, 10, 1)
+
+
+def _write_log(path: str, megabytes: int) -> int:
+    records = 0
+    size = megabytes * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        while f.tell() < size:
+            chunk = []
+            for n in range(records, records + 10000):
+                stamp = START + timedelta(milliseconds=10 * n)
+                level = "ERROR" if n % 997 == 0 else "INFO"
+                chunk.append(
+                    f"{stamp:%Y-%m-%d %H:%M:%S},{stamp.microsecond // 1000:03d} {level} : "
+                    f"[IP: 10.0.{n % 5}.{n % 11}] POST /submit barcode={n:013d} -> 200\n"
+                )
+                if level == "ERROR":
+                    chunk.append("Traceback (most recent call last):\n  ValueError: intake rejected\n")
+            f.write("".join(chunk))
+            records += 10000
+    return records
+
+
+def _full_scan(path: str, since: str | None, until: str | None, level: str | None, ip: str | None, text: str | None) -> int:
+    head = re.compile(r"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) ([A-Z]+) : (?:\[IP: ([^\]]*)\] )?")
+    hits = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            m = head.match(line)
+            if m is None:
+                continue
+            # The text timestamps sort as strings, so no need to parse them.
+            if since and m.group(1) < since or until and m.group(1) >= until:
+                continue
+            if level and m.group(3) != level or ip and m.group(4) != ip or text and text not in line:
+                continue
+            hits += 1
+    return hits
+
+
+def _timed(fn, repeat: int) -> tuple[float, object]:
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=200, help="Size of the synthetic log.")
+    parser.add_argument("--stride", type=int, default=64 * 1024, help="Index stride (LOG_SEARCH_INDEX_STRIDE).")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(_env.DATA_DIR, "search.log")
+    records = _write_log(path, args.mb)
+    middle = (START + timedelta(milliseconds=5 * records)).timestamp()
+    queries = {
+        "time_window": {"since": middle, "until": middle + 60},
+        "barcode": {"text": f"{records // 3:013d}"},
+        "ip_errors_in_window": {"since": middle, "until": middle + 600, "level": "ERROR", "ip": "10.0.2.6"},
+    }
+
+    report = {}
+    for name, q in queries.items():
+        kwargs = {
+            "since": q.get("since"), "until": q.get("until"), "client_ip": q.get("ip"), "text": q.get("text"),
+            "levels": {q["level"]} if q.get("level") else None, "limit": 100000,
+        }
+        since, until = (f"{datetime.fromtimestamp(q[k]):%Y-%m-%d %H:%M:%S}" if k in q else None for k in ("since", "until"))
+        full_ms, full_hits = _timed(lambda: _full_scan(path, since, until, q.get("level"), q.get("ip"), q.get("text")), 1)
+        cold_ms, _ = _timed(lambda: log_search.search([path], log_search.LogIndex(args.stride), **kwargs), args.repeat)
+        index = log_search.LogIndex(args.stride)
+        log_search.search([path], index, **kwargs)
+        warm_ms, result = _timed(lambda: log_search.search([path], index, **kwargs), args.repeat)
+        report[name] = {
+            "hits": len(result["results"]),
+            "full_scan_hits": full_hits,
+            "full_scan_ms": full_ms,
+            "indexed_cold_ms": cold_ms,
+            "indexed_warm_ms": warm_ms,
+            "scanned_bytes": result["scanned_bytes"],
+        }
+    print(json.dumps({"mb": args.mb, "records": records, "stride": args.stride, "queries": report}, indent=2))
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Cost of application logging on POST /submit.
+
+Runs the same /submit loop in fresh processes, with one log line per request
+(``LOG_REQUESTS=1``), under each setup:
+
+* ``off``: no per-request line (the baseline)
+* ``inline_text``: the request thread writes to the file itself (``LOG_QUEUE=0``)
+* ``queued_text``: the line is handed to the logging thread (the default)
+* ``queued_json``: the same, with ``LOG_FORMAT=json``
+
+It reports /submit latency per mode and its overhead against ``off``. The
+end-to-end numbers are noisy, because /submit's own SQLite commit dominates. So
+each mode also reports ``log_call_us``: the median time one ``app.logger.info``
+call keeps the request thread busy, inside a request context. ``--fsync`` makes
+the file handler fsync every record, which stands in for a slow or busy disk.
+
+    python -m benchmarks.logging_overhead --requests 2000
+    python -m benchmarks.logging_overhead --requests 500 --fsync
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = {
+    "off": {"LOG_REQUESTS": "0"},
+    "inline_text": {"LOG_REQUESTS": "1", "LOG_QUEUE": "0"},
+    "queued_text": {"LOG_REQUESTS": "1", "LOG_QUEUE": "1"},
+    "queued_json": {"LOG_REQUESTS": "1", "LOG_QUEUE": "1", "LOG_FORMAT": "json"},
+}
+
+
+def _child(requests: int, fsync: bool) -> dict:
+    from benchmarks._env import bench_app
+
+    app = bench_app()
+    if fsync:
+        from cdx_web_scan.log_setup import SharedRotatingFileHandler
+
+        def _flush_and_sync(self, _flush=SharedRotatingFileHandler.flush):
+            _flush(self)
+            if self.stream is not None:
+                os.fsync(self.stream.fileno())
+
+        SharedRotatingFileHandler.flush = _flush_and_sync
+
+    client = app.test_client()
+    client.get("/batch")  # warm-up: session cookie, first-request hooks
+    samples = []
+    for n in range(requests):
+        started = time.perf_counter()
+        client.post("/submit", data={"barcode": "036000291452", "source": "manual"})
+        samples.append(time.perf_counter() - started)
+        if n % 100 == 99:
+            client.post("/batch/clear")
+    from cdx_web_scan import log_setup
+
+    calls = []
+    with app.test_request_context("/submit", method="POST", headers={"X-Forwarded-For": "203.0.113.9"}):
+        for n in range(requests):
+            started = time.perf_counter()
+            app.logger.info(log_setup.log_message(f"POST /submit -> 200 ({n})"))
+            calls.append(time.perf_counter() - started)
+    log_setup.flush()
+    return {
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(statistics.median(samples) * 1e6, 1),
+        "p99_us": round(sorted(samples)[int(0.99 * len(samples))] * 1e6, 1),
+        "log_call_us": round(statistics.median(calls) * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--fsync", action="store_true", help="fsync the log file after every record.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.requests, args.fsync)))
+        return
+
+    runs = {}
+    for mode, env in MODES.items():
+        command = [sys.executable, "-m", "benchmarks.logging_overhead", "--child", "--requests", str(args.requests)]
+        if args.fsync:
+            command.append("--fsync")
+        out = subprocess.run(command, env={**os.environ, **env}, check=True, capture_output=True, text=True).stdout
+        runs[mode] = json.loads(out.strip().splitlines()[-1])
+
+    overhead = {mode: round(runs[mode]["p50_us"] - runs["off"]["p50_us"], 1) for mode in runs if mode != "off"}
+    print(json.dumps({"requests": args.requests, "fsync": args.fsync, "runs": runs, "overhead_p50_us": overhead}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cost of the /metrics instrumentation on the request hot path.
+
+Runs the same request mix in two fresh processes, with METRICS_ENABLED=1 and =0,
+and reports per-request latency for each plus the raw cost of one histogram
+observation.
+
+    python -m benchmarks.metrics_overhead --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _child(requests: int) -> dict:
+    from benchmarks._env import bench_app
+
+    app = bench_app()
+    client = app.test_client()
+    client.get("/batch")  # warm-up: session cookie, first-request hooks
+    samples = {"GET /batch": [], "POST /submit": []}
+    for n in range(requests):
+        started = time.perf_counter()
+        client.get("/batch")
+        samples["GET /batch"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        client.post("/submit", data={"barcode": "036000291452", "source": "manual"})
+        samples["POST /submit"].append(time.perf_counter() - started)
+        if n % 100 == 99:
+            client.post("/batch/clear")
+    return {
+        route: {"mean_us": round(statistics.fmean(s) * 1e6, 1), "p50_us": round(statistics.median(s) * 1e6, 1)}
+        for route, s in samples.items()
+    }
+
+
+def _observe_ns(iterations: int) -> float:
+    from benchmarks import _env  # noqa: F401
+    from cdx_web_scan.metrics import HTTP_DURATION
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        HTTP_DURATION.observe(0.003, "GET", "/bench", "200")
+    return round((time.perf_counter() - started) / iterations * 1e9, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.requests)))
+        return
+
+    runs = {}
+    for enabled in ("0", "1"):
+        env = {**os.environ, "METRICS_ENABLED": enabled}
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.metrics_overhead", "--child", "--requests", str(args.requests)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        runs["on" if enabled == "1" else "off"] = json.loads(out.strip().splitlines()[-1])
+
+    overhead = {
+        route: round(runs["on"][route]["mean_us"] - runs["off"][route]["mean_us"], 1) for route in runs["on"]
+    }
+    print(json.dumps({"requests": args.requests, "runs": runs, "overhead_mean_us": overhead, "observe_ns": _observe_ns(200_000)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Scan full-text search latency: FTS5 ``/search`` queries vs. ``LIKE '%...%'``.
+
+Seeds ``--rows`` scans (most untitled, the rest with titles drawn from a small
+vocabulary plus a unique catalogue number), then reports:
+
+* ``seed_rows_per_sec``: insert rate with the sync triggers on
+* ``backfill_seconds``: rebuilding the index with ``backfill_scan_search``
+* per query, the median ``search_scans`` latency (20 results, with snippets
+  and barcodes) and one ``LIKE`` scan over ``scan.notes`` for comparison
+
+    python -m benchmarks.scan_search --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select, text
+
+from benchmarks._env import bench_app
+from cdx_web_scan import db
+from cdx_web_scan.models import CaptureMethod, Scan, ScanSource, utcnow
+from cdx_web_scan.web_scan.scan_search import backfill_scan_search, search_scans
+from cdx_web_scan.web_scan.scan_writer import PendingScan, insert_scans
+
+WORDS = (
+    "abbey road blue train kind of blue remain in light nevermind ok computer dark side moon "
+    "harvest rumours thriller revolver pet sounds horses marquee moon unknown pleasures live deluxe "
+    "remaster edition box set disc japan import promo sticker sealed cracked case"
+).split()
+
+QUERIES = {
+    "unique": "CAT-4242",
+    "rare_word": "marquee",
+    "common_word": "blue",
+    "two_char_prefix": "re",
+    "two_words": "blue train",
+}
+
+
+def _seed(rows: int) -> float:
+    db.session.execute(text("DELETE FROM scan"))
+    db.session.commit()
+    rng = random.Random(1)
+    now = utcnow()
+    started = time.perf_counter()
+    for start in range(0, rows, 5000):
+        pending = []
+        for n in range(start, min(rows, start + 5000)):
+            notes = " -- UNTITLED -- "
+            if rng.random() < 0.3:
+                notes = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))) + f" CAT-{n}"
+            pending.append(
+                PendingScan(
+                    value=f"{n:012d}",
+                    symbology="UPC_A",
+                    source=ScanSource.scanner,
+                    capture_method=CaptureMethod.scanner,
+                    notes=notes,
+                    created_at=now - timedelta(seconds=rows - n),
+                )
+            )
+        insert_scans(pending)
+        db.session.commit()
+    return time.perf_counter() - started
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = bench_app()
+    with app.app_context():
+        seed_s = _seed(args.rows)
+        db.session.execute(text("DELETE FROM scan_search"))
+        db.session.commit()
+        started = time.perf_counter()
+        backfill_scan_search()
+        backfill_s = time.perf_counter() - started
+
+        queries = {}
+        for name, query in QUERIES.items():
+            like = select(func.count()).select_from(Scan).where(Scan.notes.like(f"%{query}%"))
+            queries[name] = {
+                "query": query,
+                "results": len(search_scans(query)),
+                "fts_ms": _median_ms(lambda: search_scans(query), args.repeat),
+                "like_ms": _median_ms(lambda: db.session.execute(like).scalar(), 1),
+            }
+    print(json.dumps({
+        "rows": args.rows,
+        "seed_rows_per_sec": round(args.rows / seed_s),
+        "backfill_seconds": round(backfill_s, 2),
+        "queries": queries,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Scan persistence throughput: legacy per-scan ORM commit vs. direct vs. write-behind.
+
+- ``legacy``: what ``/submit`` did before (add, flush, add barcode, post_update, commit)
+- ``direct``: client-side ids, two INSERTs, one commit per scan
+- ``write-behind``: queue to the group-commit writer thread; flush at the end
+
+"caller" latency is what a request thread waits; throughput includes the final flush.
+
+    python -m benchmarks.scan_writes --scans 2000 --threads 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from benchmarks._env import bench_app
+from cdx_web_scan import db
+from cdx_web_scan.models import BarcodeCapture, CaptureMethod, Scan, ScanSource
+from cdx_web_scan.web_scan.scan_writer import PendingScan, ScanWriteBehind, write_scans_now
+
+app = bench_app()
+
+
+def _legacy(value: str) -> None:
+    scan = Scan(source=ScanSource.scanner, notes="bench")
+    db.session.add(scan)
+    db.session.flush()
+    barcode = BarcodeCapture(
+        scan_id=scan.id,
+        symbology="UPC",
+        value_raw=value,
+        value_normalized=value,
+        is_primary=True,
+        capture_method=CaptureMethod.scanner,
+    )
+    db.session.add(barcode)
+    scan.primary_barcode_id = barcode.id
+    db.session.commit()
+
+
+def _pending(value: str) -> PendingScan:
+    return PendingScan(value=value, symbology="UPC", source=ScanSource.scanner, capture_method=CaptureMethod.scanner, notes="bench")
+
+
+def _run(mode: str, scans: int, threads: int, interval_ms: int) -> dict:
+    writer = None
+    if mode == "write-behind":
+        app.config["SCAN_WRITE_BEHIND_INTERVAL_MS"] = interval_ms
+        writer = ScanWriteBehind(app)
+        writer.start()
+
+    per_thread = scans // threads
+    samples: list[float] = []
+    lock = threading.Lock()
+
+    def worker(offset: int) -> None:
+        local: list[float] = []
+        with app.app_context():
+            for n in range(per_thread):
+                value = f"{mode[:1]}{offset + n:011d}"
+                started = time.perf_counter()
+                if mode == "legacy":
+                    _legacy(value)
+                elif mode == "direct":
+                    write_scans_now([_pending(value)])
+                else:
+                    writer.submit(_pending(value))
+                local.append((time.perf_counter() - started) * 1000)
+            db.session.remove()
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i * per_thread,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if writer is not None:
+        writer.flush(timeout=60)
+        writer.stop()
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(samples)
+    return {
+        "mode": mode,
+        "scans": len(ordered),
+        "scans_per_sec": round(len(ordered) / elapsed, 1),
+        "caller_p50_ms": round(ordered[len(ordered) // 2], 3),
+        "caller_p99_ms": round(ordered[int(len(ordered) * 0.99)], 3),
+        "caller_mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scans", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--interval-ms", type=int, default=50)
+    parser.add_argument("--modes", default="legacy,direct,write-behind")
+    args = parser.parse_args()
+
+    results = [_run(mode, args.scans, max(1, args.threads), args.interval_ms) for mode in args.modes.split(",")]
+    print(json.dumps({"db": app.config["SQLALCHEMY_DATABASE_URI"], "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
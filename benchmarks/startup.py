@@ -0,0 +1,110 @@
+"""Worker startup cost: package import, create_app() and the first request.
+
+Each sample runs in a fresh interpreter, so nothing is already imported or warm:
+
+* ``cold``: a worker that imports and builds the app itself (gunicorn without
+  ``--preload``). It reports the import time, ``create_app()`` time, first
+  request latency and the total.
+* ``cold_with_schema``: the same, plus ``create_schema()`` before the first
+  request. Before the app factory, every worker paid this on import
+  (``create_all`` and an index check per index).
+* ``preload``: the app is built once in a parent process, then ``--forks``
+  children are forked from it, like gunicorn ``--preload``. It reports each
+  child's time from fork to its first response.
+
+    python -m benchmarks.startup --samples 5 --forks 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import _env  # noqa: F401  (must precede cdx_web_scan imports)
+
+
+def _cold(schema: bool) -> dict:
+    started = time.perf_counter()
+    import cdx_web_scan
+    imported = time.perf_counter()
+    app = cdx_web_scan.create_app()
+    created = time.perf_counter()
+    if schema:
+        from cdx_web_scan.schema import create_schema
+
+        with app.app_context():
+            create_schema()
+    ready = time.perf_counter()
+    status = app.test_client().get("/batch").status_code
+    answered = time.perf_counter()
+    assert status == 200, status
+    return {
+        "import_ms": (imported - started) * 1000,
+        "create_app_ms": (created - imported) * 1000,
+        "schema_ms": (ready - created) * 1000,
+        "first_request_ms": (answered - ready) * 1000,
+        "total_ms": (answered - started) * 1000,
+    }
+
+
+def _preload(forks: int) -> dict:
+    from cdx_web_scan import create_app
+
+    app = create_app()
+    samples = []
+    for _ in range(forks):
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()  # CLOCK_MONOTONIC: comparable across fork()
+        pid = os.fork()
+        if pid == 0:
+            status = app.test_client().get("/batch").status_code
+            os.write(write_fd, json.dumps([status, (time.perf_counter() - forked) * 1000]).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            status, elapsed = json.loads(f.read())
+        os.waitpid(pid, 0)
+        assert status == 200, status
+        samples.append(elapsed)
+    return {"fork_to_first_response_ms": samples}
+
+
+def _median(values: list[float]) -> float:
+    return round(statistics.median(values), 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5, help="Fresh processes per cold mode.")
+    parser.add_argument("--forks", type=int, default=4, help="Workers forked from the preloaded app.")
+    parser.add_argument("--child", choices=["cold", "cold_with_schema", "preload"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = _preload(args.forks) if args.child == "preload" else _cold(args.child == "cold_with_schema")
+        print(json.dumps(result))
+        return
+
+    def _run(mode: str) -> dict:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child", mode, "--forks", str(args.forks)],
+            env={**os.environ, "CDX_BENCH_DATA_DIR": _env.DATA_DIR}, check=True, capture_output=True, text=True,
+        ).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    # The first run creates the schema so every mode serves /batch from the same database.
+    _run("cold_with_schema")
+    report = {}
+    for mode in ("cold", "cold_with_schema"):
+        runs = [_run(mode) for _ in range(args.samples)]
+        report[mode] = {key: _median([run[key] for run in runs]) for key in runs[0]}
+    report["preload"] = {"fork_to_first_response_ms": _median(_run("preload")["fork_to_first_response_ms"])}
+    print(json.dumps({"samples": args.samples, "forks": args.forks, "median": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
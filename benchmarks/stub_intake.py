@@ -0,0 +1,126 @@
+"""Local stand-in for the AWS Intake API.
+
+Accepts ``POST`` JSON (optionally gzip-encoded), answers with a small JSON body,
+and can inject latency and errors. Keep-alive is on (HTTP/1.1) so pooled clients
+behave as they would against API Gateway.
+
+    python -m benchmarks.stub_intake --port 9000 --latency-ms 40 --error-rate 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import ssl
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubIntakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, error_rate: float = 0):
+        super().__init__((host, port), _Handler)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.items = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        with self._lock:
+            self.connections += 1
+        return sock, addr
+
+    def use_tls(self, certfile: str, keyfile: str) -> None:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(certfile, keyfile)
+        self.socket = ctx.wrap_socket(self.socket, server_side=True)
+
+    @property
+    def url(self) -> str:
+        scheme = "https" if isinstance(self.socket, ssl.SSLSocket) else "http"
+        host, port = self.server_address[:2]
+        return f"{scheme}://{host}:{port}/prod/intake"
+
+    def start(self) -> StubIntakeServer:
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-intake", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle + delayed ACK
+    # adds ~40 ms to every response on a kept-alive connection.
+    disable_nagle_algorithm = True
+    server: StubIntakeServer
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            payload = {}
+
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+
+        items = payload.get("barcodes") or payload.get("items") or []
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.items += len(items)
+
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._reply(503, {"message": "injected failure"}, {"Retry-After": "1"})
+        else:
+            self._reply(202, {"intake_id": str(uuid.uuid4()), "received": len(items)})
+
+    def _reply(self, status: int, body: dict, headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--tls-cert")
+    parser.add_argument("--tls-key")
+    args = parser.parse_args()
+
+    server = StubIntakeServer(args.host, args.port, args.latency_ms, args.error_rate)
+    if args.tls_cert and args.tls_key:
+        server.use_tls(args.tls_cert, args.tls_key)
+    print(f"Stub intake API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Per-fragment render time: legacy ``inject_globals`` vs. the cached template globals.
+
+``legacy`` re-registers the old context processor (parse ``pyproject.toml`` from
+the working directory and ``stat()`` four static files on every render); ``cached``
+uses the app's own processor. Both render ``batch_fragment.html`` the way
+``GET /batch`` does. Run from the repo root so the legacy relative path resolves.
+
+    python -m benchmarks.template_render --renders 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+import toml
+
+from benchmarks._env import bench_app
+import cdx_web_scan
+from flask import render_template
+
+app = bench_app()
+
+
+def _legacy_inject_globals():
+    with open("pyproject.toml", "r") as f:
+        version = toml.load(f)["project"]["version"]
+    static_dir = Path(cdx_web_scan.__file__).resolve().parent / "static"
+    mtimes = []
+    for name in ("app.js", "styles.css", "service-worker.js", "manifest.webmanifest"):
+        try:
+            mtimes.append(int((static_dir / name).stat().st_mtime))
+        except OSError:
+            continue
+    return {
+        "version": version,
+        "asset_rev": max(mtimes) if mtimes else int(datetime.now().timestamp()),
+        "current_year": datetime.now().year,
+    }
+
+
+_CONTEXT = {"total": 3, "page_items": [{"code": "012345678905", "source": "wedge", "title": "Item"}] * 3, "page": 1, "total_pages": 1, "ol_start": 1}
+
+
+def _run(mode: str, renders: int) -> dict:
+    processors = app.template_context_processors[None]
+    original = list(processors)
+    if mode == "legacy":
+        processors[processors.index(cdx_web_scan.inject_globals)] = _legacy_inject_globals
+    try:
+        samples = []
+        with app.test_request_context("/batch"):
+            render_template("batch_fragment.html", **_CONTEXT)  # warm the template cache
+            for _ in range(renders):
+                started = time.perf_counter()
+                render_template("batch_fragment.html", **_CONTEXT)
+                samples.append((time.perf_counter() - started) * 1_000_000)
+    finally:
+        processors[:] = original
+
+    ordered = sorted(samples)
+    return {
+        "mode": mode,
+        "renders": renders,
+        "p50_us": round(ordered[len(ordered) // 2], 1),
+        "p99_us": round(ordered[int(len(ordered) * 0.99)], 1),
+        "mean_us": round(statistics.fmean(ordered), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=2000)
+    parser.add_argument("--modes", default="legacy,cached")
+    args = parser.parse_args()
+
+    print(json.dumps({"results": [_run(mode, args.renders) for mode in args.modes.split(",")]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,155 +1,175 @@
 # /__init__.py
 
 # Python Imports
-import base64
 import os
+import weakref
+from collections.abc import Mapping
 from datetime import datetime
-import logging
-import subprocess
-import toml
 
 # Third party imports
-from flask import Flask, Response, jsonify, send_file, request, render_template
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
-from pathlib import Path
-from dotenv import load_dotenv
-
-# Local imports
-
-# Define the WSGI application object
-app = Flask(__name__)
-
-##################################
-### Load Flask Run Mode
-### Configuration based
-### on environment
-### (Production, Development)
-##################################
-load_dotenv("./.env", verbose=True)
-app.config.from_object(os.environ["APP_MODE"])
-
-
-##################################
-### Logging Setup
-##################################
-logging.basicConfig(
-    filename=app.config["CDX_WEB_SCAN_LOG_FILE"],
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s : %(message)s",
-)
-
-def log_message(message):
-    """Helper function to prefix Log message with user name and source IP address"""
-    source_ip = (
-        request.headers.get("X-Forwarded-For", request.remote_addr)
-        .split(",")[0]
-        .strip()
+from sqlalchemy import event
+
+# Shared extension; bound to an application in create_app().
+db = SQLAlchemy()
+
+# Engines of every app built in this process; a forked child drops their pools.
+_fork_engines = weakref.WeakSet()
+_fork_hook_registered = False
+
+
+def _configure_sqlite(engine, busy_timeout_ms: int) -> None:
+    """WAL + busy_timeout on every new connection.
+
+    In WAL mode readers don't block writers, so a long streamed export (an open
+    read cursor) doesn't lock /submit, the write-behind or the dispatcher out;
+    busy_timeout covers the short waits between concurrent writers.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        finally:
+            cursor.close()
+
+
+def _dispose_engines_in_child() -> None:
+    for engine in list(_fork_engines):
+        engine.dispose(close=False)
+
+
+def create_app(config=None, overrides: Mapping | None = None) -> Flask:
+    """Build the WSGI application.
+
+    ``config`` is a config object or its import path (``"config.ProdConfig"``);
+    by default ``APP_MODE`` from the environment / ``.env``. ``overrides`` are
+    applied on top. Importing the package has no side effects, and nothing here
+    touches the database schema (``flask init-db`` does), so gunicorn can run
+    this once with ``--preload`` and fork warm workers from it.
+    """
+    # Define the WSGI application object
+    app = Flask(__name__)
+
+    ##################################
+    ### Load Flask Run Mode
+    ### Configuration based
+    ### on environment
+    ### (Production, Development)
+    ##################################
+    if config is None:
+        from dotenv import load_dotenv
+
+        load_dotenv("./.env", verbose=True)
+        config = os.environ["APP_MODE"]
+    app.config.from_object(config)
+    if overrides:
+        app.config.update(overrides)
+
+    ##################################
+    ### Logging Setup
+    ### (queued, rotated, optional JSON)
+    ##################################
+    os.makedirs(app.config["CDX_WEB_SCAN_FOLDER"], exist_ok=True)
+    from cdx_web_scan import log_setup
+
+    log_setup.init_app(app)
+
+    ##################################
+    ### Database Setup
+    ##################################
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(
+        app.config["CDX_WEB_SCAN_FOLDER"], app.config["CDX_WEB_SCAN_DB_FILE_NAME"]
     )
-    return f"[IP: {source_ip}] {message}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.logger.info(f"CDX Web Scan Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+    db.init_app(app)
+    with app.app_context():
+        _configure_sqlite(db.engine, int(app.config.get("SQLITE_BUSY_TIMEOUT_MS") or 5000))
+
+    ##################################
+    ### Metrics (/metrics) and
+    ### opt-in profiling (/debug/profile)
+    ##################################
+    from cdx_web_scan import metrics, profiling
+
+    metrics.init_app(app, db)
+    profiling.init_app(app, db)
+
+    ##################################
+    ### Routing Blueprint Setup
+    ##################################
+    from cdx_web_scan.error_pages.handlers import error_pages
+    from cdx_web_scan.log_viewer import log_viewer
+    from cdx_web_scan.web_scan.views import web_scan
+
+    app.register_blueprint(error_pages)
+    app.register_blueprint(log_viewer)
+    app.register_blueprint(web_scan)
+
+    ##################################
+    ### Background Workers
+    ##################################
+    from cdx_web_scan.intake import dispatcher as intake_dispatcher
+    from cdx_web_scan.web_scan import seen_index
+
+    intake_dispatcher.init_app(app)
+    seen_index.init_app(app)
+
+    ##################################
+    ### Static Assets
+    ### (hashed + precompressed copies)
+    ##################################
+    from cdx_web_scan import assets
+
+    assets.init_app(app)
+
+    ##################################
+    ### CLI Commands
+    ##################################
+    from cdx_web_scan import schema
+    from cdx_web_scan.web_scan import catalog, export, gtin_backfill, scan_search
+
+    schema.init_app(app)
+    gtin_backfill.init_app(app)
+    catalog.init_app(app)
+    scan_search.init_app(app)
+    export.init_app(app)
+
+    ##################################
+    ### Context Processor
+    ### Global template variables
+    ##################################
+    from cdx_web_scan.template_globals import TemplateGlobals
+
+    app.extensions["template_globals"] = TemplateGlobals(recheck_seconds=app.config["TEMPLATE_GLOBALS_RECHECK_SECONDS"])
+    app.context_processor(inject_globals)
+
+    ##################################
+    ### Fork safety (gunicorn --preload)
+    ##################################
+    with app.app_context():
+        engine = db.engine
+    # Workers must not share the parent's SQLite connections: drop any opened
+    # while building the app, and have each forked child start a fresh pool.
+    engine.dispose()
+    _fork_engines.add(engine)
+    global _fork_hook_registered
+    if not _fork_hook_registered:
+        # One process-wide hook, however many apps get built (tests build dozens).
+        os.register_at_fork(after_in_child=_dispose_engines_in_child)
+        _fork_hook_registered = True
+
+    return app
 
 
-
-@app.route("/view-log")
-def view_log():
-    """Display the log viewer (in a new tab)."""
-    app.logger.info(log_message("Processing /view-log route..."))
-    return render_template("view_log.html")
-
-
-@app.route("/get-log")
-def get_log():
-    """Get the last x lines of the application log file."""
-    app.logger.debug(log_message("Processing /get-log route..."))
-    log_file_path = app.config["CDX_WEB_SCAN_LOG_FILE"]
-    lines_to_show = app.config["LOG_LINES_TO_SHOW"]
-    if not os.path.exists(log_file_path):
-        return jsonify({"error": "Log file not found"}), 404
-
-    # use subprocess to call the system's tail command
-    try:
-        if app.config["APP_SERVER_OS"] == "Windows":
-            result = subprocess.run(
-                ["powershell", "Get-Content", log_file_path, "-Tail", lines_to_show],
-                stdout=subprocess.PIPE,
-            )
-        else:
-            result = subprocess.run(
-                ["/usr/bin/tail", "-n", lines_to_show, log_file_path], stdout=subprocess.PIPE
-            )
-        log_content = result.stdout.decode("utf-8")
-    except Exception as e:
-        app.logger.error(log_message(f"Error reading log file: {e}"))
-        return jsonify({"error": "Error reading log file"}), 500
-
-    return Response(log_content, mimetype="text/plain")
-
-
-##################################
-### Database Setup
-##################################
-os.makedirs(app.config["CDX_WEB_SCAN_FOLDER"], exist_ok=True)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(
-    app.config["CDX_WEB_SCAN_FOLDER"], app.config["CDX_WEB_SCAN_DB_FILE_NAME"]
-)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-app.logger.info(f"CDX Web Scan Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
-print(f"CDX Web Scan Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
-
-db = SQLAlchemy(app)
-
-# Initialize schema (idempotent) so local persistence works out of the box.
-with app.app_context():
-    import cdx_web_scan.models  # noqa: F401
-
-    db.create_all()
-
-
-##################################
-### Routing Blueprint Setup
-##################################
-from cdx_web_scan.error_pages.handlers import error_pages
-from cdx_web_scan.web_scan.views import web_scan
-
-
-app.register_blueprint(error_pages)
-app.register_blueprint(web_scan)
-
-
-
-##################################
-### Context Processor
-### Global template variables
-##################################
-def get_version():
-    """Get the version of the application."""
-    with open("pyproject.toml", "r") as f:
-        pyproject_data = toml.load(f)
-    return pyproject_data["project"]["version"]
-
-
-@app.context_processor
 def inject_globals():
-    """Inject global variables into all templates."""
-
-    def get_asset_rev() -> int:
-        static_dir = Path(__file__).resolve().parent / "static"
-        candidates = [
-            static_dir / "app.js",
-            static_dir / "styles.css",
-            static_dir / "service-worker.js",
-            static_dir / "manifest.webmanifest",
-        ]
-        mtimes: list[int] = []
-        for p in candidates:
-            try:
-                mtimes.append(int(p.stat().st_mtime))
-            except OSError:
-                continue
-        return max(mtimes) if mtimes else int(datetime.now().timestamp())
-
+    """Inject global variables into all templates (version/asset_rev are cached)."""
     return {
-        "version": get_version(),
-        "asset_rev": get_asset_rev(),
+        **current_app.extensions["template_globals"].get(),
         "current_year": datetime.now().year,
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,154 @@
+"""Content-hashed, precompressed static assets.
+
+``build_assets`` copies each entry of ``HASHED_ASSETS`` to ``<name>.<hash>.<ext>``
+in ``ASSET_DIST_DIR`` together with ``.gz`` (and, if the optional ``brotli``
+package is installed, ``.br``) variants, and writes ``assets.json`` mapping the
+logical name to the hashed one. Templates call ``asset_url("app.js")``.
+
+Hashed files never change, so they are served with ``Cache-Control: immutable``
+and a strong ETag derived from the content hash. In the Docker deployment nginx
+serves them straight from the shared data volume (see ``deploy/nginx.conf``);
+``/static/dist/<file>`` here is the fallback and what development uses.
+
+``service-worker.js`` and ``manifest.webmanifest`` are deliberately not hashed:
+browsers look them up at fixed URLs. They keep Flask's conditional (304) handling.
+
+Old hashed files are left in place so pages cached before a deploy keep working.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+from pathlib import Path
+
+import click
+from flask import Flask, Response, abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:  # Optional: brotli variants are skipped when the package is not installed.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+HASHED_ASSETS = ("app.js", "styles.css")
+MANIFEST_NAME = "assets.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# (Accept-Encoding token, file suffix, ETag suffix), in order of preference.
+_ENCODINGS = (("br", ".br", "-br"), ("gzip", ".gz", "-gz"))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Every gunicorn worker may build at startup; never expose a half-written file.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def hashed_name(name: str, digest: str) -> str:
+    stem, dot, ext = name.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+
+
+def build_assets(dist_dir: Path, static_dir: Path = STATIC_DIR, names: tuple[str, ...] = HASHED_ASSETS) -> dict[str, str]:
+    """Write hashed and precompressed copies of ``names``; returns the manifest."""
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, str] = {}
+    for name in names:
+        data = (static_dir / name).read_bytes()
+        target = dist_dir / hashed_name(name, hashlib.sha256(data).hexdigest()[:16])
+        if not target.exists():
+            _write_atomic(target, data)
+        gz_path = target.with_name(target.name + ".gz")
+        if not gz_path.exists():
+            _write_atomic(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+        br_path = target.with_name(target.name + ".br")
+        if brotli is not None and not br_path.exists():
+            _write_atomic(br_path, brotli.compress(data, quality=11))
+        manifest[name] = target.name
+    _write_atomic(dist_dir / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def load_manifest(dist_dir: Path) -> dict[str, str]:
+    try:
+        with open(dist_dir / MANIFEST_NAME, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(name: str) -> str:
+    """URL for a static asset: the hashed copy if built, else ``/static/<name>?v=<rev>``."""
+    hashed = current_app.extensions.get("asset_manifest", {}).get(name)
+    if hashed:
+        return url_for("hashed_asset", filename=hashed)
+    rev = current_app.extensions["template_globals"].get()["asset_rev"]
+    return url_for("static", filename=name, v=rev)
+
+
+def _etag(filename: str, suffix: str) -> str:
+    # "app.<digest>.js" -> "<digest>"; the content hash is already a strong validator.
+    return filename.rsplit(".", 2)[-2] + suffix
+
+
+def hashed_asset(filename: str) -> Response:
+    # Only the hashed copies themselves (compressed variants are chosen below).
+    if filename == MANIFEST_NAME or filename.startswith(".") or filename.endswith((".gz", ".br")):
+        abort(404)
+    joined = safe_join(current_app.config["ASSET_DIST_DIR"], filename)
+    if joined is None or not os.path.isfile(joined):
+        abort(404)
+    path, encoding, etag = Path(joined), None, _etag(filename, "")
+    for token, file_suffix, etag_suffix in _ENCODINGS:
+        candidate = path.with_name(path.name + file_suffix)
+        if request.accept_encodings[token] and candidate.exists():
+            path, encoding, etag = candidate, token, _etag(filename, etag_suffix)
+            break
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_file(path, mimetype=mimetype, etag=False, conditional=False, max_age=None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Build (or load) the hashed assets and register ``asset_url`` + the dist route."""
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.add_url_rule("/static/dist/<path:filename>", "hashed_asset", hashed_asset)
+    dist_dir = Path(app.config["ASSET_DIST_DIR"])
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Write hashed/precompressed static assets to ASSET_DIST_DIR."""
+        for name, hashed in build_assets(dist_dir).items():
+            click.echo(f"{name} -> {hashed}")
+
+    if not app.config.get("ASSET_PIPELINE", True):
+        return
+    try:
+        manifest = build_assets(dist_dir) if app.config.get("ASSET_BUILD_ON_STARTUP", True) else load_manifest(dist_dir)
+    except OSError:
+        app.logger.exception(f"Static asset build failed; serving unhashed assets from {STATIC_DIR}")
+        manifest = {}
+    app.extensions["asset_manifest"] = manifest
@@ -0,0 +1,6 @@
+"""Outbound delivery of submitted batches to the AWS Intake API.
+
+Views never call the API directly: they write an ``AwsIntakeCall`` row to the
+outbox (``outbox.py``) and the per-process dispatcher (``dispatcher.py``) sends
+it in the background.
+"""
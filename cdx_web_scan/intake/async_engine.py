@@ -0,0 +1,331 @@
+"""Non-blocking intake client running on a dedicated asyncio event loop.
+
+Each worker process runs one ``AsyncIntakeEngine``: an event loop on a daemon
+thread. The outbox dispatcher hands it requests with ``submit()`` and gets a
+``concurrent.futures.Future[IntakeResponse]`` back, so hundreds of intake calls
+can wait on the API at once without an OS thread each and without raising
+``GUNICORN_THREADS``. Views never call the API themselves: they queue outbox
+rows, which keeps a submission durable if the worker dies before it is sent.
+
+Requests to one host share at most ``INTAKE_POOL_SIZE`` keep-alive HTTP/1.1
+connections. That is one request per connection at a time (API Gateway has no
+HTTP/2 for REST APIs), and requests over the limit wait on the loop. The wait is
+not part of a call's ``duration_ms``, and once a connection is free the whole
+exchange (write, drain, response) must finish within the read timeout. A reused
+connection the server closed while idle is retried once on a fresh socket, as in
+``IntakeClient``. ``stop()`` cancels whatever is still in flight (those futures
+end up cancelled) and closes the sockets.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import ssl
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from flask import Flask, current_app
+
+from cdx_web_scan.intake.client import IntakeResponse, encode_json_body
+
+# Errors that mean a pooled keep-alive connection was closed by the server
+# while idle; the request never reached it, so one retry on a fresh socket is safe.
+_STALE_CONNECTION_ERRORS = (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError)
+
+_engine_lock = threading.Lock()
+# Engines started in this process, for the one atexit hook below.
+_started_engines = weakref.WeakSet()
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @property
+    def usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def abort(self) -> None:
+        # close() waits for unsent data to drain, which never happens if the
+        # peer stopped reading; drop the socket now instead.
+        self.writer.transport.abort()
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    body = bytearray()
+    while True:
+        size = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+        if size == 0:
+            # Trailers, up to the blank line.
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return bytes(body)
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, dict[str, str], bytes, bool]:
+    """Read one HTTP/1.x response to a POST: (status, headers, body, keep_alive)."""
+    while True:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Remote end closed connection without response")
+        try:
+            version, status_text = status_line.decode("latin-1").split(None, 2)[:2]
+            status = int(status_text)
+        except ValueError as exc:
+            raise ValueError(f"Bad status line: {status_line!r}") from exc
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip()] = value.strip()
+        if not 100 <= status < 200:
+            break  # 1xx responses are interim; the real one follows.
+
+    lower = {name.lower(): value.lower() for name, value in headers.items()}
+    connection = lower.get("connection", "")
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if status in (204, 304):
+        body = b""
+    elif lower.get("transfer-encoding") == "chunked":
+        body = await _read_chunked(reader)
+    elif "content-length" in lower:
+        body = await reader.readexactly(int(lower["content-length"]))
+    else:
+        # Delimited by the server closing the connection.
+        body = await reader.read()
+        keep_alive = False
+    return status, headers, body, keep_alive
+
+
+class AsyncIntakeEngine:
+    """Event loop thread plus per-host keep-alive pools; thread-safe ``submit()``."""
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        gzip_requests: bool = False,
+        gzip_min_bytes: int = 1024,
+        ssl_context: ssl.SSLContext | None = None,
+    ):
+        self.pool_size = max(1, pool_size)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self.pid = os.getpid()
+        self.connections_opened = 0
+        self._ssl_context = ssl_context or ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        # Everything below is only touched from the loop thread.
+        self._idle: dict[tuple[str, str, int], list[_Connection]] = {}
+        self._slots: dict[tuple[str, str, int], asyncio.Semaphore] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._closing
+
+    def start(self) -> AsyncIntakeEngine:
+        with self._lock:
+            if self.running:
+                return self
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._closing = False
+            self._loop = loop
+            self._thread = threading.Thread(target=_run, name="intake-async", daemon=True)
+            self._thread.start()
+            ready.wait()
+            _started_engines.add(self)
+        return self
+
+    def stop(self, timeout: float = 5) -> None:
+        """Cancel in-flight requests, close pooled connections and stop the loop thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None or not thread.is_alive() or self._closing:
+                return
+            # submit() checks this under the lock, so nothing new is queued behind _shutdown.
+            self._closing = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+        with self._lock:
+            self._loop = self._thread = None
+
+    async def _shutdown(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        idle = [conn for connections in self._idle.values() for conn in connections]
+        for conn in idle:
+            conn.close()
+        # Let the transports actually release their sockets before the loop stops.
+        await asyncio.gather(*(conn.writer.wait_closed() for conn in idle), return_exceptions=True)
+        self._idle.clear()
+        self._slots.clear()
+
+    # ----------------------------
+    # Requests
+    # ----------------------------
+
+    def submit(self, url: str, payload: dict, headers: dict[str, str] | None = None) -> Future[IntakeResponse]:
+        """Queue a JSON POST; the future resolves to an ``IntakeResponse`` (never raises one)."""
+        send_headers = dict(headers or {})
+        # Encode on the caller's thread so the loop only does I/O.
+        body = encode_json_body(payload, send_headers, self.gzip_requests, self.gzip_min_bytes)
+        with self._lock:
+            if not self.running:
+                raise RuntimeError("Async intake engine is not running")
+            return asyncio.run_coroutine_threadsafe(self._tracked(self._post(url, body, send_headers)), self._loop)
+
+    def post_json(self, url: str, payload: dict, headers: dict[str, str] | None = None) -> IntakeResponse:
+        """Blocking convenience wrapper, same signature as ``IntakeClient.post_json``."""
+        return self.submit(url, payload, headers).result()
+
+    async def _tracked(self, coro):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+
+    def _checkout(self, key: tuple[str, str, int]) -> _Connection | None:
+        idle = self._idle.get(key)
+        while idle:
+            conn = idle.pop()
+            if conn.usable:
+                return conn
+            conn.close()
+        return None
+
+    async def _connect(self, key: tuple[str, str, int]) -> _Connection:
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self._ssl_context if scheme == "https" else None),
+            self.connect_timeout,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def _post(self, url: str, body: bytes, headers: dict[str, str]) -> IntakeResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        host = key[1] if parts.port is None else f"{key[1]}:{port}"
+        head = [f"POST {path} HTTP/1.1", f"Host: {host}"]
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        request = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+        async def _exchange(conn: _Connection) -> tuple[int, dict[str, str], bytes, bool]:
+            conn.writer.write(request)
+            await conn.writer.drain()
+            return await read_response(conn.reader)
+
+        slots = self._slots.get(key)
+        if slots is None:
+            slots = self._slots[key] = asyncio.Semaphore(self.pool_size)
+        async with slots:
+            # Timed from here: waiting for a free connection is queueing, not API latency.
+            started = time.perf_counter()
+
+            def _elapsed() -> int:
+                return int((time.perf_counter() - started) * 1000)
+
+            for attempt in range(2):
+                conn = self._checkout(key)
+                reused = conn is not None
+                try:
+                    if conn is None:
+                        conn = await self._connect(key)
+                    status, resp_headers, data, keep_alive = await asyncio.wait_for(_exchange(conn), self.read_timeout)
+                except asyncio.CancelledError:
+                    if conn is not None:
+                        conn.abort()
+                    raise
+                except _STALE_CONNECTION_ERRORS as e:
+                    if conn is not None:
+                        conn.abort()
+                    if reused and attempt == 0:
+                        continue
+                    message = str(e) or type(e).__name__
+                    return IntakeResponse(0, message, {}, _elapsed(), error=message)
+                except Exception as e:
+                    if conn is not None:
+                        conn.abort()
+                    message = str(e) or type(e).__name__  # TimeoutError has no message
+                    return IntakeResponse(0, message, {}, _elapsed(), error=message)
+
+                if keep_alive:
+                    self._idle.setdefault(key, []).append(conn)
+                else:
+                    conn.close()
+                return IntakeResponse(status, data.decode("utf-8", errors="replace"), resp_headers, _elapsed())
+            return IntakeResponse(0, "connection retry exhausted", {}, _elapsed(), error="connection retry exhausted")
+
+
+def _stop_started_engines() -> None:
+    for engine in list(_started_engines):
+        engine.stop()
+
+
+atexit.register(_stop_started_engines)
+
+
+def get_async_engine(app: Flask | None = None) -> AsyncIntakeEngine:
+    """Return this worker process's running engine (a new one after fork)."""
+    app = app or current_app._get_current_object()  # type: ignore[attr-defined]
+    engine = app.extensions.get("intake_async_engine")
+    if engine is None or engine.pid != os.getpid() or not engine.running:
+        with _engine_lock:
+            engine = app.extensions.get("intake_async_engine")
+            if engine is None or engine.pid != os.getpid() or not engine.running:
+                engine = app.extensions["intake_async_engine"] = AsyncIntakeEngine(
+                    pool_size=int(app.config.get("INTAKE_POOL_SIZE") or 4),
+                    connect_timeout=float(app.config.get("INTAKE_CONNECT_TIMEOUT") or 5),
+                    read_timeout=float(app.config.get("INTAKE_REQUEST_TIMEOUT") or 15),
+                    gzip_requests=bool(app.config.get("INTAKE_GZIP_REQUESTS", False)),
+                    gzip_min_bytes=int(app.config.get("INTAKE_GZIP_MIN_BYTES") or 0),
+                ).start()
+    return engine
+
@@ -0,0 +1,73 @@
+"""Split a batch into intake payloads bounded by item count and encoded size.
+
+Each chunk becomes its own outbox row, so a failure only retries that chunk and
+the dispatcher can send several chunks of one batch in parallel.
+"""
+from __future__ import annotations
+
+import json
+from typing import Iterator
+
+PAYLOAD_MODES = ("full", "compact")
+
+# Rough JSON envelope size (source, submitted_at, batch_id, chunk info) per payload.
+_ENVELOPE_BYTES = 256
+
+
+def _item_fields(item: dict, mode: str) -> dict:
+    fields = {k: v for k, v in item.items() if k != "scan_id"}
+    if mode == "compact":
+        fields = {k: v for k, v in fields.items() if v is not None}
+    return fields
+
+
+def _encoded_size(value: dict) -> int:
+    return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def chunk_items(items: list[dict], max_items: int, max_bytes: int, mode: str = "full") -> Iterator[list[dict]]:
+    """Greedily group ``items`` so no chunk exceeds either limit (0 = no limit).
+
+    A single item larger than ``max_bytes`` still goes out, alone in its chunk.
+    """
+    chunk: list[dict] = []
+    size = _ENVELOPE_BYTES
+    for item in items:
+        # In full mode the code is also repeated in the "barcodes" list.
+        item_size = _encoded_size(_item_fields(item, mode)) + 1
+        if mode == "full":
+            item_size += len(str(item.get("code") or "")) + 3
+        if chunk and ((max_items > 0 and len(chunk) >= max_items) or (max_bytes > 0 and size + item_size > max_bytes)):
+            yield chunk
+            chunk, size = [], _ENVELOPE_BYTES
+        chunk.append(item)
+        size += item_size
+    if chunk:
+        yield chunk
+
+
+def build_payload(items: list[dict], submitted_at: str, mode: str = "full") -> dict:
+    """Intake payload for one chunk.
+
+    ``full`` keeps the keys of the original contract (``source``,
+    ``submitted_at``, ``barcodes`` and full ``items``; each chunk is a
+    self-contained batch). ``compact`` sends ``items``
+    only, drops empty fields, and the outbox adds ``batch_id`` and ``chunk``.
+    """
+    payload: dict = {"source": "cdx-web-scan", "submitted_at": submitted_at}
+    if mode == "full":
+        payload["barcodes"] = [item["code"] for item in items]
+    payload["items"] = [_item_fields(item, mode) for item in items]
+    return payload
+
+
+def build_payloads(
+    items: list[dict],
+    submitted_at: str,
+    mode: str = "full",
+    max_items: int = 0,
+    max_bytes: int = 0,
+) -> list[dict]:
+    if mode not in PAYLOAD_MODES:
+        raise ValueError(f"Unknown intake payload mode: {mode!r}")
+    return [build_payload(chunk, submitted_at, mode) for chunk in chunk_items(items, max_items, max_bytes, mode)]
@@ -0,0 +1,210 @@
+"""HTTP client for the intake API.
+
+``IntakeClient`` keeps a small pool of persistent (keep-alive) connections per
+host so repeated submissions skip the TCP + TLS handshake. ``post_json`` is the
+original one-shot ``urllib`` path, kept for comparison benchmarks.
+"""
+from __future__ import annotations
+
+import gzip
+import http.client
+import json
+import os
+import queue
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from flask import Flask, current_app
+
+
+@dataclass
+class IntakeResponse:
+    """Outcome of one POST to the intake API. ``status`` is 0 on transport errors."""
+
+    status: int
+    body: str
+    headers: dict[str, str] = field(default_factory=dict)
+    duration_ms: int = 0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+def post_json(url: str, payload: dict, headers: dict[str, str] | None = None, timeout: float = 15) -> IntakeResponse:
+    body = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=body, method="POST")
+    req.add_header("Content-Type", "application/json")
+    if headers:
+        for k, v in headers.items():
+            req.add_header(k, v)
+
+    started = time.perf_counter()
+
+    def _elapsed() -> int:
+        return int((time.perf_counter() - started) * 1000)
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            status = getattr(resp, "status", 200)
+            text = resp.read().decode("utf-8")
+            return IntakeResponse(status, text, dict(resp.headers.items()), _elapsed())
+    except urllib.error.HTTPError as e:
+        text = e.read().decode("utf-8") if hasattr(e, "read") else str(e)
+        return IntakeResponse(int(getattr(e, "code", 500)), text, dict(e.headers.items()) if e.headers else {}, _elapsed())
+    except Exception as e:
+        return IntakeResponse(0, str(e), {}, _elapsed(), error=str(e))
+
+
+def encode_json_body(payload: dict, headers: dict[str, str], gzip_requests: bool, gzip_min_bytes: int) -> bytes:
+    """Compact JSON body for ``payload``, gzipped at/above ``gzip_min_bytes``; fills in ``headers``."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    headers.setdefault("Content-Type", "application/json")
+    if gzip_requests and len(body) >= gzip_min_bytes:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    headers["Content-Length"] = str(len(body))
+    return body
+
+
+# Errors that mean a pooled keep-alive connection was closed by the server
+# while idle; the request never reached it, so one retry on a fresh socket is safe.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class IntakeClient:
+    """Thread-safe keep-alive client with a bounded connection pool per host."""
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        gzip_requests: bool = False,
+        gzip_min_bytes: int = 1024,
+        ssl_context: ssl.SSLContext | None = None,
+    ):
+        self.pool_size = max(1, pool_size)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self._ssl_context = ssl_context or ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._pools: dict[tuple[str, str, int], queue.LifoQueue[http.client.HTTPConnection]] = {}
+        # Limits concurrent connections per host to pool_size; extra callers wait.
+        self._slots: dict[tuple[str, str, int], threading.BoundedSemaphore] = {}
+
+    def _pool_for(self, key: tuple[str, str, int]):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = queue.LifoQueue()
+                self._slots[key] = threading.BoundedSemaphore(self.pool_size)
+            return pool, self._slots[key]
+
+    def _connect(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        conn: http.client.HTTPConnection
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.connect_timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        # Connect and read budgets are separate: once connected, switch the socket timeout.
+        conn.sock.settimeout(self.read_timeout)
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def _encode(self, payload: dict, headers: dict[str, str]) -> bytes:
+        return encode_json_body(payload, headers, self.gzip_requests, self.gzip_min_bytes)
+
+    def post_json(self, url: str, payload: dict, headers: dict[str, str] | None = None) -> IntakeResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        send_headers = dict(headers or {})
+        body = self._encode(payload, send_headers)
+        pool, slots = self._pool_for(key)
+
+        started = time.perf_counter()
+
+        def _elapsed() -> int:
+            return int((time.perf_counter() - started) * 1000)
+
+        slots.acquire()
+        try:
+            for attempt in range(2):
+                try:
+                    conn = pool.get_nowait()
+                    reused = True
+                except queue.Empty:
+                    conn, reused = None, False
+                try:
+                    if conn is None:
+                        conn = self._connect(key)
+                    conn.request("POST", path, body=body, headers=send_headers)
+                    resp = conn.getresponse()
+                    text = resp.read().decode("utf-8", errors="replace")
+                except _STALE_CONNECTION_ERRORS as e:
+                    if conn is not None:
+                        conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    return IntakeResponse(0, str(e), {}, _elapsed(), error=str(e))
+                except Exception as e:
+                    if conn is not None:
+                        conn.close()
+                    return IntakeResponse(0, str(e), {}, _elapsed(), error=str(e))
+
+                if resp.will_close:
+                    conn.close()
+                else:
+                    pool.put(conn)
+                return IntakeResponse(resp.status, text, dict(resp.getheaders()), _elapsed())
+            return IntakeResponse(0, "connection retry exhausted", {}, _elapsed(), error="connection retry exhausted")
+        finally:
+            slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+def get_intake_client(app: Flask | None = None) -> IntakeClient:
+    """Return this worker process's pooled client (rebuilt after fork)."""
+    app = app or current_app._get_current_object()  # type: ignore[attr-defined]
+    entry = app.extensions.get("intake_client")
+    if entry is None or entry[0] != os.getpid():
+        client = IntakeClient(
+            pool_size=int(app.config.get("INTAKE_POOL_SIZE") or 4),
+            connect_timeout=float(app.config.get("INTAKE_CONNECT_TIMEOUT") or 5),
+            read_timeout=float(app.config.get("INTAKE_REQUEST_TIMEOUT") or 15),
+            gzip_requests=bool(app.config.get("INTAKE_GZIP_REQUESTS", False)),
+            gzip_min_bytes=int(app.config.get("INTAKE_GZIP_MIN_BYTES") or 0),
+        )
+        entry = app.extensions["intake_client"] = (os.getpid(), client)
+    return entry[1]
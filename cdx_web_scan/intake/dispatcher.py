@@ -0,0 +1,347 @@
+"""Background dispatcher that drains the intake outbox.
+
+Every gunicorn worker process starts one dispatcher thread on its first request,
+but only the process holding the ``dispatcher_lease`` row actually sends. The
+lease is renewed on every pass and expires after ``INTAKE_DISPATCH_LEASE_SECONDS``,
+so if the leader dies another worker takes over. Sends are bounded by the connect +
+read timeouts, which must stay below the lease TTL so a live leader never loses the
+lease mid-send; the ``Idempotency-Key`` header covers the remaining edge cases.
+
+With ``INTAKE_ASYNC_ENGINE`` on, the HTTP calls go to the worker's
+``AsyncIntakeEngine`` instead of one send thread each, so up to
+``INTAKE_ASYNC_MAX_IN_FLIGHT`` calls can be outstanding at once over the
+per-host connection pool. The ``INTAKE_DISPATCH_THREADS`` pool then only records
+results in the database, which keeps SQLite off the event loop.
+
+The leader also re-creates scans that a dead worker's write-behind queue never
+flushed (see ``scan_writer``), so that runs in one process only.
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from flask import Flask, current_app
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from cdx_web_scan import db
+from cdx_web_scan.intake.async_engine import get_async_engine
+from cdx_web_scan.intake.client import IntakeResponse, get_intake_client
+from cdx_web_scan.intake.outbox import call_url, learn_titles, record_response
+from cdx_web_scan.intake.retry import RetryPolicy
+from cdx_web_scan.models import AwsIntakeCall, DispatcherLease, IntakeStatus, utcnow
+from cdx_web_scan.web_scan.scan_writer import recover_unwritten_scans
+
+LEASE_NAME = "intake-dispatcher"
+
+_SENDABLE = (IntakeStatus.pending, IntakeStatus.retrying)
+
+
+class IntakeDispatcher:
+    def __init__(self, app: Flask):
+        self.app = app
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.threads = int(app.config.get("INTAKE_DISPATCH_THREADS") or 4)
+        self.poll_seconds = float(app.config.get("INTAKE_DISPATCH_POLL_SECONDS") or 2)
+        self.lease_seconds = float(app.config.get("INTAKE_DISPATCH_LEASE_SECONDS") or 30)
+        self.retry_policy = RetryPolicy.from_app(app)
+        self.chunks_in_flight = int(app.config.get("INTAKE_CHUNKS_IN_FLIGHT") or 4)
+        self.use_async = bool(app.config.get("INTAKE_ASYNC_ENGINE", True))
+        # Calls outstanding at once: async sends are only bounded by this, thread sends by the pool.
+        self.max_in_flight = int(app.config.get("INTAKE_ASYNC_MAX_IN_FLIGHT") or 200) if self.use_async else self.threads
+        self.recovery_seconds = float(app.config.get("SCAN_WRITE_BEHIND_RECOVERY_SECONDS") or 60)
+        self._next_recovery = 0.0
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        # call id -> batch (scan_session) id for sends currently in the pool.
+        self._inflight: dict[str, str | None] = {}
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+
+    def start(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked after start(): threads don't survive fork, so begin afresh.
+                self._pid = os.getpid()
+                self.owner = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+                self._thread = None
+                self._pool = None
+                self._inflight.clear()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="intake-send")
+            self._thread = threading.Thread(target=self._run, name="intake-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.use_async:
+            engine = self.app.extensions.get("intake_async_engine")
+            if engine is not None:
+                # Cancelled calls are not recorded; they stay due and are resent later.
+                engine.stop(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            with self.app.app_context():
+                self._release_lease()
+        except Exception:
+            pass
+
+    def wake(self) -> None:
+        """Ask the dispatcher to look at the outbox now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.dispatch_once()
+            except Exception:
+                self.app.logger.exception("Intake dispatcher pass failed")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    # ----------------------------
+    # Leader election
+    # ----------------------------
+
+    def acquire_lease(self) -> bool:
+        """Take or renew the lease; True if this process is the leader afterwards."""
+        now = utcnow()
+        stmt = sqlite_insert(DispatcherLease).values(
+            name=LEASE_NAME,
+            owner=self.owner,
+            expires_at=now + timedelta(seconds=self.lease_seconds),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DispatcherLease.name],
+            set_={"owner": stmt.excluded.owner, "expires_at": stmt.excluded.expires_at},
+            where=or_(DispatcherLease.owner == self.owner, DispatcherLease.expires_at < now),
+        )
+        db.session.execute(stmt)
+        db.session.commit()
+        owner = db.session.execute(
+            select(DispatcherLease.owner).where(DispatcherLease.name == LEASE_NAME)
+        ).scalar_one_or_none()
+        return owner == self.owner
+
+    def _release_lease(self) -> None:
+        lease = db.session.get(DispatcherLease, LEASE_NAME)
+        if lease is not None and lease.owner == self.owner:
+            lease.expires_at = utcnow()
+            db.session.commit()
+
+    def _recover_scans(self) -> None:
+        """Re-create write-behind scans lost with a dead worker (leader only, at most every recovery_seconds)."""
+        if not self.app.config.get("SCAN_WRITE_BEHIND") or time.monotonic() < self._next_recovery:
+            return
+        self._next_recovery = time.monotonic() + self.recovery_seconds
+        try:
+            recovered = recover_unwritten_scans(older_than=utcnow() - timedelta(seconds=self.recovery_seconds))
+        except Exception:
+            db.session.rollback()
+            self.app.logger.exception("Scan write-behind recovery failed")
+            return
+        if recovered:
+            self.app.logger.warning(f"Recovered {recovered} scan(s) lost before a write-behind flush")
+
+    # ----------------------------
+    # Draining
+    # ----------------------------
+
+    def _due_calls(self, limit: int) -> list[tuple[str, str | None]]:
+        # Only pending/retrying rows carry next_attempt_at, so this is a single
+        # range scan on ix_intake_next_attempt no matter how large the history is.
+        stmt = (
+            select(AwsIntakeCall.id, AwsIntakeCall.session_id)
+            .where(AwsIntakeCall.next_attempt_at <= utcnow())
+            .order_by(AwsIntakeCall.next_attempt_at)
+            .limit(limit)
+        )
+        return [(row.id, row.session_id) for row in db.session.execute(stmt)]
+
+    def _pick(self, due: list[tuple[str, str | None]], inflight: dict[str, str | None], free: int) -> list[tuple[str, str | None]]:
+        """Choose up to ``free`` calls, at most ``chunks_in_flight`` per batch."""
+        per_batch: dict[str | None, int] = {}
+        for batch_id in inflight.values():
+            per_batch[batch_id] = per_batch.get(batch_id, 0) + 1
+        picked = []
+        for call_id, batch_id in due:
+            if len(picked) >= free:
+                break
+            if call_id in inflight:
+                continue
+            if batch_id is not None and per_batch.get(batch_id, 0) >= self.chunks_in_flight:
+                continue
+            per_batch[batch_id] = per_batch.get(batch_id, 0) + 1
+            picked.append((call_id, batch_id))
+        return picked
+
+    def dispatch_once(self, wait_for_sends: bool = False) -> int:
+        """Run one pass: renew the lease and hand due rows to the send pool.
+
+        Returns the number of calls submitted. ``wait_for_sends`` blocks until
+        they finish (used by tests and the CLI).
+        """
+        with self.app.app_context():
+            try:
+                if not self.acquire_lease():
+                    return 0
+                self._recover_scans()
+                with self._lock:
+                    free = self.max_in_flight - len(self._inflight)
+                    inflight = dict(self._inflight)
+                if free <= 0:
+                    return 0
+                # Over-fetch so capped batches don't starve the rest of the queue.
+                due = self._due_calls(free * 4 + len(inflight))
+                picked = self._pick(due, inflight, free)
+            finally:
+                db.session.remove()
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="intake-send")
+        with self._lock:
+            for call_id, batch_id in picked:
+                self._inflight[call_id] = batch_id
+        if self.use_async:
+            futures = self._send_async([call_id for call_id, _ in picked])
+        else:
+            futures = [self._pool.submit(self._send, call_id) for call_id, _ in picked]
+        if wait_for_sends:
+            wait(futures)
+        return len(futures)
+
+    def _request_for(self, call: AwsIntakeCall) -> tuple[str, dict, dict[str, str]]:
+        headers = dict(call.request_headers or {})
+        headers.pop("Content-Type", None)
+        token = self.app.config.get("INTAKE_API_TOKEN")
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return call_url(call), call.request_body or {}, headers
+
+    def _record(self, call: AwsIntakeCall, resp: IntakeResponse) -> None:
+        record_response(call, resp, self.retry_policy)
+        db.session.commit()
+        self.app.logger.info(
+            f"Intake call {call.id} -> {call.status.value} "
+            f"(HTTP {resp.status}, {resp.duration_ms} ms, attempt {call.attempt})"
+        )
+        # Titles the API resolved feed the local catalog for the next scan of the same code.
+        learn_titles(call)
+
+    def _send(self, call_id: str) -> None:
+        try:
+            with self.app.app_context():
+                try:
+                    call = db.session.get(AwsIntakeCall, call_id)
+                    if call is None or call.status not in _SENDABLE:
+                        return
+                    url, payload, headers = self._request_for(call)
+                    resp = get_intake_client(self.app).post_json(url, payload, headers=headers)
+                    self._record(call, resp)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception(f"Intake call {call_id} could not be sent")
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._inflight.pop(call_id, None)
+
+    def _send_async(self, call_ids: list[str]) -> list[Future]:
+        """Start the HTTP calls on the async engine; each result is recorded on the pool.
+
+        Returns one future per call that completes once its outcome is committed.
+        """
+        done: dict[str, Future] = {call_id: Future() for call_id in call_ids}
+        requests = []
+        with self.app.app_context():
+            try:
+                calls = db.session.scalars(select(AwsIntakeCall).where(AwsIntakeCall.id.in_(call_ids)))
+                requests = [(call.id, self._request_for(call)) for call in calls if call.status in _SENDABLE]
+            except Exception:
+                self.app.logger.exception("Intake calls could not be loaded for sending")
+            finally:
+                db.session.remove()
+
+        engine = get_async_engine(self.app)
+        started = set()
+        for call_id, (url, payload, headers) in requests:
+            try:
+                response = engine.submit(url, payload, headers)
+            except Exception:
+                self.app.logger.exception(f"Intake call {call_id} could not be sent")
+                continue
+            started.add(call_id)
+            response.add_done_callback(lambda response, call_id=call_id: self._on_response(call_id, response, done[call_id]))
+        for call_id in call_ids:
+            if call_id not in started:
+                self._finish(call_id, done[call_id])
+        return list(done.values())
+
+    def _on_response(self, call_id: str, response: Future, done: Future) -> None:
+        # Runs on the event loop thread: hand the database work to the pool.
+        try:
+            self._pool.submit(self._record_async, call_id, response, done)
+        except RuntimeError:  # Pool already shut down.
+            self._finish(call_id, done)
+
+    def _record_async(self, call_id: str, response: Future, done: Future) -> None:
+        try:
+            if response.cancelled():
+                return  # Engine stopped mid-send: still due, so the next leader resends it.
+            with self.app.app_context():
+                try:
+                    call = db.session.get(AwsIntakeCall, call_id)
+                    if call is not None and call.status in _SENDABLE:
+                        self._record(call, response.result())
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception(f"Intake call {call_id} could not be recorded")
+                finally:
+                    db.session.remove()
+        finally:
+            self._finish(call_id, done)
+
+    def _finish(self, call_id: str, done: Future) -> None:
+        with self._lock:
+            self._inflight.pop(call_id, None)
+        done.set_result(None)
+
+
+def get_dispatcher(app: Flask | None = None) -> IntakeDispatcher:
+    app = app or current_app._get_current_object()  # type: ignore[attr-defined]
+    dispatcher = app.extensions.get("intake_dispatcher")
+    if dispatcher is None:
+        dispatcher = app.extensions.setdefault("intake_dispatcher", IntakeDispatcher(app))
+    return dispatcher
+
+
+def init_app(app: Flask) -> None:
+    """Start the dispatcher lazily on each worker's first request (after gunicorn forks)."""
+    if not app.config.get("INTAKE_DISPATCHER_ENABLED", True):
+        return
+
+    @app.before_request
+    def _start_intake_dispatcher():
+        get_dispatcher(app).start()
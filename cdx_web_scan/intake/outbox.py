@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import uuid
+from urllib.parse import urlsplit
+
+from flask import current_app
+from sqlalchemy import update
+
+from cdx_web_scan import db
+from cdx_web_scan.intake.client import IntakeResponse
+from cdx_web_scan.intake.retry import RetryPolicy, is_retryable
+from cdx_web_scan.metrics import observe_intake_call
+from cdx_web_scan.models import AwsIntakeCall, IntakeStatus, Scan, ScanSession, utcnow
+from cdx_web_scan.web_scan.catalog import learn_from_response
+
+# Non-JSON response bodies are kept as {"text": ...}, trimmed to this many characters.
+_MAX_TEXT_BODY = 4000
+
+
+def _split_url(url: str) -> tuple[str, str]:
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+def call_url(call: AwsIntakeCall) -> str:
+    return f"{call.api_base_url or ''}{call.api_path or ''}"
+
+
+def enqueue_batch(
+    items: list[dict], payloads: list[dict], intake_url: str, envelope: bool = False
+) -> tuple[ScanSession, list[AwsIntakeCall]]:
+    """Record a batch submission in the outbox (one row per payload chunk) and commit.
+
+    The batch's scans are grouped under a new ``ScanSession`` so each call can be
+    traced back to them. Nothing is sent here; the dispatcher picks the rows up.
+    With ``envelope`` each body also gets ``batch_id`` and ``chunk``
+    (``{"index", "count"}``); without it the payloads go out exactly as given.
+    """
+    batch = ScanSession(ended_at=utcnow(), notes=f"Batch submit ({len(items)} item(s))")
+    db.session.add(batch)
+    db.session.flush()
+
+    scan_ids = [item["scan_id"] for item in items if item.get("scan_id")]
+    if scan_ids:
+        db.session.execute(update(Scan).where(Scan.id.in_(scan_ids)).values(session_id=batch.id))
+
+    base_url, api_path = _split_url(intake_url)
+    now = utcnow()
+    calls: list[AwsIntakeCall] = []
+    for index, payload in enumerate(payloads):
+        # Lets the API stitch chunks back together (and dedupe re-sent ones).
+        body = {**payload, "batch_id": batch.id, "chunk": {"index": index, "count": len(payloads)}} if envelope else payload
+        idempotency_key = str(uuid.uuid4())
+        call = AwsIntakeCall(
+            session_id=batch.id,
+            idempotency_key=idempotency_key,
+            status=IntakeStatus.pending,
+            next_attempt_at=now,
+            api_base_url=base_url,
+            api_path=api_path,
+            # Never persist the bearer token; it is added at send time.
+            request_headers={"Content-Type": "application/json", "Idempotency-Key": idempotency_key},
+            request_body=body,
+        )
+        db.session.add(call)
+        calls.append(call)
+    db.session.commit()
+    return batch, calls
+
+
+def _response_json(text: str) -> dict | None:
+    try:
+        parsed = json.loads(text) if text else None
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _header(headers: dict[str, str], name: str) -> str | None:
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def record_response(call: AwsIntakeCall, resp: IntakeResponse, policy: RetryPolicy | None = None) -> None:
+    """Copy one delivery attempt's outcome onto the outbox row (caller commits).
+
+    Transient failures are rescheduled per ``policy``; without one, or once the
+    attempts are used up, the call is marked failed.
+    """
+    observe_intake_call(resp.status, resp.duration_ms)
+    parsed = _response_json(resp.body)
+    call.http_status = resp.status or None
+    call.duration_ms = resp.duration_ms
+    call.response_headers = resp.headers or None
+    call.response_body = parsed if parsed is not None else ({"text": resp.body[:_MAX_TEXT_BODY]} if resp.body else None)
+    call.error = resp.error or (None if resp.ok else f"HTTP {resp.status}")
+    if parsed:
+        correlation = parsed.get("correlation_id") or parsed.get("intake_id") or parsed.get("message_id")
+        if correlation:
+            call.correlation_id = str(correlation)[:256]
+
+    if resp.ok:
+        call.status = IntakeStatus.success
+        call.next_attempt_at = None
+        return
+
+    next_at = None
+    if policy is not None and is_retryable(resp.status):
+        next_at = policy.next_attempt_at(call.attempt, utcnow(), _header(resp.headers, "Retry-After"))
+    if next_at is None:
+        call.status = IntakeStatus.failed
+        call.next_attempt_at = None
+    else:
+        call.status = IntakeStatus.retrying
+        call.attempt += 1
+        call.next_attempt_at = next_at
+
+
+def learn_titles(call: AwsIntakeCall) -> None:
+    """Feed titles from a successful call's response to the local catalog.
+
+    Call it after the call's outcome is committed: this is its own best-effort
+    transaction, so a catalog failure (say, the table isn't there yet because
+    ``flask init-db`` wasn't re-run) can't roll back the result and get the call
+    sent again.
+    """
+    if call.status != IntakeStatus.success or not current_app.config.get("CATALOG_LEARN_FROM_INTAKE", True):
+        return
+    try:
+        learn_from_response(call.response_body)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception(f"Could not add catalog titles from intake call {call.id}")
@@ -0,0 +1,79 @@
+"""Retry scheduling for intake calls.
+
+Failed deliveries that look transient (transport errors, 408/425/429, 5xx) are
+parked as ``IntakeStatus.retrying`` with ``next_attempt_at`` pushed out by capped
+exponential backoff with full jitter, or by the server's ``Retry-After`` when it
+sends one. Jitter spreads a burst of failures out so that recovery after an
+outage doesn't hit the API with every queued batch at once.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from flask import Flask
+
+# HTTP statuses worth retrying besides 5xx; status 0 means the request never completed.
+_RETRYABLE_STATUSES = {0, 408, 425, 429}
+
+
+def is_retryable(status: int) -> bool:
+    return status in _RETRYABLE_STATUSES or 500 <= status < 600
+
+
+def parse_retry_after(value: str | None, now: datetime) -> float | None:
+    """Seconds to wait per a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 8
+    base_seconds: float = 2
+    max_delay_seconds: float = 300
+    # Upper bound on how long a Retry-After header may push a call out.
+    max_retry_after_seconds: float = 3600
+
+    @classmethod
+    def from_app(cls, app: Flask) -> RetryPolicy:
+        return cls(
+            max_attempts=int(app.config.get("INTAKE_RETRY_MAX_ATTEMPTS") or cls.max_attempts),
+            base_seconds=float(app.config.get("INTAKE_RETRY_BASE_SECONDS") or cls.base_seconds),
+            max_delay_seconds=float(app.config.get("INTAKE_RETRY_MAX_DELAY_SECONDS") or cls.max_delay_seconds),
+        )
+
+    def backoff(self, attempt: int, rng: random.Random | None = None) -> float:
+        """Full-jitter delay after the ``attempt``-th failure (1-based)."""
+        # Clamp the exponent: 2.0 ** 1100 overflows a float long before max_delay applies.
+        ceiling = min(self.max_delay_seconds, self.base_seconds * (2 ** min(max(0, attempt - 1), 30)))
+        return (rng or random).uniform(0, ceiling)
+
+    def next_attempt_at(
+        self,
+        attempt: int,
+        now: datetime,
+        retry_after: str | None = None,
+        rng: random.Random | None = None,
+    ) -> datetime | None:
+        """When to try again after ``attempt`` failed, or None once attempts are exhausted."""
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt, rng)
+        server_delay = parse_retry_after(retry_after, now)
+        if server_delay is not None:
+            # Never earlier than the server asked; keep a little jitter on top.
+            delay = min(server_delay, self.max_retry_after_seconds) + (rng or random).uniform(0, self.base_seconds)
+        return now + timedelta(seconds=delay)
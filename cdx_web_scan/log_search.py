@@ -0,0 +1,346 @@
+"""Search the application log (and its rotated copies) without reading all of it.
+
+Each log file gets a sparse index: every ``stride`` bytes, the timestamp of the
+first record that starts at or after that offset. Building it only reads a
+few hundred bytes per stride, and as the file grows only the new tail is
+probed. Indexes are keyed by ``(st_dev, st_ino)``, so when ``app.log`` is
+rotated to ``app.log.1`` its index comes along.
+
+A query bisects the index for its ``since``/``until`` window, memory-maps the
+file and reads only that byte range. A free-text or client IP filter is run
+as one regex over the mapped range, and only the records around the hits are
+parsed. Results come back newest first.
+
+Both line formats are understood:
+
+* text: ``2026-10-17 03:56:47,123 INFO : [IP: 10.0.0.5] message``. The time is
+  local, and continuation lines such as tracebacks belong to the record above.
+* json (``LOG_FORMAT=json``): one object per line with ``ts`` (UTC ISO),
+  ``level``, ``client_ip`` and ``message``.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from flask import Flask
+
+EXTENSION_KEY = "log_search_index"
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+# Workers hand records to their own logging thread, so lines from different
+# processes can be slightly out of order; widen every window by this much.
+CLOCK_SLACK_SECONDS = 5.0
+
+_TEXT_HEAD = re.compile(
+    rb"(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d),(\d{3}) ([A-Z]+) : (?:\[IP: ([^\]\n]*)\] )?"
+)
+_JSON_HEAD = b'{"ts":"'
+# How far past a stride boundary to look for the start of a record.
+_PROBE_BYTES = 64 * 1024
+
+
+class LogSearchError(ValueError):
+    """A bad search parameter (reported to the caller as HTTP 400)."""
+
+
+@dataclass
+class Record:
+    file: str
+    offset: int
+    ts: float
+    level: str
+    client_ip: str | None
+    text: str
+
+    def to_dict(self) -> dict:
+        return {
+            "file": os.path.basename(self.file),
+            "offset": self.offset,
+            "ts": datetime.fromtimestamp(self.ts).astimezone().isoformat(timespec="milliseconds"),
+            "level": self.level,
+            "client_ip": self.client_ip,
+            "text": self.text,
+        }
+
+
+def _parse_head(mm, pos: int) -> tuple[float, str, str | None] | None:
+    """(timestamp, level, client IP) if a record starts at ``pos``, else None."""
+    if mm[pos:pos + 7] == _JSON_HEAD:
+        end = mm.find(b"\n", pos)
+        try:
+            data = json.loads(mm[pos:end if end != -1 else len(mm)])
+            ts = datetime.fromisoformat(data["ts"].replace("Z", "+00:00")).timestamp()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return ts, str(data.get("level", "")), data.get("client_ip")
+    m = _TEXT_HEAD.match(mm, pos)
+    if m is None:
+        return None
+    year, month, day, hour, minute, second, ms = (int(v) for v in m.groups()[:7])
+    try:
+        ts = datetime(year, month, day, hour, minute, second, ms * 1000).timestamp()
+    except ValueError:
+        return None
+    ip = m.group(9)
+    return ts, m.group(8).decode("ascii"), ip.decode("utf-8", "replace") if ip is not None else None
+
+
+def _record_start(mm, pos: int, floor: int = 0) -> int:
+    """Offset of the record containing ``pos``: walk back over continuation lines."""
+    line = max(mm.rfind(b"\n", floor, pos) + 1, floor)
+    while line > floor and _parse_head(mm, line) is None:
+        line = max(mm.rfind(b"\n", floor, line - 1) + 1, floor)
+    return line
+
+
+def _next_record(mm, pos: int, end: int) -> int:
+    """Offset of the first record starting after ``pos`` (``end`` if none does)."""
+    while True:
+        nl = mm.find(b"\n", pos, end)
+        if nl == -1 or nl + 1 >= end:
+            return end
+        pos = nl + 1
+        if _parse_head(mm, pos) is not None:
+            return pos
+
+
+def _first_record(mm, pos: int, end: int) -> int:
+    """Offset of the first record starting at or after ``pos``."""
+    if (pos == 0 or mm[pos - 1:pos] == b"\n") and _parse_head(mm, pos) is not None:
+        return pos
+    return _next_record(mm, pos, end)
+
+
+def _record_text(mm, start: int, end: int) -> str:
+    return mm[start:end].decode("utf-8", "replace").rstrip("\n")
+
+
+@dataclass
+class FileIndex:
+    """Sparse ``timestamp -> offset`` samples for one log file (one inode)."""
+
+    stride: int
+    times: list[float] = field(default_factory=list)
+    offsets: list[int] = field(default_factory=list)
+    indexed_to: int = 0  # Bytes of the file already probed.
+    next_probe: int = 0  # The next stride boundary.
+
+    def extend(self, mm, size: int) -> None:
+        """Probe ``[indexed_to, size)`` at every stride boundary."""
+        if size < self.indexed_to:  # Truncated or reused: start over.
+            self.times.clear()
+            self.offsets.clear()
+            self.indexed_to = self.next_probe = 0
+        # Only complete lines: the last one may still be being written.
+        size = mm.rfind(b"\n", 0, size) + 1
+        pos = self.next_probe
+        while pos < size:
+            start = _first_record(mm, pos, min(size, pos + _PROBE_BYTES))
+            if start < size:
+                head = _parse_head(mm, start)
+                if head is not None and (not self.offsets or start > self.offsets[-1]):
+                    self.times.append(head[0])
+                    self.offsets.append(start)
+            pos += self.stride
+        self.next_probe = pos
+        self.indexed_to = max(self.indexed_to, size)
+
+    def window(self, since: float | None, until: float | None, size: int) -> tuple[int, int]:
+        """Byte range that holds every record from ``since`` to ``until``."""
+        start, end = 0, size
+        if since is not None and self.times:
+            i = bisect.bisect_left(self.times, since - CLOCK_SLACK_SECONDS) - 1
+            if i >= 0:
+                start = self.offsets[i]
+        if until is not None and self.times:
+            j = bisect.bisect_right(self.times, until + CLOCK_SLACK_SECONDS)
+            if j < len(self.offsets):
+                end = self.offsets[j]
+        return start, max(start, end)
+
+
+class LogIndex:
+    """Per-process cache of ``FileIndex`` objects, shared by request threads."""
+
+    def __init__(self, stride: int):
+        self.stride = max(4096, stride)
+        self._files: dict[tuple[int, int], FileIndex] = {}
+        self._lock = threading.Lock()
+
+    def window(self, st: os.stat_result, mm, since: float | None, until: float | None) -> tuple[int, int]:
+        """Bring the file's index up to ``st.st_size`` and return its byte range for the query.
+
+        Both happen under the lock: another thread's ``extend`` may append to or
+        clear the same ``FileIndex`` lists, so they are never read outside it.
+        """
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            index = self._files.get(key)
+            if index is None:
+                index = self._files[key] = FileIndex(self.stride)
+            if index.indexed_to < st.st_size:
+                index.extend(mm, st.st_size)
+            return index.window(since, until, st.st_size)
+
+    def forget_missing(self, live: set[tuple[int, int]]) -> None:
+        with self._lock:
+            for key in set(self._files) - live:
+                del self._files[key]
+
+
+def log_files(path: str, backup_count: int) -> list[str]:
+    """The live log and its rotated copies, newest first."""
+    candidates = [path] + [f"{path}.{n}" for n in range(1, max(1, backup_count) + 1)]
+    return [p for p in candidates if os.path.isfile(p)]
+
+
+def parse_time(value: str | None) -> float | None:
+    """ISO date/time -> epoch seconds. Naive input is local time, like the text log."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+    except ValueError as exc:
+        raise LogSearchError(f"Invalid time: {value}") from exc
+
+
+def _needle(text: str | None, client_ip: str | None) -> re.Pattern | None:
+    """One regex for the cheapest selective filter, run over the mapped range."""
+    if text:
+        # A case-sensitive literal (e.g. a barcode) lets re use its fast substring search.
+        flags = re.IGNORECASE if text.lower() != text.upper() else 0
+        return re.compile(re.escape(text.encode("utf-8")), flags)
+    if client_ip:
+        ip = re.escape(client_ip.encode("utf-8"))
+        return re.compile(rb"\[IP: " + ip + rb"\]|\"client_ip\":\"" + ip + rb"\"")
+    return None
+
+
+def _search_file(path, window, mm, since, until, levels, client_ip, needle, limit) -> tuple[list[Record], int]:
+    """Matches in one file's ``window`` byte range, newest first, plus the number of bytes examined."""
+    start, end = window
+    end = mm.rfind(b"\n", start, end) + 1 if end > start else start
+    found: list[Record] = []
+
+    def consider(rec_start: int, rec_end: int) -> None:
+        head = _parse_head(mm, rec_start)
+        if head is None:
+            return
+        ts, level, ip = head
+        if since is not None and ts < since or until is not None and ts >= until:
+            return
+        if levels and level not in levels:
+            return
+        if client_ip and ip != client_ip:
+            return
+        found.append(Record(path, rec_start, ts, level, ip, _record_text(mm, rec_start, rec_end)))
+
+    if needle is not None:
+        last = -1
+        for m in needle.finditer(mm, start, end):
+            if m.start() < last:
+                continue  # Another hit inside a record already considered.
+            rec_start = _record_start(mm, m.start(), start)
+            rec_end = _next_record(mm, m.start(), end)
+            consider(rec_start, rec_end)
+            last = rec_end
+    else:
+        pos = _first_record(mm, start, end)
+        while pos < end:
+            rec_end = _next_record(mm, pos, end)
+            consider(pos, rec_end)
+            pos = rec_end
+    found.reverse()
+    return found[:limit], end - start
+
+
+def search(
+    files: list[str],
+    index: LogIndex,
+    *,
+    since: float | None = None,
+    until: float | None = None,
+    levels: set[str] | None = None,
+    client_ip: str | None = None,
+    text: str | None = None,
+    limit: int = 100,
+) -> dict:
+    """Records matching every given filter across ``files`` (newest file first)."""
+    needle = _needle(text, client_ip)
+    opened = []
+    for path in files:
+        try:
+            opened.append((path, os.stat(path)))
+        except FileNotFoundError:
+            continue  # Rotated away since it was listed.
+    index.forget_missing({(st.st_dev, st.st_ino) for _, st in opened})
+
+    results: list[Record] = []
+    scanned = 0
+    for path, _ in opened:
+        if len(results) >= limit:
+            break
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), st.st_size, access=mmap.ACCESS_READ) as mm:
+                    if since is not None and _last_time(mm, st.st_size) < since - CLOCK_SLACK_SECONDS:
+                        break  # Everything here is older than the window, and older files more so.
+                    found, examined = _search_file(
+                        path, index.window(st, mm, since, until), mm, since, until, levels, client_ip, needle, limit - len(results)
+                    )
+                    results.extend(found)
+                    scanned += examined
+        except FileNotFoundError:
+            continue
+    return {
+        "results": [r.to_dict() for r in results],
+        "truncated": len(results) >= limit,
+        "scanned_bytes": scanned,
+    }
+
+
+def _last_time(mm, size: int) -> float:
+    """Timestamp of the last record in the file."""
+    head = _parse_head(mm, _record_start(mm, max(0, size - 1)))
+    return head[0] if head is not None else float("inf")
+
+
+def get_index(app: Flask) -> LogIndex:
+    index = app.extensions.get(EXTENSION_KEY)
+    if index is None:
+        index = app.extensions[EXTENSION_KEY] = LogIndex(int(app.config.get("LOG_SEARCH_INDEX_STRIDE") or 64 * 1024))
+    return index
+
+
+def search_app_log(app: Flask, args) -> dict:
+    """Run a search from request arguments (``since``, ``until``, ``level``, ``ip``, ``q``, ``limit``)."""
+    levels = {lv.strip().upper() for lv in args.get("level", "").split(",") if lv.strip()}
+    unknown = levels - set(LEVELS)
+    if unknown:
+        raise LogSearchError(f"Unknown level: {', '.join(sorted(unknown))}")
+    max_results = int(app.config.get("LOG_SEARCH_MAX_RESULTS") or 500)
+    try:
+        limit = int(args.get("limit") or 100)
+    except ValueError as exc:
+        raise LogSearchError("limit must be an integer") from exc
+    files = log_files(app.config["CDX_WEB_SCAN_LOG_FILE"], int(app.config.get("LOG_BACKUP_COUNT") or 5))
+    return search(
+        files,
+        get_index(app),
+        since=parse_time(args.get("since")),
+        until=parse_time(args.get("until")),
+        levels=levels or None,
+        client_ip=(args.get("ip") or "").strip() or None,
+        text=args.get("q") or None,
+        limit=max(1, min(limit, max_results)),
+    )
@@ -0,0 +1,304 @@
+"""Application logging: queued, rotated and optionally JSON.
+
+Request threads never touch the log file. The root logger gets a
+``QueueHandler`` and a ``QueueListener`` thread in each process does the
+writing. When gunicorn forks workers from a ``--preload``-ed app, the child
+starts its own queue and listener.
+
+Every worker appends to the same ``CDX_WEB_SCAN_LOG_FILE`` (``O_APPEND``, one
+write per record). ``SharedRotatingFileHandler`` rotates it at ``LOG_MAX_BYTES``
+and/or every ``LOG_ROTATE_SECONDS`` under an ``flock`` on ``<file>.lock``.
+Whichever process gets there first renames the files, and the others reopen
+when they see the new inode. The log viewer's ``read_since`` likewise restarts
+from the top when the inode changes or the file shrinks.
+
+``LOG_FORMAT=json`` writes one JSON object per line, with ``request_id`` and
+``client_ip``. Both are worked out at most once per request and cached on
+``flask.g``. The request ID is echoed in the ``X-Request-ID`` response header.
+"""
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import Flask, current_app, g, has_request_context, request
+
+try:  # POSIX only; without it (Windows dev servers) rotation is not coordinated.
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s : %(message)s"
+_TRACEBACKS = logging.Formatter()
+# Accept a caller's X-Request-ID only if it is short and harmless to log.
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+# ----------------------------
+# Per-request fields
+# ----------------------------
+
+def client_ip() -> str:
+    """First hop of ``X-Forwarded-For`` (nginx sets it), else the peer address."""
+    ip = g.get("client_ip")
+    if ip is None:
+        ip = g.client_ip = (request.headers.get("X-Forwarded-For") or request.remote_addr or "").split(",")[0].strip()
+    return ip
+
+
+def request_id() -> str:
+    """The caller's ``X-Request-ID`` if it looks sane, otherwise a new one."""
+    rid = g.get("request_id")
+    if rid is None:
+        incoming = request.headers.get("X-Request-ID", "")
+        rid = g.request_id = incoming if _REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+    return rid
+
+
+def log_message(message) -> str:
+    """Prefix a log message with the client IP (text format; JSON records carry it as a field)."""
+    if current_app.config.get("LOG_FORMAT") == "json":
+        return str(message)
+    return f"[IP: {client_ip()}] {message}"
+
+
+# ----------------------------
+# Formatting and handlers
+# ----------------------------
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "client_ip"):
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            data["exc"] = exc
+        return json.dumps(data, separators=(",", ":"), default=str)
+
+
+class _RequestFields(logging.Filter):
+    """Runs on the thread that logged, while its request context is still available."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = request_id()
+            record.client_ip = client_ip()
+        return True
+
+
+class _PlainQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, leave the formatting to the file handler: only
+        # resolve the message and traceback to text so the record can cross threads.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SharedRotatingFileHandler(logging.FileHandler):
+    """Append-mode file handler that several processes can write and rotate.
+
+    Rollover happens under an ``flock`` on ``<file>.lock``. The lock file also
+    records which ``rotate_seconds`` period the current file belongs to, so
+    exactly one process does each time-based rollover.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 0, rotate_seconds: float = 0, backup_count: int = 5, encoding: str = "utf-8"):
+        super().__init__(filename, mode="a", encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = max(1, backup_count)
+        self.lock_path = self.baseFilename + ".lock"
+        # Unknown until the first write checks the lock file: the file may be from an earlier period.
+        self._period: int | None = None
+
+    def _current_period(self) -> int:
+        return int(time.time() // self.rotate_seconds) if self.rotate_seconds > 0 else 0
+
+    def _reopen_if_moved(self) -> None:
+        """Another process rotated (or someone deleted) the file we have open."""
+        if self.stream is None:
+            return
+        try:
+            moved = not os.path.samestat(os.stat(self.baseFilename), os.fstat(self.stream.fileno()))
+        except FileNotFoundError:
+            moved = True
+        if moved:
+            self.stream.close()
+            self.stream = None  # Reopened by FileHandler.emit.
+
+    def _due(self, size: int) -> bool:
+        if self.max_bytes > 0 and size >= self.max_bytes:
+            return True
+        return self.rotate_seconds > 0 and self._period != self._current_period()
+
+    def _rollover(self) -> None:
+        with open(self.lock_path, "a+", encoding="utf-8") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            lock.seek(0)
+            recorded = lock.read().strip()
+            period = self._current_period()
+            try:
+                size = os.path.getsize(self.baseFilename)
+            except FileNotFoundError:
+                size = 0
+            time_due = self.rotate_seconds > 0 and recorded.isdigit() and int(recorded) != period
+            size_due = self.max_bytes > 0 and size >= self.max_bytes
+            if (time_due or size_due) and size > 0:
+                if self.stream is not None:
+                    self.stream.close()
+                    self.stream = None
+                for n in range(self.backup_count - 1, 0, -1):
+                    older = f"{self.baseFilename}.{n}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{self.baseFilename}.{n + 1}")
+                os.replace(self.baseFilename, self.baseFilename + ".1")
+            if recorded != str(period):
+                lock.seek(0)
+                lock.truncate()
+                lock.write(str(period))
+            self._period = period
+        # The flock is released when the lock file closes.
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._reopen_if_moved()
+            if self.max_bytes > 0 or self.rotate_seconds > 0:
+                size = os.fstat(self.stream.fileno()).st_size if self.stream is not None else 0
+                if self._due(size):
+                    self._rollover()
+        except OSError:
+            pass  # Can't rotate (e.g. a Windows file lock); keep appending.
+        super().emit(record)
+
+
+# ----------------------------
+# Setup
+# ----------------------------
+
+class _QueuedLogging:
+    """One process's queue + listener feeding the file handler."""
+
+    def __init__(self, file_handler: logging.Handler):
+        self.file_handler = file_handler
+        self.handler = _PlainQueueHandler(queue.SimpleQueue())
+        self.handler.addFilter(_RequestFields())
+        self.listener: QueueListener | None = None
+
+    def start(self) -> None:
+        self.listener = QueueListener(self.handler.queue, self.file_handler, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+        self.listener = None
+
+    def after_fork(self) -> None:
+        # The parent's listener thread doesn't exist here; give the child its own queue and thread.
+        self.handler.queue = queue.SimpleQueue()
+        self.listener = None
+        self.start()
+
+
+_active: _QueuedLogging | None = None
+_direct: logging.Handler | None = None
+
+
+def _stop_active() -> None:
+    if _active is not None:
+        _active.stop()
+
+
+def _after_fork_in_child() -> None:
+    if _active is not None:
+        _active.after_fork()
+
+
+atexit.register(_stop_active)
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def flush() -> None:
+    """Block until every record queued so far has been written."""
+    if _active is not None:
+        _active.stop()  # QueueListener.stop drains the queue first.
+        _active.start()
+
+
+def configure_logging(app: Flask) -> None:
+    """Point the root logger at this app's log file, replacing any earlier setup."""
+    global _active, _direct
+    config = app.config
+    file_handler = SharedRotatingFileHandler(
+        config["CDX_WEB_SCAN_LOG_FILE"],
+        max_bytes=int(config.get("LOG_MAX_BYTES") or 0),
+        rotate_seconds=float(config.get("LOG_ROTATE_SECONDS") or 0),
+        backup_count=int(config.get("LOG_BACKUP_COUNT") or 5),
+    )
+    file_handler.setFormatter(JsonFormatter() if config.get("LOG_FORMAT") == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    if _active is not None:
+        root.removeHandler(_active.handler)
+        _active.stop()
+        _active.file_handler.close()
+        _active = None
+    if _direct is not None:
+        root.removeHandler(_direct)
+        _direct.close()
+        _direct = None
+
+    if config.get("LOG_QUEUE", True):
+        _active = _QueuedLogging(file_handler)
+        _active.start()
+        root.addHandler(_active.handler)
+    else:
+        _direct = file_handler
+        file_handler.addFilter(_RequestFields())
+        root.addHandler(file_handler)
+    root.setLevel(logging.INFO)
+
+
+def init_app(app: Flask) -> None:
+    configure_logging(app)
+
+    @app.after_request
+    def _echo_request_id(response):
+        response.headers["X-Request-ID"] = request_id()
+        return response
+
+    if app.config.get("LOG_REQUESTS"):
+        @app.before_request
+        def _log_request_start():
+            g.log_started = time.perf_counter()
+
+        @app.after_request
+        def _log_request(response):
+            started = g.pop("log_started", None)
+            elapsed = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+            app.logger.info(log_message(f"{request.method} {request.full_path.rstrip('?')} -> {response.status_code} ({elapsed:.1f} ms)"))
+            return response
@@ -0,0 +1,128 @@
+"""Pure-Python log tailing for the log viewer (no ``tail``/PowerShell subprocesses).
+
+Offsets are byte positions in the log file. Readers hand out offsets that sit
+just after a newline, so a partially written line is picked up whole on the
+next read (only a line longer than ``read_since``'s ``max_bytes`` is split). Each offset comes with the inode it belongs to: after a
+rotation the new file can already be longer than the old offset, so a size
+check alone would miss it.
+"""
+from __future__ import annotations
+
+import codecs
+import os
+import time
+from typing import Iterator
+
+_BLOCK_SIZE = 8192
+
+
+def tail_lines(path: str, lines: int, block_size: int = _BLOCK_SIZE) -> tuple[str, int, int]:
+    """Last ``lines`` complete lines of ``path``, the offset just after them and the file's inode.
+
+    Reads backwards from EOF in ``block_size`` chunks, so cost depends on the
+    amount of text returned, not on the size of the file.
+    """
+    with open(path, "rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        pos = end
+        # One newline more than ``lines`` (before any trailing partial line)
+        # marks the start of the first line wanted.
+        while pos > 0 and data.count(b"\n") <= lines:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    # Drop a trailing partial line (still being written); it is read whole later.
+    complete = data[: data.rfind(b"\n") + 1]
+    offset = end - (len(data) - len(complete))
+    if lines <= 0 or not complete:
+        return "", offset, inode
+    kept = complete.split(b"\n")[:-1][-lines:]
+    return (b"\n".join(kept) + b"\n").decode("utf-8", errors="replace"), offset, inode
+
+
+def read_since(path: str, offset: int, inode: int | None = None, max_bytes: int = 1 << 20) -> tuple[str, int, bool, int]:
+    """Complete lines appended after ``offset`` (at most ``max_bytes``).
+
+    Returns ``(text, new_offset, reset, inode)``. ``reset`` is True when the
+    file is no longer the one ``offset`` was taken from: a different inode
+    (rotated) or shorter than ``offset`` (truncated). Reading then restarts
+    from the beginning of the current file. A single line longer than
+    ``max_bytes`` is returned in pieces, so the offset then lands mid-line.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        reset = offset > st.st_size or (inode is not None and inode != st.st_ino)
+        if reset:
+            offset = 0
+        if offset >= st.st_size:
+            return "", offset, reset, st.st_ino
+        f.seek(offset)
+        data = f.read(min(st.st_size - offset, max_bytes))
+    last_nl = data.rfind(b"\n")
+    if last_nl == -1:
+        if len(data) < max_bytes:
+            return "", offset, reset, st.st_ino
+        # One line longer than max_bytes: hand it out in pieces rather than
+        # stall on it, cut on a UTF-8 character boundary.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        text = decoder.decode(data)
+        return text, offset + len(data) - len(decoder.getstate()[0]), reset, st.st_ino
+    data = data[: last_nl + 1]
+    return data.decode("utf-8", errors="replace"), offset + len(data), reset, st.st_ino
+
+
+def event_id(inode: int, offset: int) -> str:
+    """SSE ``id`` for a position: ``<inode>:<offset>``."""
+    return f"{inode}:{offset}"
+
+
+def parse_event_id(value: str | None) -> tuple[int | None, int] | None:
+    """``(inode, offset)`` from ``event_id`` output (or a bare offset); None if unparseable."""
+    if not value:
+        return None
+    inode, _, offset = value.rpartition(":")
+    try:
+        return (int(inode) if inode else None), int(offset)
+    except ValueError:
+        return None
+
+
+def follow(
+    path: str,
+    offset: int,
+    inode: int | None = None,
+    poll_seconds: float = 1.0,
+    max_seconds: float = 60.0,
+    heartbeat_seconds: float = 15.0,
+) -> Iterator[str]:
+    """Server-Sent Events for lines appended after ``offset``.
+
+    Each event carries its inode and end offset as the SSE ``id`` (see
+    ``event_id``) so a reconnecting ``EventSource`` resumes via ``Last-Event-ID``. The stream ends after
+    ``max_seconds`` so a viewer can't pin a gunicorn thread indefinitely; the
+    browser reconnects on its own.
+    """
+    started = last_sent = time.monotonic()
+    yield f"retry: {int(poll_seconds * 1000)}\n\n"
+    while time.monotonic() - started < max_seconds:
+        try:
+            text, new_offset, reset, new_inode = read_since(path, offset, inode)
+        except OSError:
+            text, new_offset, reset, new_inode = "", offset, False, inode
+        inode = new_inode
+        if reset:
+            offset = 0
+            yield f"event: reset\nid: {event_id(inode, offset)}\ndata: \n\n"
+        if text:
+            offset = new_offset
+            data = "\n".join(f"data: {line}" for line in text.rstrip("\n").split("\n"))
+            yield f"id: {event_id(inode, offset)}\n{data}\n\n"
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= heartbeat_seconds:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        time.sleep(poll_seconds)
@@ -0,0 +1,139 @@
+# /cdx_web_scan/log_viewer.py
+
+# Python Imports
+import os
+import threading
+
+# Third party imports
+from flask import Blueprint, Response, current_app, jsonify, render_template, request
+
+# Local imports
+from cdx_web_scan import log_search, log_tail
+from cdx_web_scan.log_setup import log_message
+
+# blueprint router configuration
+log_viewer = Blueprint("log_viewer", __name__)
+
+# Open SSE streams in this process (each one pins a worker thread).
+_streams_lock = threading.Lock()
+_open_streams = 0
+
+
+def _claim_stream_slot(limit: int) -> bool:
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= limit:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _release_stream_slot() -> None:
+    global _open_streams
+    with _streams_lock:
+        _open_streams -= 1
+
+
+@log_viewer.route("/view-log")
+def view_log():
+    """Display the log viewer (in a new tab)."""
+    current_app.logger.info(log_message("Processing /view-log route..."))
+    return render_template("view_log.html")
+
+
+@log_viewer.route("/get-log")
+def get_log():
+    """Get the last x lines of the application log file.
+
+    With ``?since=<byte offset>`` (and ``&inode=``) only the complete lines
+    written after that offset are returned. Either way the ``X-Log-Offset`` and
+    ``X-Log-Inode`` headers carry what to pass as ``since`` and ``inode`` on
+    the next poll.
+    """
+    current_app.logger.debug(log_message("Processing /get-log route..."))
+    log_file_path = current_app.config["CDX_WEB_SCAN_LOG_FILE"]
+    lines_to_show = int(current_app.config["LOG_LINES_TO_SHOW"])
+    if not os.path.exists(log_file_path):
+        return jsonify({"error": "Log file not found"}), 404
+
+    since = request.args.get("since", type=int)
+    reset = False
+    try:
+        if since is None:
+            log_content, offset, inode = log_tail.tail_lines(log_file_path, lines_to_show)
+        else:
+            log_content, offset, reset, inode = log_tail.read_since(
+                log_file_path, max(0, since), request.args.get("inode", type=int)
+            )
+    except OSError as e:
+        current_app.logger.error(log_message(f"Error reading log file: {e}"))
+        return jsonify({"error": "Error reading log file"}), 500
+
+    response = Response(log_content, mimetype="text/plain")
+    response.headers["X-Log-Offset"] = str(offset)
+    response.headers["X-Log-Inode"] = str(inode)
+    if reset:
+        response.headers["X-Log-Reset"] = "1"
+    return response
+
+
+@log_viewer.route("/get-log/stream")
+def get_log_stream():
+    """Stream lines appended to the log file as Server-Sent Events.
+
+    Starts at ``Last-Event-ID`` or ``?since=`` (and ``&inode=``) if given,
+    otherwise at the current end of the file (fetch ``/get-log`` first for the
+    backlog). Only with ``LOG_STREAM_ENABLED``; when this process already has
+    ``LOG_STREAM_MAX_CONCURRENT`` streams open it answers 503 and the viewer
+    polls instead.
+    """
+    config = current_app.config
+    if not config.get("LOG_STREAM_ENABLED"):
+        return jsonify({"error": "Log streaming is disabled"}), 404
+    log_file_path = config["CDX_WEB_SCAN_LOG_FILE"]
+    if not os.path.exists(log_file_path):
+        return jsonify({"error": "Log file not found"}), 404
+
+    inode, since = log_tail.parse_event_id(request.headers.get("Last-Event-ID")) or (
+        request.args.get("inode", type=int),
+        request.args.get("since", type=int),
+    )
+    if since is None:
+        _, since, inode = log_tail.tail_lines(log_file_path, 0)
+
+    if not _claim_stream_slot(int(config.get("LOG_STREAM_MAX_CONCURRENT") or 0)):
+        return jsonify({"error": "Too many log streams; poll /get-log instead"}), 503
+
+    stream = log_tail.follow(
+        log_file_path,
+        max(0, since),
+        inode,
+        poll_seconds=config["LOG_STREAM_POLL_SECONDS"],
+        max_seconds=config["LOG_STREAM_MAX_SECONDS"],
+    )
+    response = Response(stream, mimetype="text/event-stream")
+    # The WSGI server closes the response however the stream ends (even unread).
+    response.call_on_close(_release_stream_slot)
+    response.headers["Cache-Control"] = "no-cache"
+    # Tell nginx not to buffer the stream.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@log_viewer.route("/get-log/search")
+def get_log_search():
+    """Search the log and its rotated copies; newest matches first, as JSON.
+
+    Filters (all optional, combined): ``since``/``until`` (ISO time, naive is
+    server local time), ``level`` (comma-separated), ``ip``, ``q`` (free text,
+    case-insensitive) and ``limit``.
+    """
+    current_app.logger.debug(log_message("Processing /get-log/search route..."))
+    try:
+        result = log_search.search_app_log(current_app, request.args)
+    except log_search.LogSearchError as e:
+        return jsonify({"error": str(e)}), 400
+    except OSError as e:
+        current_app.logger.error(log_message(f"Error searching log files: {e}"))
+        return jsonify({"error": "Error reading log file"}), 500
+    return jsonify(result)
@@ -0,0 +1,382 @@
+"""Prometheus metrics for requests, the database and intake calls.
+
+    GET /metrics   (text exposition format 0.0.4)
+
+Each process records into an in-memory ``Registry`` (a lock and a few dict
+updates per observation) and a daemon thread snapshots it to
+``METRICS_DIR/boot-<boot id>/metrics-<pid>-<process token>.json`` every
+``METRICS_FLUSH_SECONDS``. ``/metrics`` merges every worker's snapshot with its
+own live values, so whichever gunicorn worker answers the scrape reports totals
+for all of them. Counters and histograms of workers that have exited are kept
+(totals never go backwards); their gauges are dropped. The process token keeps a
+new worker that reuses a dead worker's pid from overwriting its snapshot.
+
+The boot id is made when the app is built (the ``--preload`` master) and passed
+to the forked workers in ``CDX_WEB_SCAN_BOOT_ID``, so one service run shares one
+directory and a restart starts from zero. That process also removes directories
+of earlier runs whose workers have all exited. Without ``--preload``, set
+``CDX_WEB_SCAN_BOOT_ID`` per run so the workers share a directory.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+
+# Shared by the processes of one service run (see the module docstring).
+BOOT_ID_ENV = "CDX_WEB_SCAN_BOOT_ID"
+
+# Seconds; request and DB timings are mostly well under one.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    """Counters, gauges and histograms keyed by metric name and label values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: dict[str, tuple[str, str, tuple[str, ...], tuple[float, ...] | None]] = {}
+        self._values: dict[str, dict[tuple[str, ...], object]] = {}
+        self.version = 0
+        self.pid = os.getpid()
+        # Tells this process's snapshot apart from an exited one that had the same pid.
+        self.process = uuid.uuid4().hex[:8]
+
+    def _register(self, kind, name, help_text, labels, buckets=None):
+        self._meta[name] = (kind, help_text, tuple(labels), tuple(buckets) if buckets else None)
+        self._values[name] = {}
+        return _Metric(self, name)
+
+    def counter(self, name: str, help_text: str, labels=()):
+        return self._register("counter", name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels=()):
+        return self._register("gauge", name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register("histogram", name, help_text, labels, buckets)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: [[list(labels), list(v) if isinstance(v, list) else v] for labels, v in values.items()]
+                for name, values in self._values.items()
+            }
+
+    def adopt(self) -> None:
+        """After a fork, drop values inherited from the parent (they are its, not ours)."""
+        with self._lock:
+            if self.pid != os.getpid():
+                for values in self._values.values():
+                    values.clear()
+                self.pid = os.getpid()
+                self.process = uuid.uuid4().hex[:8]
+                self.version += 1
+
+
+class _Metric:
+    """One metric's series; holds its dict directly so an update is a few lookups under the lock."""
+
+    __slots__ = ("_registry", "_values", "_buckets")
+
+    def __init__(self, registry: Registry, name: str):
+        self._registry = registry
+        self._values = registry._values[name]
+        self._buckets = registry._meta[name][3]
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        registry = self._registry
+        with registry._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+            registry.version += 1
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def observe(self, value: float, *labels: str) -> None:
+        registry = self._registry
+        with registry._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then the sum.
+                state = self._values[labels] = [0] * (len(self._buckets) + 1) + [0.0]
+            state[bisect_left(self._buckets, value)] += 1
+            state[-1] += value
+            registry.version += 1
+
+
+REGISTRY = Registry()
+
+HTTP_DURATION = REGISTRY.histogram(
+    "cdx_http_request_duration_seconds", "Time to produce a response, by route.", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("cdx_http_requests_in_flight", "Requests being handled right now.", ("route",))
+DB_COMMIT = REGISTRY.histogram("cdx_db_commit_seconds", "Session.commit() time, including the flush it triggers.")
+DB_STATEMENT = REGISTRY.histogram(
+    "cdx_db_statement_seconds",
+    "SQL statement execution time; on SQLite, writes include waiting for the write lock.",
+    ("kind",),
+)
+DB_LOCKED = REGISTRY.counter("cdx_db_locked_errors_total", "Statements that failed with 'database is locked'.")
+INTAKE_CALLS = REGISTRY.histogram(
+    "cdx_intake_call_duration_seconds",
+    "Intake API call latency by HTTP status (0 = transport error).",
+    ("http_status",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0),
+)
+
+
+def observe_intake_call(http_status: int, duration_ms: int) -> None:
+    INTAKE_CALLS.observe(duration_ms / 1000, str(http_status))
+
+
+class _Flusher:
+    """Writes this process's snapshot to ``METRICS_DIR`` in the background."""
+
+    def __init__(self, registry: Registry, directory: Path, interval: float):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.pid = os.getpid()
+        self.process = registry.process
+        self._written_version = -1
+        self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"metrics-{self.pid}-{self.process}.json"
+
+    def start(self) -> None:
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def flush(self) -> None:
+        version = self.registry.version
+        if version == self._written_version:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        snapshot = {"pid": self.pid, "process": self.process, "metrics": self.registry.snapshot()}
+        tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._written_version = version
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except OSError:
+                pass  # Disk full / dir removed: keep serving; the next flush retries.
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _snapshot_pid(path: Path) -> int | None:
+    # metrics-<pid>-<process>.json (or metrics-<pid>.json from older versions).
+    pid = path.stem.split("-")[1] if path.stem.count("-") >= 1 else ""
+    return int(pid) if pid.isdigit() else None
+
+
+def _remove_finished_runs(root: Path, current: Path) -> None:
+    """Delete snapshots of earlier service runs whose processes have all exited."""
+    if not root.is_dir():
+        return
+    for boot in root.glob("boot-*"):
+        if boot == current or not boot.is_dir():
+            continue
+        pids = [_snapshot_pid(path) for path in boot.glob("metrics-*.json")]
+        if not any(pid is not None and _pid_alive(pid) for pid in pids):
+            shutil.rmtree(boot, ignore_errors=True)
+    # Snapshots written straight into METRICS_DIR before runs had their own directory.
+    for path in root.glob("metrics-*.json"):
+        pid = _snapshot_pid(path)
+        if pid is None or not _pid_alive(pid):
+            path.unlink(missing_ok=True)
+
+
+def boot_directory(root: Path) -> Path:
+    """This service run's snapshot directory under ``root`` (METRICS_DIR)."""
+    boot_id = os.environ.get(BOOT_ID_ENV)
+    if not boot_id:
+        # First process of the run: forked workers inherit the id through the environment.
+        boot_id = os.environ[BOOT_ID_ENV] = uuid.uuid4().hex[:12]
+        _remove_finished_runs(root, root / f"boot-{boot_id}")
+    return root / f"boot-{boot_id}"
+
+
+def collect(registry: Registry, directory: Path | None) -> dict[str, dict[tuple, object]]:
+    """This process's live values merged with every other process's last snapshot."""
+    snapshots = [(os.getpid(), registry.snapshot())]
+    if directory is not None and directory.is_dir():
+        for path in directory.glob("metrics-*.json"):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if data.get("process") != registry.process:
+                snapshots.append((data.get("pid"), data.get("metrics") or {}))
+
+    merged: dict[str, dict[tuple, object]] = {name: {} for name in registry._meta}
+    for pid, metrics in snapshots:
+        alive = None
+        for name, series in metrics.items():
+            meta = registry._meta.get(name)
+            if meta is None:
+                continue
+            if meta[0] == "gauge":
+                if alive is None:
+                    alive = pid == os.getpid() or _pid_alive(pid)
+                if not alive:
+                    continue
+            target = merged[name]
+            for labels, value in series:
+                key = tuple(labels)
+                if isinstance(value, list):
+                    current = target.get(key)
+                    target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = target.get(key, 0) + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(registry: Registry, merged: dict[str, dict[tuple, object]]) -> str:
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in registry._meta.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(merged.get(name, {}).items()):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value[:-1]):
+                cumulative += count
+                le = 'le="%s"' % (bound if bound == "+Inf" else repr(float(bound)))
+                lines.append(f"{name}_bucket{_labels(label_names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _route() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _instrument_db(db) -> None:
+    engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        kind = "write" if context.isinsert or context.isupdate or context.isdelete else "read"
+        DB_STATEMENT.observe(time.perf_counter() - context._metrics_started, kind)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if "database is locked" in str(context.original_exception):
+            DB_LOCKED.inc()
+
+    # db.session is shared by every app built from this package; hook it once.
+    if not event.contains(db.session, "before_commit", _before_commit):
+        event.listen(db.session, "before_commit", _before_commit)
+        event.listen(db.session, "after_commit", _after_commit)
+
+
+def _before_commit(session):
+    session.info["metrics_commit_started"] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop("metrics_commit_started", None)
+    if started is not None:
+        DB_COMMIT.observe(time.perf_counter() - started)
+
+
+_flusher_lock = threading.Lock()
+
+
+def _ensure_flusher(app: Flask, directory: Path, interval: float) -> None:
+    flusher = app.extensions.get("metrics_flusher")
+    if flusher is None or flusher.pid != os.getpid():
+        with _flusher_lock:
+            flusher = app.extensions.get("metrics_flusher")
+            if flusher is None or flusher.pid != os.getpid():
+                # Threads don't survive a fork; start one per worker on its first request.
+                REGISTRY.adopt()
+                flusher = app.extensions["metrics_flusher"] = _Flusher(REGISTRY, directory, interval)
+                flusher.start()
+
+
+def init_app(app: Flask, db) -> None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    directory = boot_directory(Path(app.config["METRICS_DIR"])) if app.config.get("METRICS_DIR") else None
+    interval = float(app.config.get("METRICS_FLUSH_SECONDS") or 5)
+
+    with app.app_context():
+        _instrument_db(db)
+
+    @app.before_request
+    def _metrics_start():
+        if directory is not None:
+            _ensure_flusher(app, directory, interval)
+        g.metrics_route = _route()
+        g.metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(g.metrics_route)
+
+    @app.after_request
+    def _metrics_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        route = g.pop("metrics_route")
+        HTTP_IN_FLIGHT.dec(route)
+        status = g.pop("metrics_status", 500)
+        HTTP_DURATION.observe(time.perf_counter() - started, request.method, route, str(status))
+
+    @app.route("/metrics")
+    def metrics():
+        body = render(REGISTRY, collect(REGISTRY, directory))
+        return Response(body, mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -93,6 +93,13 @@ class ScanSession(db.Model):
         passive_deletes=True,
     )
 
+    intake_calls: Mapped[List["AwsIntakeCall"]] = relationship(
+        back_populates="session",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="AwsIntakeCall.created_at.asc()",
+    )
+
 class Scan(db.Model):
     """
     Canonical scan event (one user action that captures 1+ barcodes).
@@ -158,6 +165,11 @@ class Scan(db.Model):
 
     __table_args__ = (
         Index("ix_scan_created_source", "created_at", "source"),
+        # Keyset pagination for /history: each filter's page is one index range scan.
+        Index("ix_scan_created_id", "created_at", "id"),
+        Index("ix_scan_source_created_id", "source", "created_at", "id"),
+        Index("ix_scan_operator_created_id", "operator", "created_at", "id"),
+        Index("ix_scan_session_created_id", "session_id", "created_at", "id"),
     )
 
 class BarcodeCapture(db.Model):
@@ -220,10 +232,19 @@ class AwsIntakeCall(db.Model):
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_uuid)
 
-    scan_id: Mapped[str] = mapped_column(
+    # Single-scan calls point at the scan; batch submissions leave this NULL and
+    # point at the scan_session that groups the batch's scans instead.
+    scan_id: Mapped[Optional[str]] = mapped_column(
         String(36),
         ForeignKey("scan.id", ondelete="CASCADE"),
-        nullable=False,
+        nullable=True,
+        index=True,
+    )
+
+    session_id: Mapped[Optional[str]] = mapped_column(
+        String(36),
+        ForeignKey("scan_session.id", ondelete="CASCADE"),
+        nullable=True,
         index=True,
     )
 
@@ -235,6 +256,10 @@ class AwsIntakeCall(db.Model):
     attempt: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     status: Mapped[IntakeStatus] = mapped_column(Enum(IntakeStatus), default=IntakeStatus.pending, nullable=False, index=True)
 
+    # When the dispatcher should (re)send this call. Set while pending/retrying,
+    # cleared once the call is terminal, so "what is due" is one index range scan.
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
     # Where you sent it (useful if you have dev/stage/prod)
     api_base_url: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     api_path: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
@@ -257,12 +282,108 @@ class AwsIntakeCall(db.Model):
     # Optional: if API returns an intake id / correlation id / sqs message id, store it
     correlation_id: Mapped[Optional[str]] = mapped_column(String(256), nullable=True, index=True)
 
-    scan: Mapped["Scan"] = relationship(back_populates="intake_calls")
+    scan: Mapped[Optional["Scan"]] = relationship(back_populates="intake_calls")
+    session: Mapped[Optional["ScanSession"]] = relationship(back_populates="intake_calls")
 
     __table_args__ = (
         # For safety: prevent duplicate rows for same scan + idempotency key.
         UniqueConstraint("scan_id", "idempotency_key", name="uq_intake_scan_idempotency"),
+        # Same for batch calls, whose scan_id is NULL (NULLs never collide in a UNIQUE constraint).
+        # An index rather than a constraint so `flask init-db` can add it to existing tables.
+        Index("uq_intake_session_idempotency", "session_id", "idempotency_key", unique=True),
         Index("ix_intake_scan_attempt", "scan_id", "attempt"),
+        Index("ix_intake_next_attempt", "next_attempt_at"),
+        # Time-range exports.
+        Index("ix_intake_created", "created_at"),
+    )
+
+
+
+
+class DispatcherLease(db.Model):
+    """
+    Leader lease for background workers that must run in only one process
+    (e.g. the intake outbox dispatcher across gunicorn workers).
+    """
+    __tablename__ = "dispatcher_lease"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    owner: Mapped[str] = mapped_column(String(128), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class BatchItem(db.Model):
+    """
+    One entry in an operator's working batch (the list shown under "Current Batch").
+
+    The browser session only carries an opaque ``batch_token``; the items live here
+    so request size stays flat no matter how many discs are in the batch.
+    """
+    __tablename__ = "batch_item"
+
+    # Autoincrement id doubles as the insertion order for paging.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    batch_token: Mapped[str] = mapped_column(String(36), nullable=False)
+
+    code: Mapped[str] = mapped_column(String(64), nullable=False)
+    source: Mapped[str] = mapped_column(String(32), nullable=False)
+    format: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    title: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # ISO-8601 string, exactly as rendered into <time datetime="...">.
+    captured_at: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    # The persisted scan for this item, when the DB write succeeded.
+    scan_id: Mapped[Optional[str]] = mapped_column(
+        String(36),
+        ForeignKey("scan.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+
+    __table_args__ = (
+        # Delete-by-code / duplicate check is a single index probe.
+        UniqueConstraint("batch_token", "code", name="uq_batch_item_token_code"),
+        # Paged reads walk one token's rows in insertion order.
+        Index("ix_batch_item_token_id", "batch_token", "id"),
     )
 
 
+class BatchVersion(db.Model):
+    """
+    Write counter per working batch, bumped in the same transaction as every
+    ``batch_item`` change. In-process caches compare it to decide whether
+    their copy of a batch is still current (a single primary-key probe).
+    """
+    __tablename__ = "batch_version"
+
+    batch_token: Mapped[str] = mapped_column(String(36), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class CatalogEntry(db.Model):
+    """
+    Local barcode -> title catalog used to fill in titles at scan time.
+
+    Loaded in bulk by ``flask import-catalog`` (CSV / NDJSON) and learned from
+    titles the intake API sends back. Keyed on the GTIN-14, in a WITHOUT ROWID
+    table, so a lookup is a single primary-key b-tree probe.
+    """
+    __tablename__ = "catalog_entry"
+
+    gtin: Mapped[str] = mapped_column(String(14), primary_key=True)
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    artist: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    label: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # "import" or "intake"; intake responses never overwrite imported rows.
+    source: Mapped[str] = mapped_column(String(16), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+    __table_args__ = (
+        # MAX(updated_at) is the catalog version in the batch fragment's ETag.
+        Index("ix_catalog_updated", "updated_at"),
+        {"sqlite_with_rowid": False},
+    )
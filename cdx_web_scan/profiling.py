@@ -0,0 +1,269 @@
+"""Opt-in per-request profiling (``PROFILING_ENABLED``).
+
+For every request it records the wall time split into database (cursor
+execute time), template rendering, session load/save and everything else, plus
+the number and text of the SQL statements run. Records are appended as JSON
+lines to ``PROFILING_DIR/requests-<pid>.jsonl``, which is rotated by size. Each
+worker gets its own file, so rotating one never races another process.
+
+With ``PROFILING_CPROFILE_RATE`` > 0, that fraction of requests also runs under
+cProfile. Requests slower than ``PROFILING_SLOW_MS`` keep a ``.pstats`` dump
+and the rest are discarded. Since Python 3.12 cProfile is process-wide, so at
+most one request is sampled at a time, and its profile can include other
+threads.
+
+``/debug/profile`` lists the slowest recent requests across all workers, and
+``/debug/profile/<dump>`` shows a dump's top functions.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from flask import Flask, abort, before_render_template, render_template, request, template_rendered
+from sqlalchemy import event
+from werkzeug.utils import secure_filename
+
+from cdx_web_scan import log_tail
+from cdx_web_scan.models import utcnow
+
+_local = threading.local()
+# Only one cProfile profiler can be active per process.
+_cprofile_lock = threading.Lock()
+
+
+@dataclass
+class RequestProfile:
+    method: str
+    path: str
+    endpoint: str | None = None
+    status: int = 500
+    started: float = field(default_factory=time.perf_counter)
+    db_seconds: float = 0.0
+    render_seconds: float = 0.0
+    session_seconds: float = 0.0
+    sql_count: int = 0
+    statements: list[str] = field(default_factory=list)
+    profiler: cProfile.Profile | None = None
+    render_started: float | None = None
+
+    def record(self, wall: float) -> dict:
+        other = max(0.0, wall - self.db_seconds - self.render_seconds - self.session_seconds)
+        return {
+            "at": utcnow().isoformat(),
+            "pid": os.getpid(),
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "wall_ms": round(wall * 1000, 3),
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "render_ms": round(self.render_seconds * 1000, 3),
+            "session_ms": round(self.session_seconds * 1000, 3),
+            "other_ms": round(other * 1000, 3),
+            "sql_count": self.sql_count,
+            "sql": self.statements,
+            "profile": None,
+        }
+
+
+def current() -> RequestProfile | None:
+    return getattr(_local, "profile", None)
+
+
+class _TimedSessionInterface:
+    """Delegates to the app's session interface and starts each request's profile.
+
+    Opening the session is the first thing Flask does for a request, so the
+    profile's wall time and session time both include it.
+    """
+
+    def __init__(self, inner, start_profile):
+        self._inner = inner
+        self._start_profile = start_profile
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def open_session(self, app, request):
+        profile = self._start_profile(request)
+        try:
+            return self._inner.open_session(app, request)
+        finally:
+            profile.session_seconds += time.perf_counter() - profile.started
+
+    def save_session(self, app, session, response):
+        started = time.perf_counter()
+        try:
+            return self._inner.save_session(app, session, response)
+        finally:
+            if (profile := current()) is not None:
+                profile.session_seconds += time.perf_counter() - started
+
+
+def _instrument_db(db, max_statements: int, max_statement_chars: int) -> None:
+    engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current()
+        if profile is None:
+            return
+        profile.sql_count += 1
+        if len(profile.statements) < max_statements:
+            profile.statements.append(statement[:max_statement_chars])
+        context._profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current()
+        started = getattr(context, "_profile_started", None)
+        if profile is not None and started is not None:
+            profile.db_seconds += time.perf_counter() - started
+
+
+def _prune_dumps(directory: Path, keep: int) -> None:
+    dumps = sorted(directory.glob("*.pstats"), key=lambda p: p.stat().st_mtime)
+    for old in dumps[:-keep] if keep > 0 else dumps:
+        old.unlink(missing_ok=True)
+
+
+def slowest_recent(directory: Path, lines_per_file: int, limit: int) -> list[dict]:
+    """Slowest requests among the last ``lines_per_file`` records of each worker's file."""
+    records = []
+    for path in directory.glob("requests-*.jsonl"):
+        try:
+            text, _, _ = log_tail.tail_lines(str(path), lines_per_file)
+        except OSError:
+            continue
+        for line in text.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    records.sort(key=lambda r: r.get("wall_ms", 0), reverse=True)
+    return records[:limit]
+
+
+def init_app(app: Flask, db) -> None:
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+    directory = Path(app.config["PROFILING_DIR"])
+    directory.mkdir(parents=True, exist_ok=True)
+    cprofile_rate = float(app.config.get("PROFILING_CPROFILE_RATE") or 0)
+    slow_seconds = float(app.config.get("PROFILING_SLOW_MS", 250)) / 1000
+    max_dumps = int(app.config.get("PROFILING_MAX_DUMPS") or 100)
+
+    logger = logging.getLogger("cdx_web_scan.profiling")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Keep per-request records out of the application log.
+    handlers: dict[int, logging.Handler] = {}
+    handlers_lock = threading.Lock()
+
+    def _handler() -> logging.Handler:
+        # One file per worker: opened lazily, after gunicorn forks.
+        pid = os.getpid()
+        handler = handlers.get(pid)
+        if handler is None:
+            with handlers_lock:
+                handler = handlers.get(pid)
+                if handler is None:
+                    for stale in list(logger.handlers):
+                        logger.removeHandler(stale)
+                    handler = handlers[pid] = RotatingFileHandler(
+                        directory / f"requests-{pid}.jsonl",
+                        maxBytes=int(app.config.get("PROFILING_LOG_MAX_BYTES") or 5 * 1024 * 1024),
+                        backupCount=int(app.config.get("PROFILING_LOG_BACKUPS") or 3),
+                        encoding="utf-8",
+                    )
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+        return handler
+
+    with app.app_context():
+        _instrument_db(
+            db,
+            int(app.config.get("PROFILING_MAX_STATEMENTS") or 200),
+            int(app.config.get("PROFILING_MAX_STATEMENT_CHARS") or 2000),
+        )
+
+    def _start_profile(req) -> RequestProfile:
+        profile = RequestProfile(req.method, req.full_path.rstrip("?"))
+        if cprofile_rate > 0 and random.random() < cprofile_rate and _cprofile_lock.acquire(blocking=False):
+            profile.profiler = cProfile.Profile()
+            try:
+                profile.profiler.enable()
+            except ValueError:  # Another profiler (e.g. a debugger) is active.
+                profile.profiler = None
+                _cprofile_lock.release()
+        _local.profile = profile
+        return profile
+
+    app.session_interface = _TimedSessionInterface(app.session_interface, _start_profile)
+
+    @before_render_template.connect_via(app)
+    def _render_started(sender, template, context, **extra):
+        if (profile := current()) is not None:
+            profile.render_started = time.perf_counter()
+
+    @template_rendered.connect_via(app)
+    def _render_finished(sender, template, context, **extra):
+        profile = current()
+        if profile is not None and profile.render_started is not None:
+            profile.render_seconds += time.perf_counter() - profile.render_started
+            profile.render_started = None
+
+    @app.after_request
+    def _profile_status(response):
+        if (profile := current()) is not None:
+            profile.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _profile_finish(exc):
+        profile = current()
+        if profile is None:
+            return
+        _local.profile = None
+        wall = time.perf_counter() - profile.started
+        profile.endpoint = request.endpoint
+        record = profile.record(wall)
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            _cprofile_lock.release()
+            if wall >= slow_seconds:
+                name = f"{int(time.time() * 1000)}-{os.getpid()}-{secure_filename(profile.endpoint or 'unmatched')}.pstats"
+                profile.profiler.dump_stats(directory / name)
+                record["profile"] = name
+                _prune_dumps(directory, max_dumps)
+        _handler()
+        logger.info(json.dumps(record, separators=(",", ":")))
+
+    @app.route("/debug/profile")
+    def debug_profile():
+        records = slowest_recent(
+            directory,
+            int(app.config.get("PROFILING_PAGE_SCAN_LINES") or 2000),
+            int(app.config.get("PROFILING_PAGE_SIZE") or 50),
+        )
+        return render_template("debug_profile.html", records=records)
+
+    @app.route("/debug/profile/<name>")
+    def debug_profile_dump(name: str):
+        if secure_filename(name) != name or not name.endswith(".pstats") or not (directory / name).is_file():
+            abort(404)
+        out = io.StringIO()
+        stats = pstats.Stats(str(directory / name), stream=out)
+        sort = request.args.get("sort")
+        stats.strip_dirs().sort_stats(sort if sort in {"cumulative", "tottime", "calls"} else "cumulative").print_stats(60)
+        return render_template("debug_profile.html", dump_name=name, dump_text=out.getvalue())
@@ -0,0 +1,95 @@
+"""Explicit schema creation (``flask init-db``).
+
+The app no longer creates tables when it starts: run this once per deployment
+(the Docker image does, before gunicorn) and after upgrades that add tables or
+indexes. It is idempotent, so re-running it is safe. Doing it in one process
+also avoids workers racing each other's ``CREATE TABLE`` on an empty database.
+"""
+from __future__ import annotations
+
+import click
+from flask import Flask
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection
+
+from cdx_web_scan import db
+
+
+def _columns(conn: Connection, table: str) -> dict[str, bool]:
+    """Column name -> NOT NULL for an existing table."""
+    return {row[1]: bool(row[3]) for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _rebuild_table(conn: Connection, table: Table) -> None:
+    """Recreate ``table`` from the model and copy the rows over (SQLite can't ALTER constraints).
+
+    Columns the old table lacks are left to their NULL / server defaults.
+    """
+    old = f"_{table.name}_old"
+    kept = [name for name in _columns(conn, table.name) if name in table.c]
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old}")
+    # The old indexes keep their names after the rename; drop them so the new ones can be created.
+    indexes = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :old AND sql IS NOT NULL"), {"old": old}
+    ).scalars().all()
+    for name in indexes:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    table.create(conn)
+    column_list = ", ".join(kept)
+    conn.exec_driver_sql(f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {old}")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+
+
+def _upgrade_intake_calls(conn: Connection) -> None:
+    """Bring an ``aws_intake_call`` table from before the outbox up to date.
+
+    Batch calls need a nullable ``scan_id`` and a ``session_id``, and SQLite can
+    only change NOT NULL by rebuilding the table. Retries need ``next_attempt_at``.
+    """
+    from cdx_web_scan.models import AwsIntakeCall
+
+    columns = _columns(conn, AwsIntakeCall.__tablename__)
+    if "session_id" not in columns or columns.get("scan_id"):
+        _rebuild_table(conn, AwsIntakeCall.__table__)
+    elif "next_attempt_at" not in columns:
+        conn.exec_driver_sql("ALTER TABLE aws_intake_call ADD COLUMN next_attempt_at DATETIME")
+    # The dispatcher only sends rows with a next_attempt_at; older unsent rows are due now.
+    conn.execute(
+        text(
+            "UPDATE aws_intake_call SET next_attempt_at = created_at "
+            "WHERE next_attempt_at IS NULL AND status IN ('pending', 'retrying')"
+        )
+    )
+
+
+def create_schema() -> None:
+    """Create missing tables and indexes, upgrading older tables first (needs an app context)."""
+    import cdx_web_scan.models  # noqa: F401  (registers the tables on db.metadata)
+    from cdx_web_scan.web_scan.scan_search import create_scan_search
+    from cdx_web_scan.web_scan.seen_index import create_seen_index_triggers
+
+    db.create_all()
+    # create_all leaves existing tables alone; upgrade the ones whose columns changed.
+    with db.engine.begin() as conn:
+        _upgrade_intake_calls(conn)
+    # create_all skips tables that already exist; add indexes introduced since.
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    # Full-text search table + sync triggers (raw DDL; SQLAlchemy has no FTS5 support).
+    create_scan_search()
+    # Lets the seen-before index notice deletes and backfills it can't see by rowid.
+    create_seen_index_triggers()
+
+
+def init_app(app: Flask) -> None:
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create the database tables and indexes (idempotent), then normalize pre-GTIN barcode rows."""
+        from cdx_web_scan.web_scan.gtin_backfill import backfill_gtin, needs_backfill
+
+        create_schema()
+        click.echo(f"Schema ready: {app.config['SQLALCHEMY_DATABASE_URI']}")
+        if needs_backfill():
+            seen, updated = backfill_gtin()
+            click.echo(f"Checked {seen} barcode row(s); normalized {updated}.")
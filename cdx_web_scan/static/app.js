@@ -295,6 +295,56 @@
 	// Capture phase so we intercept even if other listeners stop propagation.
 	document.addEventListener("click", confirmClickHandler, true);
 
+	// Opt-in wedge micro-batching (server sets data-bulk-window-ms > 0 to enable).
+	// Wedge scans arriving within the window are buffered and sent as one /submit/bulk.
+	const bulkWindowMs = form ? parseInt(form.dataset.bulkWindowMs || "0", 10) || 0 : 0;
+	const bulkMaxItems = 50;
+	let bulkBuffer = [];
+	let bulkTimer = null;
+
+	function flushBulkBuffer() {
+		if (bulkTimer) {
+			clearTimeout(bulkTimer);
+			bulkTimer = null;
+		}
+		if (!bulkBuffer.length || !window.htmx) return;
+		const scans = bulkBuffer;
+		bulkBuffer = [];
+		window.htmx.ajax("POST", "/submit/bulk", {
+			target: "#scan-result",
+			swap: "innerHTML",
+			values: {
+				barcode: scans.map((s) => s.barcode),
+				source: scans.map((s) => s.source),
+				title: scans.map((s) => s.title),
+			},
+		});
+	}
+
+	if (form && bulkWindowMs > 0) {
+		form.addEventListener("htmx:beforeRequest", (e) => {
+			if (e.detail.elt !== form) return;
+			if (!sourceInput || sourceInput.value !== "wedge") {
+				// Manual/camera entries go straight through, after anything still buffered.
+				flushBulkBuffer();
+				return;
+			}
+			e.preventDefault();
+			const barcode = barcodeInput ? (barcodeInput.value || "").trim() : "";
+			if (!barcode) return;
+			bulkBuffer.push({ barcode, source: "wedge", title: titleInput ? titleInput.value || "" : "" });
+			if (barcodeInput) barcodeInput.value = "";
+			if (titleInput) titleInput.value = "";
+			resetWedgeHeuristic();
+			if (bulkBuffer.length >= bulkMaxItems) {
+				flushBulkBuffer();
+			} else if (!bulkTimer) {
+				bulkTimer = setTimeout(flushBulkBuffer, bulkWindowMs);
+			}
+		});
+		window.addEventListener("pagehide", flushBulkBuffer);
+	}
+
 	// Wedge scanner friendliness
 	if (barcodeInput) {
 		resetWedgeHeuristic();
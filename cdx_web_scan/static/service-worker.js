@@ -1,6 +1,6 @@
 /* Minimal app-shell cache for CDX Web Scan */
 
-const CACHE_NAME = "cdx-web-scan-v7";
+const CACHE_NAME = "cdx-web-scan-v8";
 const APP_SHELL = [
   "/",
   "/static/styles.css",
@@ -45,6 +45,24 @@ self.addEventListener("fetch", (event) => {
   // Extensions and browser internals can trigger these, and Cache.put will throw.
   if (!isHttp || !isSameOrigin) return;
 
+  // Content-hashed assets never change: serve from cache without touching the network.
+  if (url.pathname.startsWith("/static/dist/")) {
+    event.respondWith(
+      caches.match(req).then(
+        (cached) =>
+          cached ||
+          fetch(req).then((res) => {
+            if (res.ok) {
+              const copy = res.clone();
+              caches.open(CACHE_NAME).then((cache) => cache.put(req, copy)).catch(() => {});
+            }
+            return res;
+          })
+      )
+    );
+    return;
+  }
+
   event.respondWith(
     fetch(req)
       .then((res) => {
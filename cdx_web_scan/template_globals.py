@@ -0,0 +1,82 @@
+"""Process-level cache for the values ``inject_globals`` adds to every template.
+
+The app version (from ``pyproject.toml``) and the static asset revision are
+computed once. With a positive ``recheck_seconds`` (development), the source
+files are re-``stat()``ed at most that often and the values recomputed when an
+mtime changes; otherwise every render just reads a dict.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+
+import toml
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+PROJECT_FILE = PACKAGE_DIR.parent / "pyproject.toml"
+STATIC_DIR = PACKAGE_DIR / "static"
+ASSET_FILES = ("app.js", "styles.css", "service-worker.js", "manifest.webmanifest")
+
+
+def read_version(project_file: Path = PROJECT_FILE) -> str:
+    """Version from ``pyproject.toml``, falling back to the installed distribution."""
+    try:
+        with open(project_file, "r") as f:
+            return toml.load(f)["project"]["version"]
+    except (OSError, KeyError, toml.TomlDecodeError):
+        pass
+    try:
+        return metadata.version("cdx-web-scan")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _mtime(path: Path) -> int | None:
+    try:
+        return int(path.stat().st_mtime)
+    except OSError:
+        return None
+
+
+class TemplateGlobals:
+    def __init__(
+        self,
+        project_file: Path = PROJECT_FILE,
+        static_dir: Path = STATIC_DIR,
+        asset_files: tuple[str, ...] = ASSET_FILES,
+        recheck_seconds: float = 0,
+    ):
+        self.project_file = project_file
+        self.asset_paths = [static_dir / name for name in asset_files]
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._mtimes: tuple[int | None, ...] = ()
+        self._values: dict = {}
+        self._refresh()
+
+    def _current_mtimes(self) -> tuple[int | None, ...]:
+        return tuple(_mtime(p) for p in (self.project_file, *self.asset_paths))
+
+    def _refresh(self) -> None:
+        mtimes = self._current_mtimes()
+        asset_mtimes = [m for m in mtimes[1:] if m is not None]
+        self._values = {
+            "version": read_version(self.project_file),
+            "asset_rev": max(asset_mtimes) if asset_mtimes else int(datetime.now().timestamp()),
+        }
+        self._mtimes = mtimes
+        self._checked_at = time.monotonic()
+
+    def get(self) -> dict:
+        if self.recheck_seconds > 0 and time.monotonic() - self._checked_at >= self.recheck_seconds:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.recheck_seconds:
+                    if self._current_mtimes() != self._mtimes:
+                        self._refresh()
+                    else:
+                        self._checked_at = time.monotonic()
+        return self._values
@@ -0,0 +1,302 @@
+"""Server-side storage for the operator's working batch.
+
+The signed session cookie only carries an opaque ``batch_token`` and a small
+revision counter; the items themselves live in the ``batch_item`` table. An
+optional in-process LRU layer sits in front so the common HTMX swaps (paging,
+duplicate checks) cost one primary-key probe of ``batch_version`` per request
+instead of reloading the batch.
+"""
+from __future__ import annotations
+
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import import_string
+
+from cdx_web_scan import db
+from cdx_web_scan.models import BatchItem, BatchVersion
+
+# Keys every batch item dict carries (what the templates and intake payload use).
+ITEM_FIELDS = ("code", "source", "captured_at", "title", "format", "scan_id")
+
+
+@dataclass(frozen=True)
+class BatchRef:
+    """One working batch: the session's token plus the revision the client last saw."""
+
+    token: str
+    rev: int = 0
+
+    def bumped(self) -> BatchRef:
+        return BatchRef(self.token, self.rev + 1)
+
+
+class BatchStore(ABC):
+    """Backend interface. Items are plain dicts keyed by ``ITEM_FIELDS``."""
+
+    @abstractmethod
+    def count(self, ref: BatchRef) -> int: ...
+
+    @abstractmethod
+    def page(self, ref: BatchRef, offset: int, limit: int) -> list[dict]: ...
+
+    @abstractmethod
+    def all(self, ref: BatchRef) -> list[dict]: ...
+
+    @abstractmethod
+    def contains(self, ref: BatchRef, code: str) -> bool: ...
+
+    @abstractmethod
+    def append(self, ref: BatchRef, item: dict) -> bool:
+        """Add ``item``; returns False if its code is already in the batch."""
+
+    def codes_present(self, ref: BatchRef, codes: list[str]) -> set[str]:
+        """Which of ``codes`` are already in the batch."""
+        return {code for code in codes if self.contains(ref, code)}
+
+    def append_many(self, ref: BatchRef, items: list[dict]) -> set[str]:
+        """Add several items (codes already in the batch are skipped); returns the codes added."""
+        return {item["code"] for item in items if self.append(ref, item)}
+
+    @abstractmethod
+    def delete(self, ref: BatchRef, code: str) -> bool: ...
+
+    @abstractmethod
+    def clear(self, ref: BatchRef) -> None: ...
+
+    def version(self, ref: BatchRef) -> Hashable | None:
+        """Cheap fingerprint that changes whenever the stored batch does, or None if unsupported."""
+        return None
+
+    def snapshot(self, ref: BatchRef) -> tuple[Hashable | None, list[dict]]:
+        """The whole batch together with the ``version`` it was read at.
+
+        The version is read first: a write that lands in between makes the
+        items newer than the version, which only costs the caller a reload.
+        """
+        version = self.version(ref)
+        return version, self.all(ref)
+
+
+def _row_to_item(row: Any) -> dict:
+    return {field: getattr(row, field) for field in ITEM_FIELDS}
+
+
+_ITEM_COLUMNS = [getattr(BatchItem, field) for field in ITEM_FIELDS]
+
+
+class SqliteBatchStore(BatchStore):
+    """``batch_item`` table keyed by session token (unique on token + code)."""
+
+    def count(self, ref: BatchRef) -> int:
+        stmt = select(func.count()).select_from(BatchItem).where(BatchItem.batch_token == ref.token)
+        return int(db.session.execute(stmt).scalar_one())
+
+    def page(self, ref: BatchRef, offset: int, limit: int) -> list[dict]:
+        stmt = (
+            select(*_ITEM_COLUMNS)
+            .where(BatchItem.batch_token == ref.token)
+            .order_by(BatchItem.id)
+            .offset(max(0, offset))
+            .limit(max(0, limit))
+        )
+        return [_row_to_item(row) for row in db.session.execute(stmt)]
+
+    def all(self, ref: BatchRef) -> list[dict]:
+        stmt = select(*_ITEM_COLUMNS).where(BatchItem.batch_token == ref.token).order_by(BatchItem.id)
+        return [_row_to_item(row) for row in db.session.execute(stmt)]
+
+    def contains(self, ref: BatchRef, code: str) -> bool:
+        stmt = select(BatchItem.id).where(BatchItem.batch_token == ref.token, BatchItem.code == code).limit(1)
+        return db.session.execute(stmt).first() is not None
+
+    def version(self, ref: BatchRef) -> int:
+        stmt = select(BatchVersion.version).where(BatchVersion.batch_token == ref.token)
+        return db.session.execute(stmt).scalar() or 0
+
+    def _bump(self, ref: BatchRef) -> None:
+        # Same transaction as the change it counts. Never reset (not even by
+        # clear), so a version number is never reused for different contents.
+        stmt = sqlite_insert(BatchVersion).values(batch_token=ref.token, version=1)
+        db.session.execute(
+            stmt.on_conflict_do_update(index_elements=[BatchVersion.batch_token], set_={"version": BatchVersion.version + 1})
+        )
+
+    def append(self, ref: BatchRef, item: dict) -> bool:
+        values = {field: item.get(field) for field in ITEM_FIELDS}
+        try:
+            db.session.execute(insert(BatchItem).values(batch_token=ref.token, **values))
+            self._bump(ref)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+    def codes_present(self, ref: BatchRef, codes: list[str]) -> set[str]:
+        if not codes:
+            return set()
+        stmt = select(BatchItem.code).where(BatchItem.batch_token == ref.token, BatchItem.code.in_(codes))
+        return set(db.session.execute(stmt).scalars())
+
+    def append_many(self, ref: BatchRef, items: list[dict]) -> set[str]:
+        if not items:
+            return set()
+        rows = [{"batch_token": ref.token, **{field: item.get(field) for field in ITEM_FIELDS}} for item in items]
+        # RETURNING only yields the rows OR IGNORE actually inserted.
+        added = set(db.session.execute(insert(BatchItem).prefix_with("OR IGNORE").returning(BatchItem.code), rows).scalars())
+        if added:
+            self._bump(ref)
+        db.session.commit()
+        return added
+
+    def delete(self, ref: BatchRef, code: str) -> bool:
+        stmt = delete(BatchItem).where(BatchItem.batch_token == ref.token, BatchItem.code == code)
+        removed = db.session.execute(stmt).rowcount
+        if removed:
+            self._bump(ref)
+        db.session.commit()
+        return bool(removed)
+
+    def clear(self, ref: BatchRef) -> None:
+        if db.session.execute(delete(BatchItem).where(BatchItem.batch_token == ref.token)).rowcount:
+            self._bump(ref)
+        db.session.commit()
+
+
+class LruBatchStore(BatchStore):
+    """LRU of whole batches in front of another store.
+
+    Entries are keyed by the session revision *and* the backend's ``version``
+    (the ``batch_version`` counter for SQLite), which is checked once per
+    request. The revision alone is not enough: two concurrent requests from the
+    same cookie on different gunicorn workers both bump rev N to N+1 and would
+    each cache a different list under it. Writes drop the entry rather than
+    patching it, since the new version is only known once the backend is read
+    again. Backends without a version fall back to the revision check alone.
+    """
+
+    def __init__(self, backend: BatchStore, max_batches: int = 256):
+        self._backend = backend
+        self._max_batches = max(1, max_batches)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[int, Hashable | None, OrderedDict[str, dict]]] = OrderedDict()
+
+    def _checked_versions(self) -> dict[str, Hashable | None]:
+        # A request reads the batch several times (count, page, duplicate check);
+        # ask the backend for its version only on the first of them.
+        if not has_request_context():
+            return {}
+        return g.setdefault("batch_store_versions", {})
+
+    def _items(self, ref: BatchRef) -> OrderedDict[str, dict]:
+        # Cached dicts are never mutated once stored, so callers may read them without the lock.
+        checked = self._checked_versions()
+        with self._lock:
+            entry = self._entries.get(ref.token)
+        if entry is not None and entry[0] == ref.rev:
+            if ref.token not in checked:
+                checked[ref.token] = self._backend.version(ref)
+            if entry[1] == checked[ref.token]:
+                with self._lock:
+                    if ref.token in self._entries:
+                        self._entries.move_to_end(ref.token)
+                return entry[2]
+        version, loaded = self._backend.snapshot(ref)
+        checked[ref.token] = version
+        items = OrderedDict((item["code"], item) for item in loaded)
+        with self._lock:
+            self._entries[ref.token] = (ref.rev, version, items)
+            self._entries.move_to_end(ref.token)
+            while len(self._entries) > self._max_batches:
+                self._entries.popitem(last=False)
+        return items
+
+    def _forget(self, ref: BatchRef) -> None:
+        self._checked_versions().pop(ref.token, None)
+        with self._lock:
+            self._entries.pop(ref.token, None)
+
+    def count(self, ref: BatchRef) -> int:
+        return len(self._items(ref))
+
+    def page(self, ref: BatchRef, offset: int, limit: int) -> list[dict]:
+        start = max(0, offset)
+        return [dict(i) for i in islice(self._items(ref).values(), start, start + max(0, limit))]
+
+    def all(self, ref: BatchRef) -> list[dict]:
+        return [dict(i) for i in self._items(ref).values()]
+
+    def contains(self, ref: BatchRef, code: str) -> bool:
+        return code in self._items(ref)
+
+    def append(self, ref: BatchRef, item: dict) -> bool:
+        added = self._backend.append(ref, item)
+        if added:
+            self._forget(ref)
+        return added
+
+    def codes_present(self, ref: BatchRef, codes: list[str]) -> set[str]:
+        items = self._items(ref)
+        return {code for code in codes if code in items}
+
+    def append_many(self, ref: BatchRef, items: list[dict]) -> set[str]:
+        added = self._backend.append_many(ref, items)
+        if added:
+            self._forget(ref)
+        return added
+
+    def delete(self, ref: BatchRef, code: str) -> bool:
+        removed = self._backend.delete(ref, code)
+        self._forget(ref)
+        return removed
+
+    def clear(self, ref: BatchRef) -> None:
+        self._backend.clear(ref)
+        self._forget(ref)
+
+    def version(self, ref: BatchRef) -> Hashable | None:
+        return self._backend.version(ref)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Built-in backends; BATCH_STORE_BACKEND may also be a dotted "module:Class" path.
+_BACKENDS: dict[str, type[BatchStore]] = {
+    "sqlite": SqliteBatchStore,
+}
+
+_store_lock = threading.Lock()
+
+
+def _build_store(config) -> BatchStore:
+    name = (config.get("BATCH_STORE_BACKEND") or "sqlite").strip()
+    backend_cls = _BACKENDS.get(name) or import_string(name)
+    store: BatchStore = backend_cls()
+    cache_size = int(config.get("BATCH_STORE_CACHE_SIZE") or 0)
+    if cache_size > 0:
+        store = LruBatchStore(store, max_batches=cache_size)
+    return store
+
+
+def get_batch_store() -> BatchStore:
+    """Return the process-wide batch store for the current app (built on first use)."""
+    store = current_app.extensions.get("batch_store")
+    if store is None:
+        with _store_lock:
+            store = current_app.extensions.get("batch_store")
+            if store is None:
+                store = _build_store(current_app.config)
+                current_app.extensions["batch_store"] = store
+    return store
@@ -0,0 +1,293 @@
+"""Local barcode catalog: fill in titles at scan time without a network call.
+
+    flask --app app import-catalog releases.csv.gz [--batch-size 5000]
+
+``catalog_entry`` maps a GTIN-14 to a title (plus artist / label). It is filled
+in two ways:
+
+* bulk imports (CSV or NDJSON, optionally gzipped). Rows are streamed and
+  written ``--batch-size`` at a time, each batch one executemany upsert in its
+  own transaction, so memory stays flat for files of millions of rows and other
+  writers are only locked out briefly.
+* titles the intake API sends back for submitted items. These never overwrite
+  imported rows.
+
+Each process keeps an LRU of recent lookups, misses included, in front of the
+primary-key lookup. Entries expire after ``CATALOG_CACHE_TTL_SECONDS``, so rows
+written by another process (an import, or the dispatcher's leader learning from
+a response) show up within that time; pages that put ``Catalog.version`` in
+their ETag drop the cache as soon as it moves.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator
+
+import click
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from cdx_web_scan import db
+from cdx_web_scan.models import CatalogEntry, utcnow
+from cdx_web_scan.web_scan.gtin import parse_many
+
+IMPORT_FORMATS = ("csv", "ndjson")
+# Field names accepted for the barcode, in order of preference.
+CODE_FIELDS = ("gtin", "barcode", "upc", "ean", "code")
+
+_UNCACHED = object()
+
+
+@dataclass(frozen=True)
+class CatalogHit:
+    gtin: str
+    title: str
+    artist: str | None = None
+    label: str | None = None
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+def is_placeholder_title(title: str | None) -> bool:
+    """True for blank titles and the " -- UNTITLED -- " placeholder."""
+    text = (title or "").strip(" -")
+    return not text or text.upper() == "UNTITLED"
+
+
+# ----------------------------
+# Lookups
+# ----------------------------
+
+class Catalog:
+    def __init__(self, app: Flask):
+        self.lru_size = int(app.config.get("CATALOG_LRU_SIZE") or 50_000)
+        self.ttl = float(app.config.get("CATALOG_CACHE_TTL_SECONDS") or 0)
+        self._lock = threading.Lock()
+        # gtin -> (expires at, CatalogHit or None for "not in the catalog")
+        self._recent: OrderedDict[str, tuple[float, CatalogHit | None]] = OrderedDict()
+        self._version: str | None = None
+        self._pid = os.getpid()
+
+    def version(self) -> str:
+        """Latest ``updated_at`` in the catalog (one index probe), for ETags of pages it fills in.
+
+        When it has moved since the last call, cached lookups are dropped too, so
+        a page rendered under the new version doesn't show titles from before it.
+        """
+        latest = db.session.execute(select(func.max(CatalogEntry.updated_at))).scalar()
+        version = latest.isoformat() if latest is not None else "0"
+        with self._lock:
+            if version != self._version:
+                self._recent.clear()
+                self._version = version
+        return version
+
+    def _cached(self, gtin: str, now: float) -> object:
+        # Caller holds the lock.
+        entry = self._recent.get(gtin)
+        if entry is None:
+            return _UNCACHED
+        if entry[0] < now:
+            del self._recent[gtin]
+            return _UNCACHED
+        self._recent.move_to_end(gtin)
+        return entry[1]
+
+    def lookup(self, gtin: str) -> CatalogHit | None:
+        """Catalog entry for one normalized GTIN-14, or None."""
+        return self.lookup_many([gtin]).get(gtin)
+
+    def lookup_many(self, gtins: Iterable[str]) -> dict[str, CatalogHit]:
+        """Entries for the GTINs that have one; the uncached ones are fetched in one query."""
+        found: dict[str, CatalogHit] = {}
+        misses: list[str] = []
+        now = time.monotonic()
+        with self._lock:
+            for gtin in dict.fromkeys(g for g in gtins if g):
+                cached = self._cached(gtin, now)
+                if cached is _UNCACHED:
+                    misses.append(gtin)
+                elif cached is not None:
+                    found[gtin] = cached  # type: ignore[assignment]
+        if not misses:
+            return found
+
+        rows = db.session.execute(
+            select(CatalogEntry.gtin, CatalogEntry.title, CatalogEntry.artist, CatalogEntry.label).where(
+                CatalogEntry.gtin.in_(misses)
+            )
+        ).all()
+        fetched = {row.gtin: CatalogHit(*row) for row in rows}
+        found.update(fetched)
+        if self.ttl > 0 and self.lru_size > 0:
+            expires = time.monotonic() + self.ttl
+            with self._lock:
+                for gtin in misses:
+                    self._recent[gtin] = (expires, fetched.get(gtin))
+                    self._recent.move_to_end(gtin)
+                while len(self._recent) > self.lru_size:
+                    self._recent.popitem(last=False)
+        return found
+
+    def forget(self, gtins: Iterable[str]) -> None:
+        """Drop cached lookups for rows this process just wrote."""
+        with self._lock:
+            for gtin in gtins:
+                self._recent.pop(gtin, None)
+
+
+_catalog_lock = threading.Lock()
+
+
+def get_catalog(app: Flask | None = None) -> Catalog:
+    app = app or current_app._get_current_object()  # type: ignore[attr-defined]
+    catalog = app.extensions.get("catalog")
+    if catalog is None or catalog._pid != os.getpid():
+        with _catalog_lock:
+            catalog = app.extensions.get("catalog")
+            if catalog is None or catalog._pid != os.getpid():
+                catalog = app.extensions["catalog"] = Catalog(app)
+    return catalog
+
+
+# ----------------------------
+# Writes
+# ----------------------------
+
+def _entry_fields(row: dict) -> tuple[str, dict] | None:
+    """(barcode, fields) from an import row or response item; None without a code and a real title."""
+    code = next((str(row[k]).strip() for k in CODE_FIELDS if row.get(k) not in (None, "")), "")
+    title = str(row.get("title") or "").strip()
+    if not code or is_placeholder_title(title):
+        return None
+    return code, {
+        "title": title,
+        "artist": str(row.get("artist") or "").strip() or None,
+        "label": str(row.get("label") or "").strip() or None,
+    }
+
+
+def _normalized_entries(rows: Iterable[dict]) -> list[dict]:
+    """Rows keyed by GTIN-14 (the last row wins); rows without a GTIN-shaped code are skipped."""
+    candidates = [fields for fields in map(_entry_fields, rows) if fields is not None]
+    entries: dict[str, dict] = {}
+    for (_, fields), gtin in zip(candidates, parse_many([code for code, _ in candidates])):
+        if gtin is not None:
+            entries[gtin.gtin14] = {"gtin": gtin.gtin14, **fields}
+    return list(entries.values())
+
+
+def upsert_entries(entries: list[dict], source: str) -> int:
+    """Insert or update catalog rows in one executemany (caller commits).
+
+    ``entries`` carry ``gtin`` (GTIN-14), ``title``, ``artist`` and ``label``.
+    Rows with ``source="intake"`` don't replace imported ones.
+    """
+    if not entries:
+        return 0
+    table = CatalogEntry.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.gtin],
+        set_={
+            "title": stmt.excluded.title,
+            "artist": stmt.excluded.artist,
+            "label": stmt.excluded.label,
+            "source": stmt.excluded.source,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=(stmt.excluded.source == "import") | (table.c.source != "import"),
+    )
+    now = utcnow()
+    db.session.execute(stmt, [{**entry, "source": source, "updated_at": now} for entry in entries])
+    if has_app_context():
+        get_catalog().forget(entry["gtin"] for entry in entries)
+    return len(entries)
+
+
+def learn_from_response(body: dict | None) -> int:
+    """Store titles from an intake response (``items`` / ``results`` list, or one item); caller commits."""
+    if not isinstance(body, dict):
+        return 0
+    items = body.get("items") or body.get("results")
+    if not isinstance(items, list):
+        items = [body]
+    return upsert_entries(_normalized_entries(item for item in items if isinstance(item, dict)), "intake")
+
+
+# ----------------------------
+# Bulk import
+# ----------------------------
+
+def format_for(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise CatalogImportError(f"Can't tell the format of {path}; pass --format")
+
+
+def open_import(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def read_rows(f: IO[str], fmt: str) -> Iterator[dict]:
+    """Rows of a CSV (with a header line) or NDJSON file, one at a time."""
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    if fmt != "ndjson":
+        raise CatalogImportError(f"Unknown format: {fmt}")
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise CatalogImportError(f"Line {number}: not valid JSON") from exc
+        if isinstance(row, dict):
+            yield row
+
+
+def import_catalog(rows: Iterable[dict], batch_size: int = 5000) -> tuple[int, int]:
+    """Upsert ``rows`` ``batch_size`` at a time (one transaction each); returns (rows read, rows stored)."""
+    rows = iter(rows)
+    seen = stored = 0
+    while True:
+        batch = list(itertools.islice(rows, max(1, batch_size)))
+        if not batch:
+            break
+        seen += len(batch)
+        stored += upsert_entries(_normalized_entries(batch), "import")
+        db.session.commit()
+    return seen, stored
+
+
+def init_app(app: Flask) -> None:
+    @app.cli.command("import-catalog")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), default=None, help="Default: from the file name.")
+    @click.option("--batch-size", default=5000, show_default=True, help="Rows per transaction.")
+    def import_catalog_command(path: str, fmt: str | None, batch_size: int):
+        """Load barcode -> title rows (CSV or NDJSON, optionally .gz) into the local catalog."""
+        try:
+            with open_import(path) as f:
+                seen, stored = import_catalog(read_rows(f, fmt or format_for(path)), batch_size)
+        except CatalogImportError as exc:
+            raise click.ClickException(str(exc)) from exc
+        click.echo(f"Read {seen} row(s); stored {stored} catalog entries.")
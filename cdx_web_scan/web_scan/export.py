@@ -0,0 +1,285 @@
+"""Streaming bulk export of scans and intake calls (CSV, NDJSON, Parquet).
+
+    GET /export/scans?format=csv&since=2025-01-01&until=2025-02-01&gzip=1
+    flask --app app export scans --format ndjson --since 2025-01-01 -o scans.ndjson
+
+Rows are fetched ``EXPORT_CHUNK_SIZE`` at a time (``yield_per``) and each chunk is
+encoded and handed to the response before the next is read, so memory stays flat
+whatever the row count. The ``scans`` export is ordered on the scan's
+``created_at`` so a ``since``/``until`` range is a range scan of a
+``created_at``-leading index on ``scan`` (no sort step).
+
+Datasets:
+
+* ``scans`` - one row per captured barcode, with its scan's columns.
+* ``intake-calls`` - one row per intake API call; joins back to ``scans`` on
+  ``session_id`` (batches) or ``scan_id`` (single-scan calls).
+
+Parquet needs pyarrow (``pip install .[parquet]``) and is written one row group
+per chunk; it is already compressed, so it can't also be gzipped.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+import click
+from flask import Flask
+from sqlalchemy import select
+
+from cdx_web_scan import db
+from cdx_web_scan.models import AwsIntakeCall, BarcodeCapture, Scan
+
+try:  # Optional: only the Parquet format needs it.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pq = None
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (output name, column, kind); kind picks the text / Parquet encoding.
+DATASETS = {
+    "scans": [
+        ("scan_id", Scan.id, "str"),
+        ("scan_created_at", Scan.created_at, "time"),
+        ("source", Scan.source, "str"),
+        ("operator", Scan.operator, "str"),
+        ("session_id", Scan.session_id, "str"),
+        ("notes", Scan.notes, "str"),
+        ("barcode_id", BarcodeCapture.id, "str"),
+        ("captured_at", BarcodeCapture.created_at, "time"),
+        ("symbology", BarcodeCapture.symbology, "str"),
+        ("value_raw", BarcodeCapture.value_raw, "str"),
+        ("value_normalized", BarcodeCapture.value_normalized, "str"),
+        ("checksum_valid", BarcodeCapture.checksum_valid, "bool"),
+        ("is_primary", BarcodeCapture.is_primary, "bool"),
+        ("capture_method", BarcodeCapture.capture_method, "str"),
+    ],
+    "intake-calls": [
+        ("call_id", AwsIntakeCall.id, "str"),
+        ("created_at", AwsIntakeCall.created_at, "time"),
+        ("session_id", AwsIntakeCall.session_id, "str"),
+        ("scan_id", AwsIntakeCall.scan_id, "str"),
+        ("attempt", AwsIntakeCall.attempt, "int"),
+        ("status", AwsIntakeCall.status, "str"),
+        ("http_status", AwsIntakeCall.http_status, "int"),
+        ("duration_ms", AwsIntakeCall.duration_ms, "int"),
+        ("correlation_id", AwsIntakeCall.correlation_id, "str"),
+        ("api_path", AwsIntakeCall.api_path, "str"),
+        ("error", AwsIntakeCall.error, "str"),
+        ("response_body", AwsIntakeCall.response_body, "json"),
+    ],
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_time(value: str | None) -> datetime | None:
+    """ISO date/time -> naive UTC (how SQLite stores DateTime columns); naive input is UTC."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise ExportError(f"Invalid time: {value}") from exc
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def export_query(dataset: str, since: datetime | None = None, until: datetime | None = None):
+    """The SELECT for ``dataset``, filtered to ``since <= created_at < until``."""
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset: {dataset}")
+    stmt = select(*(column for _, column, _ in DATASETS[dataset]))
+    if dataset == "scans":
+        created_at = Scan.created_at
+        stmt = stmt.join(BarcodeCapture, BarcodeCapture.scan_id == Scan.id).order_by(Scan.created_at, Scan.id)
+    else:
+        created_at = AwsIntakeCall.created_at
+        stmt = stmt.order_by(AwsIntakeCall.created_at, AwsIntakeCall.id)
+    if since is not None:
+        stmt = stmt.where(created_at >= since)
+    if until is not None:
+        stmt = stmt.where(created_at < until)
+    return stmt
+
+
+def iter_chunks(dataset: str, since=None, until=None, chunk_size: int = 1000) -> Iterator[list[tuple]]:
+    result = db.session.execute(export_query(dataset, since, until).execution_options(yield_per=chunk_size))
+    try:
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        result.close()
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    # SQLite hands DateTime(timezone=True) back naive; everything is stored as UTC.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _text_value(value, kind: str):
+    if value is None:
+        return None
+    if kind == "time":
+        return _as_utc(value).isoformat()
+    if kind == "str" and not isinstance(value, str):
+        return value.value  # enums
+    return value
+
+
+def _encode_csv(names, kinds, chunks) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for chunk in chunks:
+        for row in chunk:
+            values = []
+            for value, kind in zip(row, kinds):
+                value = _text_value(value, kind)
+                if kind == "json" and value is not None:
+                    value = json.dumps(value, separators=(",", ":"))
+                elif kind == "bool" and value is not None:
+                    value = "true" if value else "false"
+                values.append(value)
+            writer.writerow(values)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export.
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(names, kinds, chunks) -> Iterator[bytes]:
+    for chunk in chunks:
+        lines = [
+            json.dumps({name: _text_value(value, kind) for name, value, kind in zip(names, row, kinds)}, separators=(",", ":"))
+            for row in chunk
+        ]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object whose bytes are drained after each row group."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _encode_parquet(names, kinds, chunks) -> Iterator[bytes]:
+    types = {"str": pa.string(), "time": pa.timestamp("us", tz="UTC"), "bool": pa.bool_(), "int": pa.int64(), "json": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in zip(names, kinds)])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for chunk in chunks:
+            columns = []
+            for i, kind in enumerate(kinds):
+                values = [row[i] for row in chunk]
+                if kind == "time":
+                    values = [_as_utc(v) for v in values]
+                elif kind == "str":
+                    values = [_text_value(v, kind) for v in values]
+                elif kind == "json":
+                    values = [None if v is None else json.dumps(v, separators=(",", ":")) for v in values]
+                columns.append(pa.array(values, type=schema.field(i).type))
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def check_request(dataset: str, fmt: str, gzip: bool = False) -> None:
+    """Raise ExportError for a combination that can't be served, before any streaming starts."""
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset: {dataset}")
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format: {fmt}")
+    if fmt == "parquet" and pq is None:
+        raise ExportError("Parquet export needs pyarrow (pip install .[parquet])")
+    if fmt == "parquet" and gzip:
+        raise ExportError("Parquet output is already compressed")
+
+
+def export_stream(dataset: str, fmt: str, since=None, until=None, *, gzip: bool = False, chunk_size: int = 1000) -> Iterator[bytes]:
+    """Encoded bytes of ``dataset`` in ``fmt``, one piece per fetched chunk."""
+    check_request(dataset, fmt, gzip)
+    names = [name for name, _, _ in DATASETS[dataset]]
+    kinds = [kind for _, _, kind in DATASETS[dataset]]
+    encode = {"csv": _encode_csv, "ndjson": _encode_ndjson, "parquet": _encode_parquet}[fmt]
+    stream = encode(names, kinds, iter_chunks(dataset, since, until, chunk_size))
+    return gzip_stream(stream) if gzip else stream
+
+
+def export_filename(dataset: str, fmt: str, gzip: bool = False) -> str:
+    return f"{dataset}.{FORMATS[fmt][1]}" + (".gz" if gzip else "")
+
+
+def init_app(app: Flask) -> None:
+    @app.cli.command("export")
+    @click.argument("dataset", type=click.Choice(sorted(DATASETS)))
+    @click.option("--format", "fmt", type=click.Choice(sorted(FORMATS)), default="csv", show_default=True)
+    @click.option("--since", help="Only rows created at/after this ISO date/time (UTC unless an offset is given).")
+    @click.option("--until", help="Only rows created before this ISO date/time.")
+    @click.option("--gzip", "use_gzip", is_flag=True, help="gzip-compress the output.")
+    @click.option("-o", "--output", type=click.File("wb"), default="-", help="Output file (default: stdout).")
+    def export_command(dataset: str, fmt: str, since: str | None, until: str | None, use_gzip: bool, output):
+        """Stream scans or intake calls out of the database."""
+        try:
+            stream = export_stream(
+                dataset, fmt, parse_time(since), parse_time(until),
+                gzip=use_gzip, chunk_size=app.config["EXPORT_CHUNK_SIZE"],
+            )
+            for data in stream:
+                output.write(data)
+        except ExportError as exc:
+            raise click.UsageError(str(exc)) from exc
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Sequence
+
+from cdx_web_scan.web_scan.gtin import Gtin, parse_gtin, parse_many
 
 
 @dataclass(frozen=True)
@@ -8,6 +11,7 @@ class BarcodeValidationResult:
 	ok: bool
 	value: str | None = None
 	error: str | None = None
+	gtin: Gtin | None = None
 
 
 def normalize_barcode(raw: str | None) -> str:
@@ -16,18 +20,37 @@ def normalize_barcode(raw: str | None) -> str:
 	return "".join(raw.split())
 
 
-def validate_upc_ean(raw: str | None) -> BarcodeValidationResult:
-	value = normalize_barcode(raw)
+def _precheck(value: str) -> BarcodeValidationResult | None:
 	if not value:
 		return BarcodeValidationResult(ok=False, error="Enter a UPC/EAN code.")
 	if not value.isdigit():
 		return BarcodeValidationResult(ok=False, error="UPC/EAN must contain digits only.")
+	return None
+
 
-	# Common lengths: EAN-8 (8), UPC-A (12), EAN-13 (13), ITF-14 (14)
-	if not (8 <= len(value) <= 14):
-		return BarcodeValidationResult(
-			ok=False,
-			error="UPC/EAN length must be 8–14 digits.",
-		)
+def _from_gtin(value: str, gtin: Gtin | None, require_check_digit: bool) -> BarcodeValidationResult:
+	# GTIN lengths: EAN-8 / UPC-E (8), UPC-A (12), EAN-13 (13), ITF-14 / GTIN-14 (14)
+	if gtin is None:
+		return BarcodeValidationResult(ok=False, error="UPC/EAN must be 8, 12, 13 or 14 digits.")
+	if require_check_digit and not gtin.checksum_valid:
+		# Almost always a misread: reject before it costs a DB write and an intake call.
+		return BarcodeValidationResult(ok=False, error=f"Check digit mismatch for {value} - please rescan.")
+	return BarcodeValidationResult(ok=True, value=value, gtin=gtin)
 
-	return BarcodeValidationResult(ok=True, value=value)
+
+def validate_upc_ean(raw: str | None, require_check_digit: bool = True) -> BarcodeValidationResult:
+	value = normalize_barcode(raw)
+	failed = _precheck(value)
+	if failed is not None:
+		return failed
+	return _from_gtin(value, parse_gtin(value), require_check_digit)
+
+
+def validate_upc_ean_many(raws: Sequence[str | None], require_check_digit: bool = True) -> list[BarcodeValidationResult]:
+	"""``validate_upc_ean`` for a whole burst; check digits are verified in one batched pass."""
+	values = [normalize_barcode(raw) for raw in raws]
+	results: list[BarcodeValidationResult | None] = [_precheck(value) for value in values]
+	pending = [i for i, result in enumerate(results) if result is None]
+	for i, gtin in zip(pending, parse_many([values[i] for i in pending])):
+		results[i] = _from_gtin(values[i], gtin, require_check_digit)
+	return results  # type: ignore[return-value]
@@ -0,0 +1,116 @@
+"""GTIN check digits, UPC-E expansion and GTIN-14 normalization.
+
+Every supported symbology (EAN-8, UPC-E, UPC-A, EAN-13, GTIN-14) shares the GS1
+mod-10 check digit. ``value_normalized`` is the 14-digit GTIN: the code
+(UPC-E expanded to UPC-A first) left-padded with zeros, so one product has one
+key whatever symbology it was scanned as.
+
+``parse_gtin`` handles one code; ``parse_many`` handles a list at once and uses
+NumPy, if installed, to check all the digits as a single matrix (bulk
+submissions, backfills).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+try:  # Optional: parse_many falls back to the scalar path without it.
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+SYMBOLOGY_BY_LENGTH = {8: "EAN_8", 12: "UPC_A", 13: "EAN_13", 14: "GTIN_14"}
+
+# Batch "format" badge / intake payload family, as before the engine existed.
+FAMILIES = {"UPC_A": "UPC", "UPC_E": "UPC", "EAN_8": "EAN", "EAN_13": "EAN", "GTIN_14": "EAN"}
+
+# Weights for the first 13 digits of a GTIN-14 (the 14th is the check digit).
+_WEIGHTS = tuple(3 if i % 2 == 0 else 1 for i in range(13))
+
+
+@dataclass(frozen=True)
+class Gtin:
+    value: str
+    symbology: str
+    gtin14: str
+    checksum_valid: bool
+
+    @property
+    def family(self) -> str:
+        return FAMILIES.get(self.symbology, "unknown")
+
+
+def check_digit(body: str) -> int:
+    """GS1 mod-10 check digit for ``body`` (the code without its check digit)."""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return (10 - total % 10) % 10
+
+
+def has_valid_check_digit(code: str) -> bool:
+    return len(code) > 1 and code.isdigit() and check_digit(code[:-1]) == int(code[-1])
+
+
+def expand_upce(code: str) -> str | None:
+    """UPC-A equivalent of an 8-digit UPC-E (number system 0/1), or None if it isn't one."""
+    if len(code) != 8 or not code.isdigit() or code[0] not in "01":
+        return None
+    ns, d, check = code[0], code[1:7], code[7]
+    last = d[5]
+    if last in "012":
+        body = d[0:2] + last + "0000" + d[2:5]
+    elif last == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif last == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + last
+    return ns + body + check
+
+
+def parse_gtin(code: str) -> Gtin | None:
+    """Classify and check one digit string; None if no GTIN has that length."""
+    if not (code.isascii() and code.isdigit()) or len(code) not in SYMBOLOGY_BY_LENGTH:
+        return None
+    if len(code) == 8:
+        # 8 digits is EAN-8 or UPC-E. EAN-8 prefixes 0/1 are restricted-circulation
+        # numbers, so a code starting 0/1 that checks out as UPC-E is UPC-E.
+        upca = expand_upce(code)
+        if upca is not None and has_valid_check_digit(upca):
+            return Gtin(code, "UPC_E", upca.zfill(14), True)
+    return Gtin(code, SYMBOLOGY_BY_LENGTH[len(code)], code.zfill(14), has_valid_check_digit(code))
+
+
+def _valid_mask(gtin14s: list[str]):
+    digits = np.frombuffer("".join(gtin14s).encode("ascii"), dtype=np.uint8).reshape(-1, 14) - 48
+    expected = (10 - (digits[:, :13].astype(np.int32) @ np.array(_WEIGHTS, dtype=np.int32)) % 10) % 10
+    return expected == digits[:, 13]
+
+
+def parse_many(codes: Sequence[str], use_numpy: bool = True) -> list[Gtin | None]:
+    """``parse_gtin`` for many codes; check digits are verified as one matrix when NumPy is available."""
+    if np is None or not use_numpy:
+        return [parse_gtin(code) for code in codes]
+
+    results: list[Gtin | None] = [None] * len(codes)
+    plain: list[int] = []
+    upce: list[tuple[int, str]] = []
+    for i, code in enumerate(codes):
+        if code.isascii() and code.isdigit() and len(code) in SYMBOLOGY_BY_LENGTH:
+            plain.append(i)
+            upca = expand_upce(code) if len(code) == 8 else None
+            if upca is not None:
+                upce.append((i, upca))
+
+    # UPC-E first; codes that fail it are classified as EAN-8 below.
+    is_upce: set[int] = set()
+    if upce:
+        for (i, upca), ok in zip(upce, _valid_mask([u.zfill(14) for _, u in upce])):
+            if ok:
+                is_upce.add(i)
+                results[i] = Gtin(codes[i], "UPC_E", upca.zfill(14), True)
+    plain = [i for i in plain if i not in is_upce]
+    if plain:
+        padded = [codes[i].zfill(14) for i in plain]
+        for i, gtin14, ok in zip(plain, padded, _valid_mask(padded)):
+            results[i] = Gtin(codes[i], SYMBOLOGY_BY_LENGTH[len(codes[i])], gtin14, bool(ok))
+    return results
@@ -0,0 +1,83 @@
+"""Backfill GTIN normalization for barcode rows written before the GTIN engine.
+
+    flask --app app backfill-gtin [--batch-size 5000]
+
+Rows are read in primary-key order (keyset pagination) and each page is parsed
+with ``gtin.parse_many`` and written back with one executemany UPDATE, so memory
+stays flat and each transaction stays short (other writers aren't locked out
+for long).
+"""
+from __future__ import annotations
+
+import click
+from flask import Flask
+from sqlalchemy import bindparam, func, select, update
+
+from cdx_web_scan import db
+from cdx_web_scan.models import BarcodeCapture
+from cdx_web_scan.web_scan.gtin import parse_many
+
+
+def needs_backfill() -> bool:
+    """True while some row still has the raw code as its value (digits, but no checksum_valid yet).
+
+    Every GTIN-shaped code written since the engine has ``checksum_valid`` set,
+    and anything else is left as typed, so this only finds rows from before.
+    """
+    table = BarcodeCapture.__table__
+    stmt = (
+        select(table.c.id)
+        .where(
+            table.c.checksum_valid.is_(None),
+            func.length(table.c.value_normalized).in_((8, 12, 13, 14)),
+            table.c.value_normalized.op("NOT GLOB")("*[^0-9]*"),
+        )
+        .limit(1)
+    )
+    return db.session.execute(stmt).first() is not None
+
+
+def backfill_gtin(batch_size: int = 5000) -> tuple[int, int]:
+    """Set symbology / value_normalized / checksum_valid from value_raw; returns (rows seen, rows updated)."""
+    table = BarcodeCapture.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            symbology=bindparam("b_symbology"),
+            value_normalized=bindparam("b_normalized"),
+            checksum_valid=bindparam("b_valid"),
+        )
+    )
+    seen = updated = 0
+    last_id = ""
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.value_raw)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        seen += len(rows)
+        params = [
+            {"b_id": row.id, "b_symbology": gtin.symbology, "b_normalized": gtin.gtin14, "b_valid": gtin.checksum_valid}
+            for row, gtin in zip(rows, parse_many([(row.value_raw or "").strip() for row in rows]))
+            if gtin is not None
+        ]
+        if params:
+            db.session.execute(stmt, params)
+            updated += len(params)
+        db.session.commit()
+    return seen, updated
+
+
+def init_app(app: Flask) -> None:
+    @app.cli.command("backfill-gtin")
+    @click.option("--batch-size", default=5000, show_default=True, help="Rows per transaction.")
+    def backfill_gtin_command(batch_size: int):
+        """Normalize existing barcode rows to GTIN-14 and set checksum_valid."""
+        seen, updated = backfill_gtin(batch_size)
+        click.echo(f"Checked {seen} barcode row(s); normalized {updated}.")
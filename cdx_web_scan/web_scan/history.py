@@ -0,0 +1,171 @@
+"""Keyset-paginated scan history.
+
+Pages are ordered newest first on ``(created_at, id)``. Each page is fetched in
+two steps:
+
+1. ``SELECT created_at, id ... WHERE (created_at, id) < (:cursor) ORDER BY
+   created_at DESC, id DESC LIMIT n+1`` reads only columns held in one of the
+   ``ix_scan_*_created_id`` indexes, so it is a single index range scan at any
+   depth (no OFFSET, no table rows touched).
+2. The page's ``Scan`` rows are loaded by primary key, with their barcodes
+   loaded by one ``selectinload`` query and the intake statuses by one grouped
+   query.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+
+from cdx_web_scan import db
+from cdx_web_scan.models import AwsIntakeCall, IntakeStatus, Scan, ScanSource
+
+# "none" = scans not yet submitted to intake (no batch session).
+INTAKE_FILTERS = ("none", *(s.value for s in IntakeStatus))
+
+# Worst status across a batch's chunk calls wins.
+_STATUS_ORDER = [IntakeStatus.failed, IntakeStatus.retrying, IntakeStatus.pending, IntakeStatus.sent, IntakeStatus.success]
+
+
+class InvalidHistoryQuery(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class HistoryFilters:
+    source: ScanSource | None = None
+    operator: str | None = None
+    session_id: str | None = None
+    intake: str | None = None
+
+    @classmethod
+    def from_args(cls, args) -> HistoryFilters:
+        source = (args.get("source") or "").strip() or None
+        intake = (args.get("intake") or "").strip() or None
+        if source is not None and source not in ScanSource.__members__:
+            raise InvalidHistoryQuery(f"Unknown source: {source}")
+        if intake is not None and intake not in INTAKE_FILTERS:
+            raise InvalidHistoryQuery(f"Unknown intake status: {intake}")
+        return cls(
+            source=ScanSource(source) if source else None,
+            operator=(args.get("operator") or "").strip() or None,
+            session_id=(args.get("session") or "").strip() or None,
+            intake=intake,
+        )
+
+    def as_args(self) -> dict[str, str]:
+        args = {"source": self.source.value if self.source else None, "operator": self.operator, "session": self.session_id, "intake": self.intake}
+        return {k: v for k, v in args.items() if v}
+
+
+@dataclass
+class HistoryPage:
+    scans: list[Scan]
+    intake_status: dict[str, IntakeStatus]
+    next_cursor: str | None
+
+
+def encode_cursor(created_at: datetime, scan_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), scan_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, scan_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(scan_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidHistoryQuery("Invalid cursor") from exc
+
+
+def _key_query(filters: HistoryFilters, cursor: str | None, limit: int):
+    stmt = select(Scan.created_at, Scan.id)
+    if filters.source is not None:
+        stmt = stmt.where(Scan.source == filters.source)
+    if filters.operator is not None:
+        stmt = stmt.where(Scan.operator == filters.operator)
+    if filters.session_id is not None:
+        stmt = stmt.where(Scan.session_id == filters.session_id)
+    if filters.intake == "none":
+        stmt = stmt.where(Scan.session_id.is_(None))
+    elif filters.intake is not None:
+        # Same rule as the displayed status: the requested one must be the worst chunk.
+        wanted = IntakeStatus(filters.intake)
+        worse = _STATUS_ORDER[: _STATUS_ORDER.index(wanted)]
+        sessions = select(AwsIntakeCall.session_id).where(AwsIntakeCall.status == wanted)
+        stmt = stmt.where(Scan.session_id.in_(sessions))
+        if worse:
+            stmt = stmt.where(Scan.session_id.not_in(select(AwsIntakeCall.session_id).where(AwsIntakeCall.status.in_(worse))))
+    if cursor:
+        created_at, scan_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Scan.created_at, Scan.id) < tuple_(created_at, scan_id))
+    return stmt.order_by(Scan.created_at.desc(), Scan.id.desc()).limit(limit + 1)
+
+
+def _intake_status(session_ids: set[str]) -> dict[str, IntakeStatus]:
+    if not session_ids:
+        return {}
+    rows = db.session.execute(
+        select(AwsIntakeCall.session_id, AwsIntakeCall.status)
+        .where(AwsIntakeCall.session_id.in_(session_ids))
+        .group_by(AwsIntakeCall.session_id, AwsIntakeCall.status)
+    )
+    status: dict[str, IntakeStatus] = {}
+    for session_id, value in rows:
+        current = status.get(session_id)
+        if current is None or _STATUS_ORDER.index(value) < _STATUS_ORDER.index(current):
+            status[session_id] = value
+    return status
+
+
+def history_page(filters: HistoryFilters, cursor: str | None = None, limit: int = 50) -> HistoryPage:
+    keys = db.session.execute(_key_query(filters, cursor, limit)).all()
+    next_cursor = None
+    if len(keys) > limit:
+        keys = keys[:limit]
+        next_cursor = encode_cursor(*keys[-1])
+    if not keys:
+        return HistoryPage([], {}, None)
+
+    by_id = {
+        scan.id: scan
+        for scan in db.session.execute(
+            select(Scan).where(Scan.id.in_([k.id for k in keys])).options(selectinload(Scan.barcodes))
+        ).scalars()
+    }
+    scans = [by_id[k.id] for k in keys if k.id in by_id]
+    return HistoryPage(scans, _intake_status({s.session_id for s in scans if s.session_id}), next_cursor)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands DateTime(timezone=True) back naive; everything is stored as UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def scan_to_dict(scan: Scan, intake_status: dict[str, IntakeStatus]) -> dict:
+    status = intake_status.get(scan.session_id) if scan.session_id else None
+    return {
+        "id": scan.id,
+        "created_at": _as_utc(scan.created_at).isoformat(),
+        "source": scan.source.value,
+        "operator": scan.operator,
+        "session_id": scan.session_id,
+        "notes": scan.notes,
+        "intake_status": status.value if status else None,
+        "barcodes": [
+            {
+                "id": b.id,
+                "symbology": b.symbology,
+                "value_raw": b.value_raw,
+                "value_normalized": b.value_normalized,
+                "checksum_valid": b.checksum_valid,
+                "is_primary": b.is_primary,
+            }
+            for b in scan.barcodes
+        ],
+    }
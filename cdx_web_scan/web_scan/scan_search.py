@@ -0,0 +1,186 @@
+"""Full-text search over scan titles / notes (SQLite FTS5).
+
+    GET /search?q=beatles abbey&limit=20
+    flask --app app backfill-scan-search [--batch-size 5000]
+
+``scan_search`` holds one row per scan: an ``INTEGER PRIMARY KEY`` plus the
+scan's ``id`` and the text to index. ``scan_fts`` is an external-content FTS5
+table over it, keyed on that integer. ``scan`` itself has a text primary key,
+so its implicit rowid is not stable (``VACUUM`` may renumber it) and nothing
+here refers to it. Triggers on ``scan`` keep ``scan_search`` in sync, so every
+writer is covered: ORM sessions, the write-behind executemany and cascading
+deletes. Triggers on ``scan_search`` keep ``scan_fts`` in sync. The
+" -- UNTITLED -- " placeholder is indexed as empty, because nearly every scan
+has it and it would only slow down and blur the ranking.
+
+``flask init-db`` creates the tables and triggers, and drops the older
+rowid-keyed index if it finds one. Rows that existed before that (including
+everything the old index covered) are added by ``backfill-scan-search``, one
+rowid range per transaction. Re-running it skips rows already indexed.
+
+Every word in a query is a prefix match (``abb`` finds "Abbey"), and all of
+them must match. Results are ranked by BM25. Scoring costs a few microseconds
+per matching row, so only the newest ``SCAN_SEARCH_RANK_WINDOW`` matches are
+ranked. The cutoff rowid is found by walking the match list backwards (no
+scoring), and the ranked query gets it as a rowid range, so a common word costs
+the same at a million scans as a rare one. FTS5 itself takes the
+``ORDER BY rank LIMIT n``, so snippets are only built for the rows returned.
+The ``notes_html`` snippet is HTML-escaped with the matches wrapped in
+``<mark>``.
+"""
+from __future__ import annotations
+
+import html
+import re
+
+import click
+from flask import Flask
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+
+from cdx_web_scan import db
+from cdx_web_scan.models import Scan
+from cdx_web_scan.web_scan.history import _intake_status, scan_to_dict
+
+# Queries use at most this many words.
+MAX_TERMS = 8
+
+# Same rule as catalog.is_placeholder_title: blank or "UNTITLED" once spaces and dashes are trimmed.
+_INDEXED_NOTES = "CASE WHEN upper(trim({row}.notes, ' -')) IN ('', 'UNTITLED') THEN NULL ELSE {row}.notes END"
+
+# Triggers from the first, scan.rowid-keyed version of the index.
+_LEGACY_TRIGGERS = ("scan_fts_after_insert", "scan_fts_after_delete", "scan_fts_after_update")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS scan_search (id INTEGER PRIMARY KEY, scan_id VARCHAR(36) NOT NULL UNIQUE, notes TEXT)",
+    # prefix='2 3': extra index entries so short prefix queries don't walk the whole term list.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS scan_fts USING fts5("
+    "notes, content='scan_search', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    """CREATE TRIGGER IF NOT EXISTS scan_search_fts_insert AFTER INSERT ON scan_search BEGIN
+        INSERT INTO scan_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_search_fts_delete AFTER DELETE ON scan_search BEGIN
+        INSERT INTO scan_fts(scan_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_search_fts_update AFTER UPDATE OF notes ON scan_search BEGIN
+        INSERT INTO scan_fts(scan_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+        INSERT INTO scan_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS scan_search_after_insert AFTER INSERT ON scan BEGIN
+        INSERT INTO scan_search(scan_id, notes) VALUES (new.id, {_INDEXED_NOTES.format(row="new")});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_search_after_delete AFTER DELETE ON scan BEGIN
+        DELETE FROM scan_search WHERE scan_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS scan_search_after_update AFTER UPDATE OF notes ON scan BEGIN
+        UPDATE scan_search SET notes = {_INDEXED_NOTES.format(row="new")} WHERE scan_id = new.id;
+    END""",
+]
+
+_BACKFILL = text(
+    f"""INSERT INTO scan_search(scan_id, notes)
+    SELECT scan.id, {_INDEXED_NOTES.format(row="scan")} FROM scan
+    WHERE scan.rowid > :after AND scan.rowid <= :upto
+      AND NOT EXISTS (SELECT 1 FROM scan_search WHERE scan_search.scan_id = scan.id)"""
+)
+
+# Rowid of the ``offset + 1``-th newest match (None when there are fewer).
+_RANK_FLOOR = text(
+    "SELECT rowid FROM scan_fts WHERE scan_fts MATCH :query ORDER BY rowid DESC LIMIT 1 OFFSET :offset"
+)
+
+_SEARCH = text(
+    """SELECT scan_search.scan_id AS scan_id, scan_fts.rank AS score,
+        snippet(scan_fts, 0, char(2), char(3), '…', 16) AS notes_snippet
+    FROM scan_fts CROSS JOIN scan_search ON scan_search.id = scan_fts.rowid
+    WHERE scan_fts MATCH :query AND scan_fts.rowid >= :floor
+    ORDER BY scan_fts.rank
+    LIMIT :limit"""
+)
+
+_WORD = re.compile(r"\w+")
+
+
+class InvalidSearchQuery(ValueError):
+    pass
+
+
+def create_scan_search() -> None:
+    """Create the search tables and triggers if missing (``create_schema`` calls this).
+
+    An index from before ``scan_search`` (keyed on ``scan.rowid``) is dropped;
+    run ``backfill-scan-search`` afterwards to rebuild it.
+    """
+    with db.engine.begin() as conn:
+        fts_sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'scan_fts'").scalar()
+        if fts_sql is not None and "content=" not in fts_sql:
+            for trigger in _LEGACY_TRIGGERS:
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.exec_driver_sql("DROP TABLE scan_fts")
+        for statement in SCHEMA:
+            conn.exec_driver_sql(statement)
+
+
+def backfill_scan_search(batch_size: int = 5000) -> int:
+    """Index scans that aren't in ``scan_search`` yet, one ``scan`` rowid range per transaction; returns rows added."""
+    last = db.session.execute(text("SELECT max(rowid) FROM scan")).scalar() or 0
+    added = after = 0
+    while after < last:
+        upto = after + max(1, batch_size)
+        added += db.session.execute(_BACKFILL, {"after": after, "upto": upto}).rowcount
+        db.session.commit()
+        after = upto
+    return added
+
+
+def match_query(query: str | None) -> str:
+    """FTS5 MATCH expression for what the user typed: every word, each as a prefix."""
+    terms = _WORD.findall(query or "")[:MAX_TERMS]
+    if not terms:
+        raise InvalidSearchQuery("Enter a word or number to search for")
+    # Quoted, so FTS5 operators and column filters in the input are just text.
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _snippet_html(snippet: str | None) -> str | None:
+    if not snippet:
+        return None
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def search_scans(query: str | None, limit: int = 20, rank_window: int = 2000) -> list[dict]:
+    """Best of the newest ``rank_window`` matches first, each a ``scan_to_dict`` plus ``score`` and snippets."""
+    match = match_query(query)
+    floor = db.session.execute(_RANK_FLOOR, {"query": match, "offset": max(limit, rank_window) - 1}).scalar()
+    hits = db.session.execute(_SEARCH, {"query": match, "floor": floor or 0, "limit": max(1, limit)}).all()
+    if not hits:
+        return []
+    by_id = {
+        scan.id: scan
+        for scan in db.session.execute(
+            select(Scan).where(Scan.id.in_([hit.scan_id for hit in hits])).options(selectinload(Scan.barcodes))
+        ).scalars()
+    }
+    status = _intake_status({scan.session_id for scan in by_id.values() if scan.session_id})
+    results = []
+    for hit in hits:
+        scan = by_id.get(hit.scan_id)
+        if scan is None:
+            continue
+        results.append(
+            {
+                **scan_to_dict(scan, status),
+                "score": round(-hit.score, 4),
+                "notes_html": _snippet_html(hit.notes_snippet),
+            }
+        )
+    return results
+
+
+def init_app(app: Flask) -> None:
+    @app.cli.command("backfill-scan-search")
+    @click.option("--batch-size", default=5000, show_default=True, help="Scan rowids per transaction.")
+    def backfill_scan_search_command(batch_size: int):
+        """Add scans written before the search index existed to it."""
+        added = backfill_scan_search(batch_size)
+        click.echo(f"Indexed {added} scan(s).")
@@ -0,0 +1,248 @@
+"""Persistence of ``/submit`` scans: direct or group-commit write-behind.
+
+Scan and barcode ids are allocated here, client-side, so a scan can be written
+as two plain INSERTs (no ``flush()`` round trip, no ``post_update`` UPDATE for
+``primary_barcode_id``) and so the UI can show the scan id before it is on disk.
+
+With ``SCAN_WRITE_BEHIND`` enabled, ``/submit`` hands the scan to one writer
+thread per process, which coalesces everything that arrives within
+``SCAN_WRITE_BEHIND_INTERVAL_MS`` (or ``SCAN_WRITE_BEHIND_MAX_ROWS`` rows) into a
+single transaction.
+
+Only the scan + barcode transaction moves off the request: the batch item for
+every scan is still committed synchronously (the batch is read back on the next
+request, possibly by another worker). So ``/submit`` still waits on one SQLite
+commit, where it used to wait on two; write-behind halves the fsyncs per scan
+rather than removing them.
+
+Crash safety: that batch item carries the pre-allocated ``scan_id``, so it
+doubles as a journal. A process that dies with scans still queued loses at most
+one interval of rows, and the intake dispatcher's leader re-creates them from
+``batch_item`` via ``recover_unwritten_scans``. It only touches items older than
+``SCAN_WRITE_BEHIND_RECOVERY_SECONDS``, so scans still queued in a live worker
+are left to that worker. Inserts use ``INSERT OR IGNORE`` so recovery and a late
+flush can't collide.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from flask import Flask, current_app
+from sqlalchemy import insert, select
+
+from cdx_web_scan import db
+from cdx_web_scan.models import BarcodeCapture, BatchItem, CaptureMethod, Scan, ScanSource, new_uuid, utcnow
+from cdx_web_scan.web_scan.gtin import parse_gtin
+
+# Batch "source" badge -> (Scan.source, BarcodeCapture.capture_method).
+SOURCES_BY_BATCH_SOURCE: dict[str, tuple[ScanSource, CaptureMethod]] = {
+    "camera": (ScanSource.camera, CaptureMethod.camera),
+    "wedge": (ScanSource.scanner, CaptureMethod.scanner),
+    "manual": (ScanSource.manual, CaptureMethod.manual),
+}
+
+
+@dataclass
+class PendingScan:
+    """One scan plus its primary barcode, ready to insert."""
+
+    value: str
+    symbology: str
+    source: ScanSource
+    capture_method: CaptureMethod
+    notes: str | None = None
+    value_normalized: str | None = None
+    checksum_valid: bool | None = None
+    scan_id: str = field(default_factory=new_uuid)
+    barcode_id: str = field(default_factory=new_uuid)
+    created_at: datetime = field(default_factory=utcnow)
+
+    def scan_row(self) -> dict:
+        return {
+            "id": self.scan_id,
+            "created_at": self.created_at,
+            "updated_at": self.created_at,
+            "source": self.source,
+            "notes": self.notes,
+            "primary_barcode_id": self.barcode_id,
+        }
+
+    def barcode_row(self) -> dict:
+        return {
+            "id": self.barcode_id,
+            "scan_id": self.scan_id,
+            "created_at": self.created_at,
+            "symbology": self.symbology,
+            "value_raw": self.value,
+            "value_normalized": self.value_normalized if self.value_normalized is not None else self.value,
+            "checksum_valid": self.checksum_valid,
+            "is_primary": True,
+            "capture_method": self.capture_method,
+        }
+
+
+def insert_scans(pending: list[PendingScan]) -> None:
+    """Insert scans and their primary barcodes in the current transaction (caller commits)."""
+    if not pending:
+        return
+    db.session.execute(insert(Scan.__table__).prefix_with("OR IGNORE"), [p.scan_row() for p in pending])
+    db.session.execute(insert(BarcodeCapture.__table__).prefix_with("OR IGNORE"), [p.barcode_row() for p in pending])
+
+
+def write_scans_now(pending: list[PendingScan]) -> None:
+    insert_scans(pending)
+    db.session.commit()
+
+
+def recover_unwritten_scans(older_than: datetime | None = None) -> int:
+    """Re-create scans referenced by batch items but missing from ``scan`` (see module docstring).
+
+    ``older_than`` limits it to items captured before then.
+    """
+    stmt = select(BatchItem).where(
+        BatchItem.scan_id.is_not(None),
+        BatchItem.scan_id.not_in(select(Scan.id)),
+    )
+    if older_than is not None:
+        # captured_at is an ISO-8601 UTC string, so it sorts as text.
+        stmt = stmt.where(BatchItem.captured_at < older_than.isoformat())
+    pending = []
+    for item in db.session.execute(stmt).scalars():
+        source, capture_method = SOURCES_BY_BATCH_SOURCE.get(item.source, SOURCES_BY_BATCH_SOURCE["manual"])
+        try:
+            created_at = datetime.fromisoformat(item.captured_at)
+        except ValueError:
+            created_at = utcnow()
+        gtin = parse_gtin(item.code)
+        pending.append(
+            PendingScan(
+                value=item.code,
+                symbology=gtin.symbology if gtin else item.format or "unknown",
+                source=source,
+                capture_method=capture_method,
+                notes=item.title,
+                value_normalized=gtin.gtin14 if gtin else None,
+                checksum_valid=gtin.checksum_valid if gtin else None,
+                scan_id=item.scan_id,
+                created_at=created_at,
+            )
+        )
+    write_scans_now(pending)
+    return len(pending)
+
+
+class ScanWriteBehind:
+    """Single writer thread that group-commits queued scans."""
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self.interval = float(app.config.get("SCAN_WRITE_BEHIND_INTERVAL_MS") or 50) / 1000
+        self.max_rows = int(app.config.get("SCAN_WRITE_BEHIND_MAX_ROWS") or 200)
+        self._queue: queue.Queue[PendingScan] = queue.Queue(maxsize=int(app.config.get("SCAN_WRITE_BEHIND_QUEUE_SIZE") or 10000))
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._done = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="scan-write-behind", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5) -> None:
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, pending: PendingScan) -> bool:
+        """Queue a scan; False if the queue is full and the caller should write directly."""
+        with self._cond:
+            try:
+                self._queue.put_nowait(pending)
+            except queue.Full:
+                return False
+            self._submitted += 1
+        return True
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Block until every scan submitted so far is committed (or dropped after an error)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            while self._done < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list[PendingScan]) -> None:
+        try:
+            with self.app.app_context():
+                try:
+                    write_scans_now(batch)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception(f"Group commit of {len(batch)} scan(s) failed; retrying one by one")
+                    for pending in batch:
+                        try:
+                            write_scans_now([pending])
+                        except Exception:
+                            db.session.rollback()
+                            self.app.logger.exception(f"Failed to persist scan {pending.scan_id}")
+                finally:
+                    db.session.remove()
+        finally:
+            with self._cond:
+                self._done += len(batch)
+                self._cond.notify_all()
+
+
+_writer_lock = threading.Lock()
+
+
+def get_scan_writer(app: Flask | None = None) -> ScanWriteBehind | None:
+    """This process's write-behind writer, or None when SCAN_WRITE_BEHIND is off."""
+    app = app or current_app._get_current_object()  # type: ignore[attr-defined]
+    if not app.config.get("SCAN_WRITE_BEHIND"):
+        return None
+    writer = app.extensions.get("scan_writer")
+    if writer is None or writer._pid != os.getpid():
+        with _writer_lock:
+            writer = app.extensions.get("scan_writer")
+            if writer is None or writer._pid != os.getpid():
+                # New process (or first use): threads don't survive a fork.
+                writer = app.extensions["scan_writer"] = ScanWriteBehind(app)
+    writer.start()
+    return writer
@@ -0,0 +1,276 @@
+"""Global "scanned before?" lookups on ``BarcodeCapture.value_normalized``.
+
+Opt-in (``SEEN_BEFORE_WINDOW_DAYS`` > 0): warming reads the whole table once
+per worker.
+
+Each process keeps a Bloom filter of every normalized GTIN in ``barcode_capture``
+(warmed in the background on the first request) plus a small LRU of last-seen
+times. The common case, a code never seen before, is answered from the filter
+without touching SQLite. A filter hit is confirmed (and its latest scan time
+fetched) through ``ix_barcode_norm_sym``, and then remembered in the LRU.
+
+Rows written by other gunicorn workers are picked up by the same background
+thread, which re-reads ``barcode_capture`` by ``rowid`` every
+``SEEN_INDEX_SYNC_SECONDS``: a short range scan that requests never wait on.
+Inserts always land above the last rowid seen unless the newest rows were
+deleted (SQLite then reuses their rowids), and rows already seen only change
+value through ``flask backfill-gtin``. Triggers bump
+``barcode_capture_generation`` on both (deletes and ``value_normalized``
+updates, rare), and a sync that sees a new generation re-warms from scratch.
+So does one that finds the filter holding more values than it was sized for.
+
+Rows captured before the GTIN engine only match once ``flask backfill-gtin``
+has normalized them (``flask init-db`` runs it when such rows exist). Until
+then warming refuses, with an error in the log, and lookups go to SQLite.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable
+
+from flask import Flask, current_app
+from sqlalchemy import func, literal_column, select, text
+
+from cdx_web_scan import db
+from cdx_web_scan.models import BarcodeCapture
+from cdx_web_scan.web_scan.gtin_backfill import needs_backfill
+
+_ROWID = literal_column("rowid")
+_NOT_SEEN = object()
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS barcode_capture_generation (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO barcode_capture_generation (id, generation) VALUES (1, 0)",
+    """CREATE TRIGGER IF NOT EXISTS barcode_capture_generation_delete AFTER DELETE ON barcode_capture BEGIN
+        UPDATE barcode_capture_generation SET generation = generation + 1 WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS barcode_capture_generation_update AFTER UPDATE OF value_normalized ON barcode_capture BEGIN
+        UPDATE barcode_capture_generation SET generation = generation + 1 WHERE id = 1;
+    END""",
+]
+
+_GENERATION = text("SELECT generation FROM barcode_capture_generation WHERE id = 1")
+
+
+def create_seen_index_triggers() -> None:
+    """Create the generation counter and its triggers if missing (``create_schema`` calls this)."""
+    with db.engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.exec_driver_sql(statement)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one BLAKE2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = self.capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    # SQLite hands DateTime(timezone=True) back naive; everything is stored as UTC.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class SeenIndex:
+    def __init__(self, app: Flask):
+        self.app = app
+        self.capacity = int(app.config.get("SEEN_INDEX_CAPACITY") or 1_000_000)
+        self.error_rate = float(app.config.get("SEEN_INDEX_ERROR_RATE") or 0.01)
+        self.sync_seconds = float(app.config.get("SEEN_INDEX_SYNC_SECONDS") or 1)
+        self.lru_size = int(app.config.get("SEEN_INDEX_LRU_SIZE") or 10_000)
+        self._lock = threading.Lock()
+        self._bloom: BloomFilter | None = None
+        self._added = 0  # Values put in the filter, duplicates included.
+        self._generation = 0
+        self._high_water = 0
+        self._recent: OrderedDict[str, object] = OrderedDict()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._pid = os.getpid()
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def warm(self) -> int:
+        """Load every normalized value into a fresh filter; returns the row count.
+
+        Raises RuntimeError while rows from before the GTIN engine are still
+        waiting for ``flask backfill-gtin``: they would never match.
+        """
+        with self.app.app_context():
+            try:
+                if needs_backfill():
+                    raise RuntimeError("barcode_capture has rows that need `flask backfill-gtin`")
+                # Read first: a change made while the table is scanned bumps it past this.
+                generation = db.session.execute(_GENERATION).scalar() or 0
+                count = db.session.execute(select(func.count()).select_from(BarcodeCapture)).scalar_one()
+                bloom = BloomFilter(max(self.capacity, count * 2), self.error_rate)
+                high_water = 0
+                stmt = (
+                    select(_ROWID, BarcodeCapture.value_normalized)
+                    .select_from(BarcodeCapture)
+                    .execution_options(yield_per=10_000)
+                )
+                for rowid, value in db.session.execute(stmt):
+                    if value:
+                        bloom.add(value)
+                    high_water = max(high_water, rowid)
+            finally:
+                db.session.remove()
+        with self._lock:
+            self._bloom, self._added, self._generation, self._high_water = bloom, count, generation, high_water
+        return count
+
+    def start(self) -> None:
+        """Warm the filter, then keep it in sync, on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="seen-index", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            started = time.perf_counter()
+            count = self.warm()
+            self.app.logger.info(f"Seen-before index warmed with {count} barcode(s) in {time.perf_counter() - started:.2f}s")
+        except Exception:
+            self.app.logger.exception("Seen-before index warm-up failed; lookups go to the database")
+            return
+        while not self._stop.wait(self.sync_seconds):
+            try:
+                self.sync()
+            except Exception:
+                self.app.logger.exception("Seen-before index sync failed")
+
+    def _remember(self, value: str, seen_at: object) -> None:
+        # Caller holds the lock.
+        self._recent[value] = seen_at
+        self._recent.move_to_end(value)
+        while len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+    def add(self, value: str, seen_at: datetime) -> None:
+        """Record a scan this process just wrote."""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(value)
+                self._added += 1
+            self._remember(value, _as_utc(seen_at))
+
+    def sync(self) -> None:
+        """Pull in values other workers inserted since the last sync (or re-warm, see module docstring)."""
+        with self._lock:
+            high_water, generation = self._high_water, self._generation
+            outgrown = self._bloom is not None and self._added > self._bloom.capacity
+        with self.app.app_context():
+            try:
+                if outgrown or (db.session.execute(_GENERATION).scalar() or 0) != generation:
+                    rows = None
+                else:
+                    rows = db.session.execute(
+                        select(_ROWID, BarcodeCapture.value_normalized, BarcodeCapture.created_at)
+                        .select_from(BarcodeCapture)
+                        .where(_ROWID > high_water)
+                        .order_by(_ROWID)
+                    ).all()
+            finally:
+                db.session.remove()
+        if rows is None:
+            self.warm()
+            with self._lock:
+                # Cached answers may predate a delete or a backfill.
+                self._recent.clear()
+            return
+        if not rows:
+            return
+        with self._lock:
+            for rowid, value, created_at in rows:
+                if value:
+                    self._bloom.add(value)
+                    self._added += 1
+                    if value in self._recent:
+                        self._remember(value, _as_utc(created_at))
+                self._high_water = max(self._high_water, rowid)
+
+    def last_seen(self, value: str) -> datetime | None:
+        """Most recent capture time of ``value`` (normalized), or None if never scanned."""
+        if not value:
+            return None
+        if self._bloom is not None:
+            with self._lock:
+                if value not in self._bloom:
+                    return None
+                cached = self._recent.get(value)
+                if cached is not None:
+                    self._recent.move_to_end(value)
+                    return None if cached is _NOT_SEEN else cached  # type: ignore[return-value]
+
+        seen_at = _as_utc(
+            db.session.execute(
+                select(func.max(BarcodeCapture.created_at)).where(BarcodeCapture.value_normalized == value)
+            ).scalar()
+        )
+        if self._bloom is not None:
+            with self._lock:
+                # A Bloom false positive is remembered too, so it only costs one query.
+                self._remember(value, _NOT_SEEN if seen_at is None else seen_at)
+        return seen_at
+
+
+_index_lock = threading.Lock()
+
+
+def get_seen_index(app: Flask | None = None) -> SeenIndex:
+    app = app or current_app._get_current_object()  # type: ignore[attr-defined]
+    index = app.extensions.get("seen_index")
+    if index is None or index._pid != os.getpid():
+        with _index_lock:
+            index = app.extensions.get("seen_index")
+            if index is None or index._pid != os.getpid():
+                # Threads and the filter's warm-up don't survive a fork.
+                index = app.extensions["seen_index"] = SeenIndex(app)
+    return index
+
+
+def init_app(app: Flask) -> None:
+    """Start each worker's index in the background on its first request (after gunicorn forks)."""
+    if not app.config.get("SEEN_BEFORE_WINDOW_DAYS"):
+        return
+
+    @app.before_request
+    def _start_seen_index():
+        get_seen_index(app).start()
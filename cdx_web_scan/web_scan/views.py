@@ -1,14 +1,40 @@
 from __future__ import annotations
 
 import json
+import uuid
 from pathlib import Path
-from datetime import datetime, timezone
-
-from flask import Blueprint, Response, current_app, render_template, request, send_from_directory, session
+from datetime import datetime, timedelta, timezone
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_from_directory,
+    session,
+    stream_with_context,
+    url_for,
+)
+from sqlalchemy import select
 
 from cdx_web_scan import db
-from cdx_web_scan.models import CaptureMethod, Scan, ScanSource
-from cdx_web_scan.web_scan.forms import validate_upc_ean
+from cdx_web_scan.intake.chunking import build_payloads
+from cdx_web_scan.intake.dispatcher import get_dispatcher
+from cdx_web_scan.intake.outbox import enqueue_batch
+from cdx_web_scan.models import AwsIntakeCall, CaptureMethod, IntakeStatus, ScanSource, utcnow
+from cdx_web_scan.web_scan import export
+from cdx_web_scan.web_scan.batch_store import BatchRef, get_batch_store
+from cdx_web_scan.web_scan.catalog import get_catalog, is_placeholder_title
+from cdx_web_scan.web_scan.forms import normalize_barcode, validate_upc_ean, validate_upc_ean_many
+from cdx_web_scan.web_scan.gtin import FAMILIES, parse_gtin
+from cdx_web_scan.web_scan.history import INTAKE_FILTERS, HistoryFilters, InvalidHistoryQuery, history_page, scan_to_dict
+from cdx_web_scan.web_scan.scan_search import InvalidSearchQuery, search_scans
+from cdx_web_scan.web_scan.scan_writer import PendingScan, get_scan_writer, write_scans_now
+from cdx_web_scan.web_scan.seen_index import get_seen_index
 
 # blueprint router configuration
 web_scan = Blueprint("web_scan", __name__)
@@ -22,123 +48,270 @@ _DEFAULT_TITLE = " -- UNTITLED -- "
 
 
 def _classify_barcode(value: str) -> str:
-    v = (value or "").strip()
-    if not v.isdigit():
-        return "unknown"
-
-    # Heuristic classification by length.
-    # - UPC-A: 12 digits
-    # - EAN-8: 8 digits
-    # - EAN-13: 13 digits
-    # - ITF-14 / GTIN-14: 14 digits (treat as EAN family for display)
-    if len(v) == 12:
-        return "UPC"
-    if len(v) in {8, 13, 14}:
-        return "EAN"
-    return "unknown"
+    """Batch "format" badge (UPC / EAN / unknown) for a code."""
+    gtin = parse_gtin((value or "").strip())
+    return gtin.family if gtin is not None else "unknown"
 
 
-def _utc_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+def _require_check_digit() -> bool:
+    return bool(current_app.config.get("GTIN_REQUIRE_CHECK_DIGIT", True))
+
+
+def _seen_before(normalized: str) -> str | None:
+    """ISO time this GTIN was last scanned (by anyone), if within SEEN_BEFORE_WINDOW_DAYS."""
+    days = float(current_app.config.get("SEEN_BEFORE_WINDOW_DAYS") or 0)
+    if days <= 0:
+        return None
+    seen_at = get_seen_index().last_seen(normalized)
+    if seen_at is None or seen_at < utcnow() - timedelta(days=days):
+        return None
+    return seen_at.isoformat()
 
 
-def _get_batch_items() -> list[dict]:
-    items = session.get("batch_items")
-    if not isinstance(items, list):
-        items = []
-    return items
+def _record_seen(pending: list[PendingScan]) -> None:
+    if current_app.config.get("SEEN_BEFORE_WINDOW_DAYS"):
+        index = get_seen_index()
+        for p in pending:
+            index.add(p.value_normalized or p.value, p.created_at)
 
 
-def _set_batch_items(items: list[dict]) -> None:
-    session["batch_items"] = items
+def _catalog_titles(gtins: list[str]) -> dict[str, str]:
+    """Titles from the local catalog for these GTIN-14s (empty when it is disabled)."""
+    if not gtins or not current_app.config.get("CATALOG_ENABLED", True):
+        return {}
+    return {gtin: hit.title for gtin, hit in get_catalog().lookup_many(gtins).items()}
+
+
+def _fill_titles(items: list[dict]) -> list[dict]:
+    """Copies of batch items with placeholder titles replaced from the catalog, where it has one."""
+    untitled = {}
+    for item in items:
+        if is_placeholder_title(item.get("title")):
+            gtin = parse_gtin((item.get("code") or "").strip())
+            if gtin is not None:
+                untitled[item["code"]] = gtin.gtin14
+    titles = _catalog_titles(list(untitled.values()))
+    if not titles:
+        return items
+    return [
+        {**item, "title": titles[untitled[item["code"]]]} if untitled.get(item.get("code")) in titles else item
+        for item in items
+    ]
 
 
-def _batch_paging_context(items: list[dict], page: int | None = None) -> dict:
-    total = len(items)
+def _utc_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _batch_ref() -> BatchRef:
+    """Resolve (and lazily create) the server-side batch for this browser session."""
+    token = session.get("batch_token")
+    if not isinstance(token, str) or not token:
+        token = str(uuid.uuid4())
+        session["batch_token"] = token
+    ref = BatchRef(token, int(session.get("batch_rev", 0) or 0))
+
+    # Sessions from before the server-side store still carry the whole list in the cookie.
+    legacy = session.pop("batch_items", None)
+    if isinstance(legacy, list) and legacy:
+        store = get_batch_store()
+        for item in legacy:
+            if isinstance(item, dict) and (item.get("code") or "").strip():
+                code = str(item["code"]).strip()
+                store.append(
+                    ref,
+                    {
+                        "code": code,
+                        "source": item.get("source") or "manual",
+                        "captured_at": item.get("captured_at") or _utc_iso(),
+                        "title": item.get("title"),
+                        "format": item.get("format") or _classify_barcode(code),
+                        "scan_id": None,
+                    },
+                )
+        ref = _bump_batch_rev(ref)
+    return ref
+
+
+def _bump_batch_rev(ref: BatchRef) -> BatchRef:
+    ref = ref.bumped()
+    session["batch_rev"] = ref.rev
+    return ref
+
+
+def _batch_paging_context(ref: BatchRef, page: int | None = None) -> dict:
+    store = get_batch_store()
+    total = store.count(ref)
     total_pages = max(1, (total + _BATCH_PER_PAGE - 1) // _BATCH_PER_PAGE)
 
     if page is None:
         page = int(session.get("batch_page", 1) or 1)
     page = max(1, min(int(page), total_pages))
-    session["batch_page"] = page
+    # Only touch the session (and so re-send the cookie) when the page actually changes.
+    if session.get("batch_page") != page:
+        session["batch_page"] = page
 
     start = (page - 1) * _BATCH_PER_PAGE
-    end = start + _BATCH_PER_PAGE
-    page_items = items[start:end]
+    page_items = _fill_titles(store.page(ref, start, _BATCH_PER_PAGE)) if total else []
 
     return {
-        "items": items,
+        "total": total,
         "page_items": page_items,
         "page": page,
         "total_pages": total_pages,
         "ol_start": start + 1,
+        "batch_view": f"{ref.rev}:{page}",
     }
 
 
-def _batch_contains_code(code: str) -> bool:
+def _total_pages(total: int) -> int:
+    return max(1, (total + _BATCH_PER_PAGE - 1) // _BATCH_PER_PAGE)
+
+
+def _client_view_page(ref: BatchRef) -> int | None:
+    """The page the client is showing, if its copy of the batch is current.
+
+    The batch fragment carries ``batch_view`` = "<rev>:<page>" and forms send it
+    back. When the rev still matches, the client's DOM is exactly what we last
+    rendered, so a single row can be appended or removed instead of re-rendering
+    the batch. Returns None when a full render is needed.
+    """
+    if not current_app.config.get("BATCH_DELTA_UPDATES", True):
+        return None
+    rev, _, page = (request.values.get("batch_view") or "").partition(":")
+    if not (rev.isdigit() and page.isdigit()) or int(rev) != ref.rev:
+        return None
+    return int(page)
+
+
+def _delta_context(ref: BatchRef, total: int, page: int) -> dict:
+    """Counters for batch_delta_fragment.html (the rows themselves are added/removed by the caller)."""
+    return {
+        "total": total,
+        "page": page,
+        "total_pages": _total_pages(total),
+        "batch_view": f"{ref.rev}:{page}",
+    }
+
+
+def _batch_contains_code(ref: BatchRef, code: str) -> bool:
     code_norm = (code or "").strip()
     if not code_norm:
         return False
-    for item in _get_batch_items():
-        if isinstance(item, dict) and (item.get("code") or "").strip() == code_norm:
-            return True
-    return False
+    return get_batch_store().contains(ref, code_norm)
 
 
-def _append_to_batch(code: str, source: str) -> list[dict]:
-    items = _get_batch_items()
-    items.append({"code": code, "source": source, "captured_at": _utc_iso(), "title": None})
-    _set_batch_items(items)
-    return items
+def _append_to_batch(ref: BatchRef, code: str, source: str) -> BatchRef:
+    item = {"code": (code or "").strip(), "source": source, "captured_at": _utc_iso(), "title": None}
+    if get_batch_store().append(ref, item):
+        ref = _bump_batch_rev(ref)
+    return ref
 
 
-def _append_to_batch_with_title(code: str, source: str, title: str | None, barcode_type: str) -> list[dict]:
-    items = _get_batch_items()
+def _append_to_batch_with_title(
+    ref: BatchRef,
+    code: str,
+    source: str,
+    title: str | None,
+    barcode_type: str,
+    scan_id: str | None = None,
+) -> tuple[BatchRef, dict | None]:
+    """Append one item; returns the new ref and the stored item (None if the code was already there)."""
     code_norm = (code or "").strip()
-    if any((item.get("code") or "").strip() == code_norm for item in items if isinstance(item, dict)):
-        return items
     normalized_title = (title or "").strip()
     if not normalized_title:
         normalized_title = _DEFAULT_TITLE
 
     barcode_type_norm = (barcode_type or "").strip() or "unknown"
-    items.append(
-        {
-            "code": code_norm,
-            "source": source,
-            "captured_at": _utc_iso(),
-            "title": normalized_title,
-            "format": barcode_type_norm,
-        }
+    item = {
+        "code": code_norm,
+        "source": source,
+        "captured_at": _utc_iso(),
+        "title": normalized_title,
+        "format": barcode_type_norm,
+        "scan_id": scan_id,
+    }
+    if not get_batch_store().append(ref, item):
+        return ref, None
+    return _bump_batch_rev(ref), item
+
+
+def _resolve_source(source_raw: str | None) -> tuple[ScanSource, CaptureMethod, str]:
+    """Map the form's ``source`` to (Scan.source, capture method, batch badge)."""
+    source_raw = (source_raw or "manual").strip().lower()
+    if source_raw == "camera":
+        return ScanSource.camera, CaptureMethod.camera, "camera"
+    if source_raw in {"wedge", "scanner"}:
+        # Wedge scanners emulate keyboard input; we store as 'scanner' in the DB enum.
+        return ScanSource.scanner, CaptureMethod.scanner, "wedge"
+    return ScanSource.manual, CaptureMethod.manual, "manual"
+
+
+def _persist_scans(pending: list[PendingScan]) -> bool:
+    """Write-behind when enabled (falling back when its queue is full), else one direct transaction."""
+    writer = get_scan_writer()
+    if writer is not None:
+        direct = [p for p in pending if not writer.submit(p)]
+    else:
+        direct = pending
+    if not direct:
+        return True
+    try:
+        write_scans_now(direct)
+        return True
+    except Exception:
+        # If the DB isn't initialized/migrated yet, still provide UI feedback.
+        db.session.rollback()
+        current_app.logger.exception("Failed to persist scan(s)")
+        return False
+
+
+def _already_in_batch(ref: BatchRef, barcode_value: str):
+    return (
+        render_template(
+            "oob_update_fragment.html",
+            ok=False,
+            message=f"Already in batch: {barcode_value}",
+            barcode=barcode_value,
+            scan_id=None,
+            **_batch_paging_context(ref),
+        ),
+        200,
     )
-    _set_batch_items(items)
-    return items
 
 
 @web_scan.route("/", methods=["GET"])
 def index():
     """Route to display the home page of the application"""
 
-    items = _get_batch_items()
-    return render_template("index.html", **_batch_paging_context(items))
+    return render_template("index.html", **_batch_paging_context(_batch_ref()))
 
 
 @web_scan.route("/batch", methods=["GET"])
 def batch_view():
-    items = _get_batch_items()
-    # Backfill missing format keys for older sessions.
-    for item in items:
-        if isinstance(item, dict) and not item.get("format"):
-            item["format"] = _classify_barcode(str(item.get("code") or ""))
-    _set_batch_items(items)
+    ref = _batch_ref()
     page_arg = request.args.get("page")
     page = int(page_arg) if page_arg and page_arg.isdigit() else None
-    return render_template("batch_fragment.html", **_batch_paging_context(items, page=page)), 200
+
+    # The fragment is a pure function of (batch, rev, requested page, app version,
+    # catalog version: _fill_titles shows titles learned after an item was added),
+    # so the browser can revalidate it without the store being touched.
+    version = current_app.extensions["template_globals"].get()["version"]
+    catalog_version = get_catalog().version() if current_app.config.get("CATALOG_ENABLED", True) else "off"
+    etag = f"batch-{ref.token}-{ref.rev}-{page or session.get('batch_page', 1)}-{version}-{catalog_version}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render_template("batch_fragment.html", **_batch_paging_context(ref, page=page)))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @web_scan.route("/submit", methods=["POST"])
 def submit_barcode():
-    validation = validate_upc_ean(request.form.get("barcode"))
+    ref = _batch_ref()
+    validation = validate_upc_ean(request.form.get("barcode"), require_check_digit=_require_check_digit())
     if not validation.ok:
         # HTMX-friendly: return a small fragment.
         return (
@@ -148,83 +321,84 @@ def submit_barcode():
                 message=validation.error,
                 barcode=None,
                 scan_id=None,
-                **_batch_paging_context(_get_batch_items()),
+                **_batch_paging_context(ref),
             ),
             200,
         )
 
-    source_raw = (request.form.get("source") or "manual").strip().lower()
-    source: ScanSource
-    capture_method: CaptureMethod
-    batch_source: str
-
-    if source_raw == "camera":
-        source = ScanSource.camera
-        capture_method = CaptureMethod.camera
-        batch_source = "camera"
-    elif source_raw in {"wedge", "scanner"}:
-        # Wedge scanners emulate keyboard input; we store as 'scanner' in the DB enum.
-        source = ScanSource.scanner
-        capture_method = CaptureMethod.scanner
-        batch_source = "wedge"
-    else:
-        source = ScanSource.manual
-        capture_method = CaptureMethod.manual
-        batch_source = "manual"
+    source, capture_method, batch_source = _resolve_source(request.form.get("source"))
 
     barcode_value = validation.value or ""
-    barcode_type = _classify_barcode(barcode_value)
+    gtin = validation.gtin
+    barcode_type = gtin.family
 
     title = (request.form.get("title") or "").strip()
     if not title:
-        title = _DEFAULT_TITLE
+        title = _catalog_titles([gtin.gtin14]).get(gtin.gtin14) or _DEFAULT_TITLE
 
     # Prevent duplicates in the current session batch.
-    if _batch_contains_code(barcode_value):
+    if _batch_contains_code(ref, barcode_value):
+        return _already_in_batch(ref, barcode_value)
+
+    seen_before = _seen_before(gtin.gtin14)
+    if seen_before and current_app.config.get("SEEN_BEFORE_REJECT"):
         return (
             render_template(
                 "oob_update_fragment.html",
                 ok=False,
-                message=f"Already in batch: {barcode_value}",
+                message=f"Already scanned: {barcode_value}",
                 barcode=barcode_value,
                 scan_id=None,
-                **_batch_paging_context(_get_batch_items()),
+                seen_before=seen_before,
+                **_batch_paging_context(ref),
             ),
             200,
         )
 
-    # Always update the batch (session-backed) so the UI works even if DB isn't ready.
-    items = _append_to_batch_with_title(barcode_value, batch_source, title, barcode_type)
+    view_page = _client_view_page(ref)
+    total_before = get_batch_store().count(ref) if view_page is not None else None
+
+    pending = PendingScan(
+        value=barcode_value,
+        symbology=gtin.symbology,
+        source=source,
+        capture_method=capture_method,
+        notes=title,
+        value_normalized=gtin.gtin14,
+        checksum_valid=gtin.checksum_valid,
+    )
+    # With write-behind the id is allocated client-side and the row lands with the next group commit.
+    scan_id = pending.scan_id if _persist_scans([pending]) else None
+    if scan_id:
+        _record_seen([pending])
+
+    ref, item = _append_to_batch_with_title(ref, barcode_value, batch_source, title, barcode_type, scan_id)
+    if item is None:
+        # Lost a race with a concurrent submit of the same code.
+        return _already_in_batch(ref, barcode_value)
+
     # After adding, jump to the last page so the newest item is visible.
-    last_page = max(1, (len(items) + _BATCH_PER_PAGE - 1) // _BATCH_PER_PAGE)
-    session["batch_page"] = last_page
+    total = get_batch_store().count(ref)
+    last_page = _total_pages(total)
+    if session.get("batch_page") != last_page:
+        session["batch_page"] = last_page
 
-    scan_id: str | None = None
-    try:
-        scan = Scan(source=source, notes=title)
-        db.session.add(scan)
-        db.session.flush()  # allocate scan.id
-
-        # Store one primary barcode row when schema exists.
-        from cdx_web_scan.models import BarcodeCapture
-
-        barcode = BarcodeCapture(
-            scan_id=scan.id,
-            symbology=barcode_type,
-            value_raw=barcode_value,
-            value_normalized=barcode_value,
-            is_primary=True,
-            capture_method=capture_method,
+    # The client is showing the (non-full) last page: append just the new row.
+    if total_before and total == total_before + 1 and view_page == last_page == _total_pages(total_before):
+        return (
+            render_template(
+                "oob_update_fragment.html",
+                ok=True,
+                message="Added to batch",
+                barcode=barcode_value,
+                scan_id=scan_id,
+                seen_before=seen_before,
+                delta="append",
+                item=item,
+                **_delta_context(ref, total, last_page),
+            ),
+            200,
         )
-        db.session.add(barcode)
-
-        scan.primary_barcode_id = barcode.id
-        db.session.commit()
-        scan_id = scan.id
-    except Exception:
-        # If the DB isn't initialized/migrated yet, still provide UI feedback.
-        db.session.rollback()
-        current_app.logger.exception("Failed to persist scan")
 
     return (
         render_template(
@@ -233,7 +407,110 @@ def submit_barcode():
             message="Added to batch",
             barcode=barcode_value,
             scan_id=scan_id,
-            **_batch_paging_context(items, page=session.get("batch_page")),
+            seen_before=seen_before,
+            **_batch_paging_context(ref, page=session.get("batch_page")),
+        ),
+        200,
+    )
+
+
+@web_scan.route("/submit/bulk", methods=["POST"])
+def submit_bulk():
+    """Add many scans in one request (client-side micro-batching of wedge bursts).
+
+    Form fields ``barcode``, ``source`` and ``title`` repeat once per scan; a single
+    ``source``/``title`` applies to every barcode.
+    """
+    ref = _batch_ref()
+    barcodes = request.form.getlist("barcode")
+    sources = request.form.getlist("source")
+    titles = request.form.getlist("title")
+    max_items = int(current_app.config.get("SUBMIT_BULK_MAX_ITEMS") or 200)
+
+    results: list[dict] = []
+    accepted: list[tuple[str, str, PendingScan]] = []
+    seen: set[str] = set()
+    validations = validate_upc_ean_many(barcodes[:max_items], require_check_digit=_require_check_digit())
+    catalog_titles = _catalog_titles([v.gtin.gtin14 for v in validations if v.ok])
+    for index, (raw, validation) in enumerate(zip(barcodes, validations)):
+        if not validation.ok:
+            results.append({"ok": False, "barcode": normalize_barcode(raw), "message": validation.error})
+            continue
+        value = validation.value or ""
+        if value in seen:
+            results.append({"ok": False, "barcode": value, "message": "Duplicate in this scan burst"})
+            continue
+        seen.add(value)
+        source_raw = sources[index] if index < len(sources) else (sources[0] if sources else None)
+        title = (titles[index] if index < len(titles) else (titles[0] if len(titles) == 1 else "")).strip()
+        source, capture_method, batch_source = _resolve_source(source_raw)
+        gtin = validation.gtin
+        pending = PendingScan(
+            value=value,
+            symbology=gtin.symbology,
+            source=source,
+            capture_method=capture_method,
+            notes=title or catalog_titles.get(gtin.gtin14) or _DEFAULT_TITLE,
+            value_normalized=gtin.gtin14,
+            checksum_valid=gtin.checksum_valid,
+        )
+        accepted.append((value, batch_source, pending))
+    for raw in barcodes[max_items:]:
+        results.append({"ok": False, "barcode": normalize_barcode(raw), "message": f"Over the {max_items}-item limit"})
+
+    # One query for the whole burst instead of a duplicate check per code.
+    present = get_batch_store().codes_present(ref, [value for value, _, _ in accepted])
+    fresh = [(v, b, p) for v, b, p in accepted if v not in present]
+    results.extend({"ok": False, "barcode": v, "message": "Already in batch"} for v, _, _ in accepted if v in present)
+
+    seen_before = {v: _seen_before(p.value_normalized) for v, _, p in fresh}
+    if current_app.config.get("SEEN_BEFORE_REJECT"):
+        results.extend(
+            {"ok": False, "barcode": v, "message": "Already scanned", "seen_before": seen_before[v]} for v, _, _ in fresh if seen_before[v]
+        )
+        fresh = [(v, b, p) for v, b, p in fresh if not seen_before[v]]
+
+    persisted = _persist_scans([p for _, _, p in fresh])
+    if persisted:
+        _record_seen([p for _, _, p in fresh])
+    captured_at = _utc_iso()
+    items = [
+        {
+            "code": value,
+            "source": batch_source,
+            "captured_at": captured_at,
+            "title": pending.notes,
+            "format": FAMILIES.get(pending.symbology, "unknown"),
+            "scan_id": pending.scan_id if persisted else None,
+        }
+        for value, batch_source, pending in fresh
+    ]
+    added_codes = get_batch_store().append_many(ref, items)
+    if added_codes:
+        ref = _bump_batch_rev(ref)
+    for item in items:
+        if item["code"] in added_codes:
+            results.append(
+                {"ok": True, "barcode": item["code"], "message": "Added to batch", "scan_id": item["scan_id"], "seen_before": seen_before[item["code"]]}
+            )
+        else:
+            # A concurrent request added it between the duplicate check and the insert.
+            results.append({"ok": False, "barcode": item["code"], "message": "Already in batch"})
+
+    # Results in the order the operator scanned them (keys normalized like the codes above).
+    order = {normalize_barcode(code): n for n, code in reversed(list(enumerate(barcodes)))}
+    results.sort(key=lambda r: order.get(r["barcode"], len(order)))
+
+    session["batch_page"] = _total_pages(get_batch_store().count(ref))
+    added = len(added_codes)
+    return (
+        render_template(
+            "oob_update_fragment.html",
+            result_template="bulk_result_fragment.html",
+            ok=added > 0,
+            message=f"Added {added} of {len(barcodes)} scan(s) to batch",
+            results=results,
+            **_batch_paging_context(ref, page=session.get("batch_page")),
         ),
         200,
     )
@@ -241,56 +518,99 @@ def submit_barcode():
 
 @web_scan.route("/batch/clear", methods=["POST"])
 def batch_clear():
-    _set_batch_items([])
+    ref = _batch_ref()
+    get_batch_store().clear(ref)
+    ref = _bump_batch_rev(ref)
     session["batch_page"] = 1
-    return render_template("batch_fragment.html", **_batch_paging_context(_get_batch_items(), page=1)), 200
+    return render_template("batch_fragment.html", **_batch_paging_context(ref, page=1)), 200
 
 
 @web_scan.route("/batch/delete/<code>", methods=["POST"])
 def batch_delete(code: str):
     code_norm = (code or "").strip()
-    items = _get_batch_items()
-
-    new_items: list[dict] = []
-    removed = False
-    for item in items:
-        if (
-            not removed
-            and isinstance(item, dict)
-            and (item.get("code") or "").strip() == code_norm
-        ):
-            removed = True
-            continue
-        new_items.append(item)
+    ref = _batch_ref()
+    store = get_batch_store()
+
+    # Deleting from the last page (typically a mis-scan just added) never shifts
+    # rows between pages, so the client can drop the one row.
+    view_page = _client_view_page(ref)
+    delta = False
+    if view_page is not None:
+        total = store.count(ref)
+        start = (view_page - 1) * _BATCH_PER_PAGE
+        on_page = any(i["code"] == code_norm for i in store.page(ref, start, _BATCH_PER_PAGE))
+        delta = on_page and view_page == _total_pages(total) and total - 1 > start
+
+    if not store.delete(ref, code_norm):
+        delta = False
+    else:
+        ref = _bump_batch_rev(ref)
 
-    _set_batch_items(new_items)
+    if delta:
+        response = make_response(
+            render_template(
+                "batch_delta_fragment.html",
+                delta="remove",
+                removed_code=code_norm,
+                **_delta_context(ref, total - 1, view_page),
+            )
+        )
+        # Everything in the response is out-of-band; leave #batch itself alone.
+        response.headers["HX-Reswap"] = "none"
+        return response
     # Keep the current page if possible; clamp in paging helper.
-    return render_template("batch_fragment.html", **_batch_paging_context(new_items)), 200
-
-
-def _post_json(url: str, payload: dict, headers: dict[str, str] | None = None) -> tuple[int, str]:
-    import urllib.request
-
-    body = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(url, data=body, method="POST")
-    req.add_header("Content-Type", "application/json")
-    if headers:
-        for k, v in headers.items():
-            req.add_header(k, v)
-
-    try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            status = getattr(resp, "status", 200)
-            return status, resp.read().decode("utf-8")
-    except urllib.error.HTTPError as e:  # type: ignore[attr-defined]
-        return int(getattr(e, "code", 500)), (e.read().decode("utf-8") if hasattr(e, "read") else str(e))
-    except Exception as e:
-        return 0, str(e)
+    return render_template("batch_fragment.html", **_batch_paging_context(ref)), 200
+
+
+def _response_text(call: AwsIntakeCall) -> str | None:
+    body = call.response_body
+    if isinstance(body, dict) and set(body) == {"text"}:
+        return body["text"]
+    if body is not None:
+        return json.dumps(body, indent=2)
+    return call.error
+
+
+def _intake_batch_context(batch_id: str, calls: list[AwsIntakeCall], item_count: int | None = None) -> dict:
+    """Template context for submit_result_fragment.html summarising a batch's chunk calls."""
+    done = [c for c in calls if c.status == IntakeStatus.success]
+    failed = [c for c in calls if c.status == IntakeStatus.failed]
+    retrying = [c for c in calls if c.status == IntakeStatus.retrying]
+    outstanding = len(calls) - len(done) - len(failed)
+    chunks = f" ({len(done)}/{len(calls)} chunks delivered)" if len(calls) > 1 else ""
+
+    if outstanding:
+        count = f"{item_count} item(s)" if item_count is not None else "Batch"
+        message = f"Queued {count} for intake{chunks}"
+        if retrying:
+            message = f"Intake API unavailable; retry {max(c.attempt for c in retrying)} scheduled automatically{chunks}"
+        return {
+            "ok": not failed,
+            "message": message if not failed else f"{len(failed)} chunk(s) failed; {outstanding} still queued",
+            "response_body": None,
+            "poll_url": url_for("web_scan.batch_submit_status", batch_id=batch_id),
+        }
+    if failed:
+        worst = failed[0]
+        return {
+            "ok": False,
+            "message": f"Submit failed (HTTP {worst.http_status or 0}){chunks}",
+            "response_body": _response_text(worst),
+            "poll_url": None,
+        }
+    return {
+        "ok": True,
+        "message": f"Submitted to intake{chunks}",
+        "response_body": _response_text(calls[-1]) if len(calls) == 1 else None,
+        "poll_url": None,
+    }
 
 
 @web_scan.route("/batch/submit", methods=["POST"])
 def batch_submit():
-    items = _get_batch_items()
+    ref = _batch_ref()
+    store = get_batch_store()
+    items = _fill_titles(store.all(ref))
     if not items:
         return render_template(
             "submit_result_fragment.html",
@@ -299,7 +619,8 @@ def batch_submit():
             response_body=None,
         ), 200
 
-    intake_url = current_app.config.get("INTAKE_API_URL") or ""
+    config = current_app.config
+    intake_url = config.get("INTAKE_API_URL") or ""
     if not intake_url:
         return render_template(
             "submit_result_fragment.html",
@@ -308,34 +629,119 @@ def batch_submit():
             response_body=None,
         ), 200
 
-    # Minimal, generic payload. Adjust keys to match your API contract.
-    payload = {
-        "source": "cdx-web-scan",
-        "submitted_at": _utc_iso(),
-        "barcodes": [item["code"] for item in items],
-        "items": items,
-    }
+    # Minimal, generic payload (see intake/chunking.py). Adjust keys to match your API contract.
+    mode = config.get("INTAKE_PAYLOAD_MODE") or "full"
+    payloads = build_payloads(
+        items,
+        _utc_iso(),
+        mode=mode,
+        max_items=int(config.get("INTAKE_CHUNK_MAX_ITEMS") or 0),
+        max_bytes=int(config.get("INTAKE_CHUNK_MAX_BYTES") or 0),
+    )
 
-    headers: dict[str, str] = {}
-    token = current_app.config.get("INTAKE_API_TOKEN")
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+    # Batched scans must be on disk before the outbox links them to this batch.
+    writer = get_scan_writer()
+    if writer is not None:
+        writer.flush()
 
-    status, body = _post_json(intake_url, payload, headers=headers)
-    ok = 200 <= status < 300
+    # Durable hand-off: once the outbox rows are committed the batch is safe to clear,
+    # and the dispatcher delivers them without holding this request thread.
+    try:
+        batch, calls = enqueue_batch(items, payloads, intake_url, envelope=mode == "compact")
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Failed to queue batch for intake")
+        return render_template(
+            "submit_result_fragment.html",
+            ok=False,
+            message="Could not queue the batch; it has been kept.",
+            response_body=None,
+        ), 200
 
-    if ok:
-        _set_batch_items([])
+    store.clear(ref)
+    _bump_batch_rev(ref)
+    if config.get("INTAKE_DISPATCHER_ENABLED", True):
+        get_dispatcher().wake()
 
-    return (
-        render_template(
-            "submit_result_fragment.html",
-            ok=ok,
-            message=(f"Submitted {len(items)} item(s)" if ok else f"Submit failed (HTTP {status})"),
-            response_body=body,
-        ),
-        200,
+    context = _intake_batch_context(batch.id, calls, len(items))
+    return render_template("submit_result_fragment.html", **context), 200
+
+
+@web_scan.route("/batch/submit/<batch_id>", methods=["GET"])
+def batch_submit_status(batch_id: str):
+    calls = list(
+        db.session.execute(
+            select(AwsIntakeCall).where(AwsIntakeCall.session_id == batch_id).order_by(AwsIntakeCall.created_at)
+        ).scalars()
+    )
+    if not calls:
+        abort(404)
+    return render_template("submit_result_fragment.html", **_intake_batch_context(batch_id, calls)), 200
+
+
+@web_scan.route("/history", methods=["GET"])
+def history():
+    """Scan history, newest first: HTML page, HTMX "load more" rows, or JSON (``?format=json``)."""
+    wants_json = request.args.get("format") == "json" or request.accept_mimetypes.best == "application/json"
+    limit_arg = request.args.get("limit")
+    limit = int(limit_arg) if limit_arg and limit_arg.isdigit() else current_app.config["HISTORY_PAGE_SIZE"]
+    limit = max(1, min(limit, current_app.config["HISTORY_MAX_PAGE_SIZE"]))
+    try:
+        filters = HistoryFilters.from_args(request.args)
+        page = history_page(filters, cursor=request.args.get("cursor") or None, limit=limit)
+    except InvalidHistoryQuery as exc:
+        if wants_json:
+            return jsonify({"error": str(exc)}), 400
+        abort(400, description=str(exc))
+
+    scans = [scan_to_dict(scan, page.intake_status) for scan in page.scans]
+    if wants_json:
+        return jsonify({"scans": scans, "next_cursor": page.next_cursor})
+    context = {"scans": scans, "next_cursor": page.next_cursor, "filters": filters}
+    if request.headers.get("HX-Request") and request.args.get("cursor"):
+        return render_template("history_rows_fragment.html", **context)
+    return render_template(
+        "history.html", sources=[s.value for s in ScanSource], intake_filters=INTAKE_FILTERS, **context
+    )
+
+
+@web_scan.route("/search", methods=["GET"])
+def search():
+    """Ranked full-text search over scan titles / notes and raw input (``?q=``, ``limit``), as JSON."""
+    limit_arg = request.args.get("limit")
+    limit = int(limit_arg) if limit_arg and limit_arg.isdigit() else 20
+    limit = max(1, min(limit, current_app.config["SCAN_SEARCH_MAX_RESULTS"]))
+    try:
+        results = search_scans(request.args.get("q"), limit=limit, rank_window=current_app.config["SCAN_SEARCH_RANK_WINDOW"])
+    except InvalidSearchQuery as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"results": results})
+
+
+@web_scan.route("/export/<dataset>", methods=["GET"])
+def export_dataset(dataset: str):
+    """Stream a dataset as CSV / NDJSON / Parquet (``?format=``, ``since``, ``until``, ``gzip=1``)."""
+    fmt = request.args.get("format", "csv")
+    use_gzip = request.args.get("gzip", "").lower() in {"1", "true", "yes"}
+    try:
+        export.check_request(dataset, fmt, use_gzip)
+        since = export.parse_time(request.args.get("since"))
+        until = export.parse_time(request.args.get("until"))
+    except export.ExportError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    stream = export.export_stream(
+        dataset, fmt, since, until, gzip=use_gzip, chunk_size=current_app.config["EXPORT_CHUNK_SIZE"]
+    )
+    response = Response(
+        stream_with_context(stream),
+        mimetype="application/gzip" if use_gzip else export.FORMATS[fmt][0],
     )
+    response.headers["Content-Disposition"] = f'attachment; filename="{export.export_filename(dataset, fmt, use_gzip)}"'
+    response.headers["Cache-Control"] = "no-store"
+    # Let NGINX pass chunks through instead of spooling the whole export to disk.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 
 @web_scan.route("/manifest.webmanifest", methods=["GET"])
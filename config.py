@@ -28,6 +28,8 @@ class Config:
     )
     CDX_WEB_SCAN_DB_FOLDER = environ.get("CDX_WEB_SCAN_DB_FOLDER") or CDX_WEB_SCAN_FOLDER
     CDX_WEB_SCAN_DB_FILE_NAME = environ.get("CDX_WEB_SCAN_DB_FILE_NAME") or "cdx_web_scan.sqlite"
+    # How long a writer waits on another writer's lock before "database is locked" (WAL mode).
+    SQLITE_BUSY_TIMEOUT_MS = int(environ.get("SQLITE_BUSY_TIMEOUT_MS") or 5000)
     CDX_WEB_SCAN_LOG_FILE = (
         environ.get("CDX_WEB_SCAN_LOG_FILE")
         or path.join(CDX_WEB_SCAN_FOLDER, "cdx_web_scan.log")
@@ -35,9 +37,150 @@ class Config:
 
     APP_SERVER_OS = environ.get("APP_SERVER_OS") or "Linux"
 
+    # Application log: written by a background thread per process (LOG_QUEUE=0 writes
+    # inline), rotated at LOG_MAX_BYTES and/or every LOG_ROTATE_SECONDS (e.g. 86400),
+    # keeping LOG_BACKUP_COUNT old files. LOG_FORMAT is "text" or "json" (one object per
+    # line with request_id/client_ip). LOG_REQUESTS adds one line per request.
+    LOG_FORMAT = environ.get("LOG_FORMAT") or "text"
+    LOG_QUEUE = (environ.get("LOG_QUEUE") or "1").lower() not in {"0", "false", "no"}
+    LOG_MAX_BYTES = int(environ.get("LOG_MAX_BYTES") or 10 * 1024 * 1024)
+    LOG_ROTATE_SECONDS = float(environ.get("LOG_ROTATE_SECONDS") or 0)
+    LOG_BACKUP_COUNT = int(environ.get("LOG_BACKUP_COUNT") or 5)
+    LOG_REQUESTS = (environ.get("LOG_REQUESTS") or "0").lower() in {"1", "true", "yes"}
+
+    # Log viewer: polls /get-log?since= by default. LOG_STREAM_ENABLED switches
+    # it to SSE (/get-log/stream), which holds a worker thread per open viewer;
+    # at most LOG_STREAM_MAX_CONCURRENT streams per process, the rest keep polling.
+    LOG_STREAM_ENABLED = (environ.get("LOG_STREAM_ENABLED") or "0").lower() in {"1", "true", "yes"}
+    LOG_STREAM_MAX_CONCURRENT = int(environ.get("LOG_STREAM_MAX_CONCURRENT") or 2)
+    # A stream polls the file this often and closes after LOG_STREAM_MAX_SECONDS
+    # (the browser's EventSource reconnects and resumes).
+    LOG_STREAM_POLL_SECONDS = float(environ.get("LOG_STREAM_POLL_SECONDS") or 1)
+    LOG_STREAM_MAX_SECONDS = float(environ.get("LOG_STREAM_MAX_SECONDS") or 60)
+
+    # Log search (/get-log/search): each log file is sampled every
+    # LOG_SEARCH_INDEX_STRIDE bytes to map times to offsets; a query returns at
+    # most LOG_SEARCH_MAX_RESULTS records.
+    LOG_SEARCH_INDEX_STRIDE = int(environ.get("LOG_SEARCH_INDEX_STRIDE") or 64 * 1024)
+    LOG_SEARCH_MAX_RESULTS = int(environ.get("LOG_SEARCH_MAX_RESULTS") or 500)
+
+    # Template globals (version, asset_rev) are computed once per process; when
+    # > 0, pyproject.toml and the static assets are re-stat()ed at most this often.
+    TEMPLATE_GLOBALS_RECHECK_SECONDS = float(environ.get("TEMPLATE_GLOBALS_RECHECK_SECONDS") or 0)
+
+    # Static asset pipeline: content-hashed + precompressed copies of app.js/styles.css
+    # are written to ASSET_DIST_DIR at startup (or by `flask build-assets`).
+    # Docker points this at the data volume so nginx can serve the files directly.
+    ASSET_PIPELINE = (environ.get("ASSET_PIPELINE") or "1").lower() not in {"0", "false", "no"}
+    ASSET_BUILD_ON_STARTUP = (environ.get("ASSET_BUILD_ON_STARTUP") or "1").lower() not in {"0", "false", "no"}
+    ASSET_DIST_DIR = environ.get("ASSET_DIST_DIR") or path.join(basedir, "cdx_web_scan", "static", "dist")
+
+    # Prometheus /metrics. Each worker snapshots its values into METRICS_DIR every
+    # METRICS_FLUSH_SECONDS so any worker can report totals for all of them. Each run of
+    # the service gets its own subdirectory; finished runs are removed at startup.
+    METRICS_ENABLED = (environ.get("METRICS_ENABLED") or "1").lower() not in {"0", "false", "no"}
+    METRICS_DIR = environ.get("METRICS_DIR") or path.join(CDX_WEB_SCAN_FOLDER, "metrics")
+    METRICS_FLUSH_SECONDS = float(environ.get("METRICS_FLUSH_SECONDS") or 5)
+
+    # Opt-in per-request profiling (DB / render / session / other split and SQL text),
+    # written to PROFILING_DIR and listed at /debug/profile. PROFILING_CPROFILE_RATE
+    # of requests also run under cProfile; dumps are kept for those over PROFILING_SLOW_MS.
+    PROFILING_ENABLED = (environ.get("PROFILING_ENABLED") or "0").lower() in {"1", "true", "yes"}
+    PROFILING_DIR = environ.get("PROFILING_DIR") or path.join(CDX_WEB_SCAN_FOLDER, "profiles")
+    PROFILING_CPROFILE_RATE = float(environ.get("PROFILING_CPROFILE_RATE") or 0)
+    PROFILING_SLOW_MS = float(environ.get("PROFILING_SLOW_MS") or 250)
+
     # Intake API (AWS API Gateway + Lambda)
     INTAKE_API_URL = environ.get("INTAKE_API_URL")
     INTAKE_API_TOKEN = environ.get("INTAKE_API_TOKEN")
+    # Pooled keep-alive client: connections per host, connect vs. read timeouts (seconds).
+    INTAKE_POOL_SIZE = int(environ.get("INTAKE_POOL_SIZE") or 4)
+    INTAKE_CONNECT_TIMEOUT = float(environ.get("INTAKE_CONNECT_TIMEOUT") or 5)
+    INTAKE_REQUEST_TIMEOUT = float(environ.get("INTAKE_REQUEST_TIMEOUT") or 15)
+    # Opt-in: gzip request bodies at or above this size. Only turn it on once the
+    # API Gateway/Lambda decodes Content-Encoding: gzip, or intake calls will fail.
+    INTAKE_GZIP_REQUESTS = (environ.get("INTAKE_GZIP_REQUESTS") or "0").lower() in {"1", "true", "yes"}
+    INTAKE_GZIP_MIN_BYTES = int(environ.get("INTAKE_GZIP_MIN_BYTES") or 1024)
+
+    # Background outbox dispatcher (one per worker process; one leader sends).
+    INTAKE_DISPATCHER_ENABLED = (environ.get("INTAKE_DISPATCHER_ENABLED") or "1").lower() not in {"0", "false", "no"}
+    INTAKE_DISPATCH_THREADS = int(environ.get("INTAKE_DISPATCH_THREADS") or 4)
+    INTAKE_DISPATCH_POLL_SECONDS = float(environ.get("INTAKE_DISPATCH_POLL_SECONDS") or 2)
+    # Must stay above connect + read timeouts so a live leader keeps its lease mid-send.
+    INTAKE_DISPATCH_LEASE_SECONDS = float(environ.get("INTAKE_DISPATCH_LEASE_SECONDS") or 30)
+
+    # Dispatcher sends go through a per-worker asyncio engine, so many calls can wait on the
+    # API at once over INTAKE_POOL_SIZE connections; off = one blocking send thread per call.
+    INTAKE_ASYNC_ENGINE = (environ.get("INTAKE_ASYNC_ENGINE") or "1").lower() not in {"0", "false", "no"}
+    INTAKE_ASYNC_MAX_IN_FLIGHT = int(environ.get("INTAKE_ASYNC_MAX_IN_FLIGHT") or 200)
+
+    # Retries for transient intake failures: capped exponential backoff with full jitter.
+    INTAKE_RETRY_MAX_ATTEMPTS = int(environ.get("INTAKE_RETRY_MAX_ATTEMPTS") or 8)
+    INTAKE_RETRY_BASE_SECONDS = float(environ.get("INTAKE_RETRY_BASE_SECONDS") or 2)
+    INTAKE_RETRY_MAX_DELAY_SECONDS = float(environ.get("INTAKE_RETRY_MAX_DELAY_SECONDS") or 300)
+
+    # Opt-in: split large batches into chunks (one outbox row and one request each) by item
+    # count and/or JSON size, e.g. 100 and 262144. 0 = no limit; with both 0 (the default)
+    # a batch goes out as a single request, as before.
+    INTAKE_CHUNK_MAX_ITEMS = int(environ.get("INTAKE_CHUNK_MAX_ITEMS") or 0)
+    INTAKE_CHUNK_MAX_BYTES = int(environ.get("INTAKE_CHUNK_MAX_BYTES") or 0)
+    # Chunks of one batch the dispatcher sends concurrently.
+    INTAKE_CHUNKS_IN_FLIGHT = int(environ.get("INTAKE_CHUNKS_IN_FLIGHT") or 4)
+    # "full" sends barcodes + items, the same keys as the original contract.
+    # "compact" sends items only, plus batch_id and chunk {index, count} so the API can stitch chunks.
+    INTAKE_PAYLOAD_MODE = environ.get("INTAKE_PAYLOAD_MODE") or "full"
+
+    # Working batch storage (server-side; the session cookie only holds a token).
+    # Backend is "sqlite" or a dotted "module:Class" path to a BatchStore subclass.
+    BATCH_STORE_BACKEND = environ.get("BATCH_STORE_BACKEND") or "sqlite"
+    # Number of batches kept in the per-process LRU layer (0 disables it).
+    BATCH_STORE_CACHE_SIZE = int(environ.get("BATCH_STORE_CACHE_SIZE") or 256)
+    # Reject codes whose GS1 check digit doesn't match (almost always a misread).
+    GTIN_REQUIRE_CHECK_DIGIT = (environ.get("GTIN_REQUIRE_CHECK_DIGIT") or "1").lower() not in {"0", "false", "no"}
+    # Opt-in: flag codes already scanned (by any operator) within this many days (0 = off).
+    # Each worker then reads all of barcode_capture once at startup to build its index
+    # (refused, with an error logged, until `flask backfill-gtin` has normalized old rows).
+    # SEEN_BEFORE_REJECT refuses them instead of just showing the prior scan time.
+    SEEN_BEFORE_WINDOW_DAYS = float(environ.get("SEEN_BEFORE_WINDOW_DAYS") or 0)
+    SEEN_BEFORE_REJECT = (environ.get("SEEN_BEFORE_REJECT") or "0").lower() in {"1", "true", "yes"}
+    # Per-process Bloom filter sizing (rebuilt larger once outgrown) and how often its
+    # background thread catches up on other workers' inserts.
+    SEEN_INDEX_CAPACITY = int(environ.get("SEEN_INDEX_CAPACITY") or 1_000_000)
+    SEEN_INDEX_SYNC_SECONDS = float(environ.get("SEEN_INDEX_SYNC_SECONDS") or 1)
+    # Local barcode catalog (`flask import-catalog`, plus titles learned from intake
+    # responses) fills in titles left blank. Each process caches up to CATALOG_LRU_SIZE
+    # lookups, misses included, for CATALOG_CACHE_TTL_SECONDS.
+    CATALOG_ENABLED = (environ.get("CATALOG_ENABLED") or "1").lower() not in {"0", "false", "no"}
+    CATALOG_LEARN_FROM_INTAKE = (environ.get("CATALOG_LEARN_FROM_INTAKE") or "1").lower() not in {"0", "false", "no"}
+    CATALOG_LRU_SIZE = int(environ.get("CATALOG_LRU_SIZE") or 50_000)
+    CATALOG_CACHE_TTL_SECONDS = float(environ.get("CATALOG_CACHE_TTL_SECONDS") or 60)
+    # Append/remove single batch rows out-of-band when the client's view is current.
+    BATCH_DELTA_UPDATES = (environ.get("BATCH_DELTA_UPDATES") or "1").lower() not in {"0", "false", "no"}
+    # Scans per /history page (?limit= may ask for fewer, never more than the max).
+    HISTORY_PAGE_SIZE = int(environ.get("HISTORY_PAGE_SIZE") or 50)
+    HISTORY_MAX_PAGE_SIZE = int(environ.get("HISTORY_MAX_PAGE_SIZE") or 200)
+    # Full-text /search results per request (?limit= may ask for fewer). Only the newest
+    # SCAN_SEARCH_RANK_WINDOW matches are ranked, which bounds the cost of common words.
+    SCAN_SEARCH_MAX_RESULTS = int(environ.get("SCAN_SEARCH_MAX_RESULTS") or 100)
+    SCAN_SEARCH_RANK_WINDOW = int(environ.get("SCAN_SEARCH_RANK_WINDOW") or 2000)
+    # Rows fetched (and encoded) per step of a /export or `flask export` stream.
+    EXPORT_CHUNK_SIZE = int(environ.get("EXPORT_CHUNK_SIZE") or 1000)
+
+    # Group-commit write-behind for /submit scan rows (one writer thread per process).
+    # The batch item is still committed in the request; see web_scan/scan_writer.py.
+    SCAN_WRITE_BEHIND = (environ.get("SCAN_WRITE_BEHIND") or "0").lower() in {"1", "true", "yes"}
+    SCAN_WRITE_BEHIND_INTERVAL_MS = int(environ.get("SCAN_WRITE_BEHIND_INTERVAL_MS") or 50)
+    SCAN_WRITE_BEHIND_MAX_ROWS = int(environ.get("SCAN_WRITE_BEHIND_MAX_ROWS") or 200)
+    # When the queue is full, /submit falls back to writing the scan directly.
+    SCAN_WRITE_BEHIND_QUEUE_SIZE = int(environ.get("SCAN_WRITE_BEHIND_QUEUE_SIZE") or 10000)
+    # The intake dispatcher's leader re-creates scans still missing this long after their
+    # batch item was written (a worker died with them queued); it checks this often too.
+    SCAN_WRITE_BEHIND_RECOVERY_SECONDS = float(environ.get("SCAN_WRITE_BEHIND_RECOVERY_SECONDS") or 60)
+
+    # Opt-in client micro-batching: wedge scans arriving within this window (ms) are
+    # buffered by app.js and sent together to /submit/bulk. 0 keeps one /submit per scan.
+    SUBMIT_BULK_WINDOW_MS = int(environ.get("SUBMIT_BULK_WINDOW_MS") or 0)
+    SUBMIT_BULK_MAX_ITEMS = int(environ.get("SUBMIT_BULK_MAX_ITEMS") or 200)
 
 class ProdConfig(Config):
     """Production System Configuration"""
@@ -56,4 +199,5 @@ class DevConfig(Config):
     DEBUG = True
     TESTING = True
     LOG_LINES_TO_SHOW = "164"
+    TEMPLATE_GLOBALS_RECHECK_SECONDS = float(environ.get("TEMPLATE_GLOBALS_RECHECK_SECONDS") or 2)
     
\ No newline at end of file
@@ -1,54 +1,64 @@
-import os
 import sys
 from pathlib import Path
 
 import pytest
 
 
-# Ensure the project root (repo folder) is importable when running pytest under uv.
+# Ensure the project root (repo folder) is importable when running pytest under uv,
+# and tests/ too (for ``from helpers import ...``) whatever --import-mode is used.
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.insert(0, str(PROJECT_ROOT))
-
-
-def _clear_import_cache(prefix: str) -> None:
-    for name in list(sys.modules.keys()):
-        if name == prefix or name.startswith(prefix + "."):
-            del sys.modules[name]
-
-
-def _clear_module(name: str) -> None:
-    if name in sys.modules:
-        del sys.modules[name]
+for path in (PROJECT_ROOT, PROJECT_ROOT / "tests"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+def app_config(data_dir: Path, **overrides) -> dict:
+    """Config overrides that keep an app's files under ``data_dir``."""
+    return {
+        "SECRET_KEY": "test-secret-key",
+        "APP_SERVER_OS": "Linux",
+        # Force temp persistence so tests never touch the developer's real data.
+        "CDX_WEB_SCAN_FOLDER": str(data_dir),
+        "CDX_WEB_SCAN_DB_FILE_NAME": "test.sqlite",
+        "CDX_WEB_SCAN_LOG_FILE": str(data_dir / "test.log"),
+        "ASSET_DIST_DIR": str(data_dir / "static-dist"),
+        "METRICS_DIR": str(data_dir / "metrics"),
+        "PROFILING_DIR": str(data_dir / "profiles"),
+        # Tests drive the intake dispatcher explicitly instead of via a background thread.
+        "INTAKE_DISPATCHER_ENABLED": False,
+        **overrides,
+    }
 
 
 @pytest.fixture(scope="session")
 def app(tmp_path_factory):
-    """Create a Flask app configured to use a temp folder for DB/logs.
-
-    The application is defined as a global in cdx_web_scan/__init__.py and reads
-    configuration from environment variables at import time.
-    """
+    """Create a Flask app configured to use a temp folder for DB/logs."""
+    from cdx_web_scan import create_app
+    from cdx_web_scan.schema import create_schema
 
     data_dir = tmp_path_factory.mktemp("cdx_web_scan_data")
+    app = create_app("config.DevConfig", app_config(data_dir))
+    with app.app_context():
+        create_schema()
+    return app
 
-    os.environ["APP_MODE"] = "config.DevConfig"
-    os.environ["SECRET_KEY"] = "test-secret-key"
-    os.environ["APP_SERVER_OS"] = "Linux"
-
-    # Force temp persistence so tests never touch the developer's real data.
-    os.environ["CDX_WEB_SCAN_FOLDER"] = str(data_dir)
-    os.environ["CDX_WEB_SCAN_DB_FILE_NAME"] = "test.sqlite"
-    os.environ["CDX_WEB_SCAN_LOG_FILE"] = str(Path(data_dir) / "test.log")
 
-    _clear_import_cache("cdx_web_scan")
-    # APP_MODE points at the top-level module "config", so ensure it reloads with our env.
-    _clear_module("config")
-    _clear_module("app")
+@pytest.fixture()
+def make_app(app, tmp_path):
+    """Build a separate app (own data folder and schema) with extra config overrides."""
+    from cdx_web_scan import create_app, log_setup
+    from cdx_web_scan.schema import create_schema
 
-    import cdx_web_scan  # noqa: E402
+    def _make(schema: bool = True, **overrides):
+        app = create_app("config.DevConfig", app_config(tmp_path, **overrides))
+        if schema:
+            with app.app_context():
+                create_schema()
+        return app
 
-    return cdx_web_scan.app
+    yield _make
+    # Building an app re-points the process-wide log handler; give it back to the session app.
+    log_setup.configure_logging(app)
 
 
 @pytest.fixture()
@@ -58,8 +68,25 @@ def client(app):
 
 @pytest.fixture()
 def db(app):
-    import cdx_web_scan  # noqa: E402
+    from cdx_web_scan import db
+
+    with app.app_context():
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture(autouse=True)
+def _reset_db(app):
+    """Empty every table (and in-process caches) after each test so tests stay independent."""
+    yield
+    from cdx_web_scan import db
 
     with app.app_context():
-        yield cdx_web_scan.db
-        cdx_web_scan.db.session.remove()
+        db.session.remove()
+        # SQLite leaves FK enforcement off by default, so delete order does not matter.
+        for table in db.metadata.tables.values():
+            db.session.execute(table.delete())
+        db.session.commit()
+    app.extensions.pop("batch_store", None)
+    app.extensions.pop("seen_index", None)
+    app.extensions.pop("catalog", None)
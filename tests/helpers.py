@@ -0,0 +1,9 @@
+"""Plain helpers shared by the test modules (``from helpers import upc``)."""
+
+
+def upc(n: int) -> str:
+    """A valid 12-digit UPC-A for ``n``."""
+    from cdx_web_scan.web_scan.gtin import check_digit
+
+    body = f"0{n:010d}"
+    return body + str(check_digit(body))
@@ -0,0 +1,165 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import inspect
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_package_has_no_side_effects(tmp_path):
+    script = (
+        "import json, sys; import cdx_web_scan; "
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith(('cdx_web_scan', 'config')))))"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "APP_MODE"}
+    env["PYTHONPATH"] = str(PROJECT_ROOT)
+    out = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True, capture_output=True, text=True)
+    assert json.loads(out.stdout) == ["cdx_web_scan"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_schema_is_created_by_init_db_not_by_the_factory(make_app):
+    from cdx_web_scan import db
+
+    app = make_app(schema=False)
+    with app.app_context():
+        assert "scan" not in inspect(db.engine).get_table_names()
+
+    for _ in range(2):  # idempotent
+        result = app.test_cli_runner().invoke(args=["init-db"])
+        assert result.exit_code == 0, result.output
+        assert "Schema ready" in result.output
+    with app.app_context():
+        assert {"scan", "barcode_capture", "aws_intake_call"} <= set(inspect(db.engine).get_table_names())
+
+
+_PRELOAD_SCRIPT = """
+import os, sys
+from sqlalchemy import text
+from cdx_web_scan import create_app, db
+from cdx_web_scan.schema import create_schema
+
+app = create_app("config.DevConfig", {"CDX_WEB_SCAN_FOLDER": sys.argv[1], "CDX_WEB_SCAN_LOG_FILE": sys.argv[1] + "/test.log",
+    "ASSET_DIST_DIR": sys.argv[1] + "/static-dist", "METRICS_DIR": sys.argv[1] + "/metrics", "SECRET_KEY": "x",
+    "INTAKE_DISPATCHER_ENABLED": False})
+with app.app_context():
+    create_schema()
+    db.session.execute(text("SELECT 1"))  # the parent holds a pooled connection, as after a warm-up
+    db.session.remove()
+
+codes = []
+for _ in range(2):  # like two gunicorn workers forked from a --preload master
+    pid = os.fork()
+    if pid == 0:
+        client = app.test_client()
+        ok = client.post("/submit", data={"barcode": "036000291452", "source": "manual"}).status_code == 200
+        os._exit(0 if ok and client.get("/batch").status_code == 200 else 1)
+    codes.append(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]))
+print(codes)
+"""
+
+
+def test_workers_forked_from_a_preloaded_app_work(tmp_path):
+    out = subprocess.run(
+        [sys.executable, "-c", _PRELOAD_SCRIPT, str(tmp_path)], cwd=PROJECT_ROOT, check=True, capture_output=True, text=True
+    )
+    assert out.stdout.strip().splitlines()[-1] == "[0, 0]"
+
+
+def test_fork_hook_is_registered_once_per_process(make_app, monkeypatch):
+    import cdx_web_scan
+
+    hooks = []
+    monkeypatch.setattr(cdx_web_scan, "_fork_hook_registered", False)
+    monkeypatch.setattr(cdx_web_scan.os, "register_at_fork", lambda **kw: hooks.append(kw))
+    apps = [make_app(), make_app()]
+
+    assert hooks == [{"after_in_child": cdx_web_scan._dispose_engines_in_child}]
+    with apps[1].app_context():
+        assert cdx_web_scan.db.engine in cdx_web_scan._fork_engines
+
+
+# aws_intake_call as created before the outbox (scan_id NOT NULL, no session_id / next_attempt_at).
+_BASELINE_INTAKE_CALL = [
+    """CREATE TABLE aws_intake_call (
+        id VARCHAR(36) NOT NULL, scan_id VARCHAR(36) NOT NULL, created_at DATETIME NOT NULL,
+        idempotency_key VARCHAR(256) NOT NULL, attempt INTEGER NOT NULL, status VARCHAR(8) NOT NULL,
+        api_base_url VARCHAR(512), api_path VARCHAR(256), request_headers JSON, request_body JSON,
+        http_status INTEGER, duration_ms INTEGER, response_headers JSON, response_body JSON,
+        error TEXT, correlation_id VARCHAR(256),
+        PRIMARY KEY (id),
+        CONSTRAINT uq_intake_scan_idempotency UNIQUE (scan_id, idempotency_key),
+        FOREIGN KEY(scan_id) REFERENCES scan (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX ix_intake_scan_attempt ON aws_intake_call (scan_id, attempt)",
+    "CREATE INDEX ix_aws_intake_call_status ON aws_intake_call (status)",
+    "CREATE INDEX ix_aws_intake_call_scan_id ON aws_intake_call (scan_id)",
+    """INSERT INTO aws_intake_call (id, scan_id, created_at, idempotency_key, attempt, status, http_status)
+        VALUES ('old-call', 'old-scan', '2024-01-02 03:04:05.000000', 'k-old', 1, 'success', 200)""",
+    """INSERT INTO aws_intake_call (id, scan_id, created_at, idempotency_key, attempt, status)
+        VALUES ('unsent-call', 'old-scan', '2024-01-02 03:04:06.000000', 'k-unsent', 1, 'pending')""",
+]
+
+
+def test_init_db_upgrades_a_baseline_intake_call_table(make_app):
+    import pytest
+    from sqlalchemy import text
+    from sqlalchemy.exc import IntegrityError
+
+    from cdx_web_scan import db
+    from cdx_web_scan.intake.dispatcher import get_dispatcher
+    from cdx_web_scan.intake.outbox import enqueue_batch
+    from cdx_web_scan.models import AwsIntakeCall
+
+    app = make_app(schema=False)
+    with app.app_context():
+        for statement in _BASELINE_INTAKE_CALL:
+            db.session.execute(text(statement))
+        db.session.commit()
+
+    for _ in range(2):  # the second run has nothing left to upgrade
+        assert app.test_cli_runner().invoke(args=["init-db"]).exit_code == 0
+    with app.app_context():
+        columns = {c["name"]: c for c in inspect(db.engine).get_columns("aws_intake_call")}
+        assert columns["scan_id"]["nullable"] and "session_id" in columns
+        old = db.session.get(AwsIntakeCall, "old-call")
+        assert (old.scan_id, old.idempotency_key, old.http_status) == ("old-scan", "k-old", 200)
+        # Unsent rows become due; finished ones stay out of the dispatcher's queue.
+        assert old.next_attempt_at is None
+        assert [call_id for call_id, _ in get_dispatcher(app)._due_calls(10)] == ["unsent-call"]
+
+        batch, calls = enqueue_batch([{"code": "036000291452"}], [{"items": []}], "https://intake.example/scan")
+        assert calls[0].session_id == batch.id and calls[0].scan_id is None
+
+        db.session.add(AwsIntakeCall(session_id=batch.id, idempotency_key=calls[0].idempotency_key))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+def test_init_db_adds_next_attempt_at_and_makes_unsent_calls_due(make_app):
+    from sqlalchemy import text
+
+    from cdx_web_scan import db
+    from cdx_web_scan.intake.dispatcher import get_dispatcher
+
+    app = make_app()
+    with app.app_context():
+        # The outbox table as it was before retries were scheduled.
+        db.session.execute(text("DROP INDEX ix_intake_next_attempt"))
+        db.session.execute(text("ALTER TABLE aws_intake_call DROP COLUMN next_attempt_at"))
+        db.session.execute(
+            text(
+                "INSERT INTO aws_intake_call (id, session_id, created_at, idempotency_key, attempt, status) "
+                "VALUES ('queued', 's1', '2024-01-02 03:04:05.000000', 'k1', 1, 'pending')"
+            )
+        )
+        db.session.commit()
+
+    assert app.test_cli_runner().invoke(args=["init-db"]).exit_code == 0
+    with app.app_context():
+        assert "ix_intake_next_attempt" in {i["name"] for i in inspect(db.engine).get_indexes("aws_intake_call")}
+        assert [call_id for call_id, _ in get_dispatcher(app)._due_calls(10)] == ["queued"]
@@ -0,0 +1,55 @@
+import gzip
+import re
+from pathlib import Path
+
+
+def _hashed_js_url(client):
+    html = client.get("/").get_data(as_text=True)
+    match = re.search(r'src="(/static/dist/app\.[0-9a-f]{16}\.js)"', html)
+    assert match, "index should reference the hashed app.js"
+    return match.group(1)
+
+
+def test_hashed_asset_is_immutable_and_precompressed(app, client):
+    url = _hashed_js_url(client)
+    original = (Path(app.static_folder) / "app.js").read_bytes()
+
+    # send_file responses hold the file open until closed.
+    with client.get(url, headers={"Accept-Encoding": "gzip"}) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "immutable" in resp.headers["Cache-Control"]
+        assert resp.headers["Vary"] == "Accept-Encoding"
+        assert not resp.headers["ETag"].startswith("W/")
+        assert gzip.decompress(resp.data) == original
+
+    with client.get(url, headers={"Accept-Encoding": "identity"}) as plain:
+        assert "Content-Encoding" not in plain.headers
+        assert plain.data == original
+        assert plain.headers["ETag"] != resp.headers["ETag"]
+
+
+def test_hashed_asset_revalidates_with_304(client):
+    url = _hashed_js_url(client)
+    with client.get(url) as first:
+        etag = first.headers["ETag"]
+
+    with client.get(url, headers={"If-None-Match": etag}) as resp:
+        assert resp.status_code == 304
+        assert resp.data == b""
+        assert resp.headers["ETag"] == etag
+
+
+def test_dist_route_only_serves_hashed_files(client):
+    assert client.get("/static/dist/assets.json").status_code == 404
+    assert client.get("/static/dist/../app.js").status_code == 404
+    url = _hashed_js_url(client)
+    assert client.get(url + ".gz").status_code == 404
+
+
+def test_build_assets_is_idempotent(app, tmp_path):
+    from cdx_web_scan.assets import build_assets, load_manifest
+
+    first = build_assets(tmp_path)
+    assert build_assets(tmp_path) == first == load_manifest(tmp_path)
+    assert (tmp_path / (first["styles.css"] + ".gz")).exists()
@@ -0,0 +1,84 @@
+import re
+
+from helpers import upc
+
+
+def _view(html: str) -> str:
+    return re.search(r'id="batch-view" name="batch_view" value="([^"]+)"', html).group(1)
+
+
+def test_submit_appends_single_row_when_view_is_current(client):
+    first = client.post("/submit", data={"barcode": upc(1), "source": "manual"}).get_data(as_text=True)
+    # Empty batch -> the first scan needs the whole list.
+    assert 'id="batch" hx-swap-oob="true"' in first
+    view = _view(first)
+
+    sizes = []
+    for n in range(2, 5):
+        html = client.post("/submit", data={"barcode": upc(n), "source": "manual", "batch_view": view}).get_data(as_text=True)
+        assert 'hx-swap-oob="beforeend:#batch-list"' in html
+        assert 'id="batch" hx-swap-oob' not in html
+        assert f'id="batch-item-{upc(n)}"' in html
+        assert f"{n} items" in html
+        view = _view(html)
+        sizes.append(len(html))
+    assert max(sizes) - min(sizes) < 20
+
+    # A stale view (another tab changed the batch) falls back to a full render.
+    html = client.post("/submit", data={"barcode": upc(5), "source": "manual", "batch_view": "0:1"}).get_data(as_text=True)
+    assert 'id="batch" hx-swap-oob="true"' in html
+
+    # The sixth item starts a new page, which the client isn't showing.
+    html = client.post("/submit", data={"barcode": upc(6), "source": "manual", "batch_view": _view(html)}).get_data(as_text=True)
+    assert 'id="batch" hx-swap-oob="true"' in html
+    assert "Page 2 / 2" in html
+
+
+def test_delete_from_last_page_removes_single_row(client):
+    html = ""
+    for n in range(1, 4):
+        html = client.post("/submit", data={"barcode": upc(n), "source": "manual"}).get_data(as_text=True)
+
+    resp = client.post(f"/batch/delete/{upc(3)}", data={"batch_view": _view(html)})
+    body = resp.get_data(as_text=True)
+    assert resp.headers["HX-Reswap"] == "none"
+    assert f'<li id="batch-item-{upc(3)}" hx-swap-oob="delete">' in body
+    assert "2 items" in body
+
+    resp = client.post(f"/batch/delete/{upc(2)}", data={"batch_view": "999:1"})
+    assert "HX-Reswap" not in resp.headers
+    assert "1 item" in resp.get_data(as_text=True)
+
+
+def test_batch_view_supports_etag_revalidation(client):
+    client.post("/submit", data={"barcode": upc(1), "source": "manual"})
+
+    first = client.get("/batch")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    again = client.get("/batch", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert "Set-Cookie" not in again.headers
+
+    client.post("/submit", data={"barcode": upc(2), "source": "manual"})
+    changed = client.get("/batch", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_batch_view_etag_changes_when_the_catalog_learns_a_title(app, client):
+    from cdx_web_scan import db
+    from cdx_web_scan.web_scan.catalog import upsert_entries
+
+    client.post("/submit", data={"barcode": upc(1), "source": "manual"})
+    etag = client.get("/batch").headers["ETag"]
+    assert client.get("/batch", headers={"If-None-Match": etag}).status_code == 304
+
+    with app.app_context():
+        upsert_entries([{"gtin": upc(1).zfill(14), "title": "Learned", "artist": None, "label": None}], "intake")
+        db.session.commit()
+    changed = client.get("/batch", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert "Learned" in changed.get_data(as_text=True)
@@ -0,0 +1,109 @@
+from helpers import upc
+
+
+def _codes(resp) -> list[str]:
+    import re
+
+    return re.findall(r'<span class="mono">(\d+)</span>', resp.get_data(as_text=True))
+
+
+def test_batch_lives_server_side(client):
+    for n in range(40):
+        client.post("/submit", data={"barcode": upc(n), "source": "manual"})
+
+    cookie = client.get_cookie("session")
+    assert cookie is not None
+    # Forty items used to blow well past the cookie budget; now only the token travels.
+    assert len(cookie.value) < 200
+
+    resp = client.get("/batch?page=8")
+    assert "40 items" in resp.get_data(as_text=True)
+    assert _codes(resp) == [upc(n) for n in range(35, 40)]
+
+
+def test_duplicate_and_delete(client):
+    client.post("/submit", data={"barcode": "012345678905", "source": "manual"})
+    resp = client.post("/submit", data={"barcode": "012345678905", "source": "manual"})
+    assert "Already in batch" in resp.get_data(as_text=True)
+
+    resp = client.post("/batch/delete/012345678905")
+    assert "0 items" in resp.get_data(as_text=True)
+
+
+def test_lru_layer_reloads_on_revision_mismatch(app, db):
+    from cdx_web_scan.web_scan.batch_store import BatchRef, LruBatchStore, SqliteBatchStore
+
+    backend = SqliteBatchStore()
+    cached = LruBatchStore(backend, max_batches=2)
+    ref = BatchRef("token-a", 0)
+    item = {"code": "12345670", "source": "manual", "captured_at": "2026-01-01T00:00:00+00:00"}
+
+    assert cached.append(ref, item)
+    assert cached.contains(ref.bumped(), "12345670")
+
+    # Another worker wrote behind this process's back and bumped the revision.
+    backend.append(ref.bumped(), dict(item, code="87654325"))
+    assert cached.count(ref.bumped().bumped()) == 2
+
+
+def test_lru_layer_rechecks_the_backend_under_the_same_revision(app, db):
+    from cdx_web_scan.web_scan.batch_store import BatchRef, LruBatchStore, SqliteBatchStore
+
+    backend = SqliteBatchStore()
+    cached = LruBatchStore(backend, max_batches=2)
+    ref = BatchRef("token-a", 0)
+    item = {"code": "12345670", "source": "manual", "captured_at": "2026-01-01T00:00:00+00:00"}
+
+    # Two requests carrying rev 0 race on different workers; both land on rev 1.
+    assert cached.append(ref, item)
+    assert cached.count(ref.bumped()) == 1
+    backend.append(ref, dict(item, code="87654325"))
+
+    assert cached.count(ref.bumped()) == 2
+    assert cached.contains(ref.bumped(), "87654325")
+
+
+def test_batch_store_is_abstract():
+    import pytest
+
+    from cdx_web_scan.web_scan.batch_store import BatchStore
+
+    with pytest.raises(TypeError):
+        BatchStore()
+
+
+def test_lru_layer_sees_delete_of_the_last_item_then_append(app, db):
+    from cdx_web_scan.web_scan.batch_store import BatchRef, LruBatchStore, SqliteBatchStore
+
+    backend = SqliteBatchStore()
+    cached = LruBatchStore(backend, max_batches=2)
+    ref = BatchRef("token-a", 0)
+    item = {"source": "manual", "captured_at": "2026-01-01T00:00:00+00:00"}
+    backend.append(ref, dict(item, code=upc(1)))
+    backend.append(ref, dict(item, code=upc(2)))
+    assert cached.count(ref) == 2
+
+    # Another worker swaps the newest item: same count, and SQLite reuses its rowid.
+    backend.delete(ref, upc(2))
+    backend.append(ref, dict(item, code=upc(3)))
+
+    assert [i["code"] for i in cached.all(ref)] == [upc(1), upc(3)]
+
+
+def test_lru_layer_checks_the_version_once_per_request(app, db, monkeypatch):
+    from cdx_web_scan.web_scan.batch_store import BatchRef, LruBatchStore, SqliteBatchStore
+
+    backend = SqliteBatchStore()
+    cached = LruBatchStore(backend)
+    ref = BatchRef("token-a", 0)
+    backend.append(ref, {"code": upc(1), "source": "manual", "captured_at": "2026-01-01T00:00:00+00:00"})
+    calls = []
+    version = backend.version
+    monkeypatch.setattr(backend, "version", lambda r: calls.append(r) or version(r))
+
+    with app.test_request_context():
+        assert cached.count(ref) == 1
+        assert cached.contains(ref, upc(1)) and cached.page(ref, 0, 5)
+        assert len(calls) == 1
+        cached.append(ref, {"code": upc(2), "source": "manual", "captured_at": "2026-01-01T00:00:00+00:00"})
+        assert cached.count(ref) == 2
@@ -0,0 +1,134 @@
+import gzip
+import json
+
+from sqlalchemy import event
+
+from helpers import upc
+
+
+def test_cli_import_streams_csv_and_ndjson(app, db, tmp_path):
+    from cdx_web_scan.models import CatalogEntry
+
+    csv_path = tmp_path / "releases.csv.gz"
+    with gzip.open(csv_path, "wt", encoding="utf-8", newline="") as f:
+        f.write("barcode,title,artist,label\n")
+        for n in range(1, 251):
+            f.write(f"{upc(n)},Album {n},Artist {n},\n")
+        f.write("not-a-code,Junk,,\n")
+        f.write(f"{upc(1)}, -- UNTITLED -- ,,\n")  # Placeholder titles are skipped.
+    result = app.test_cli_runner().invoke(args=["import-catalog", str(csv_path), "--batch-size", "100"])
+    assert result.exit_code == 0, result.output
+    assert "Read 252 row(s); stored 250 catalog entries." in result.output
+
+    ndjson_path = tmp_path / "fixes.ndjson"
+    ndjson_path.write_text(json.dumps({"upc": upc(7), "title": "Album 7 (Remaster)", "label": "Lbl"}) + "\n\n")
+    result = app.test_cli_runner().invoke(args=["import-catalog", str(ndjson_path)])
+    assert result.exit_code == 0, result.output
+
+    entry = db.session.get(CatalogEntry, upc(7).zfill(14))
+    assert (entry.title, entry.artist, entry.label, entry.source) == ("Album 7 (Remaster)", None, "Lbl", "import")
+    assert db.session.query(CatalogEntry).count() == 250
+
+    bad = tmp_path / "bad.txt"
+    bad.write_text("x")
+    assert app.test_cli_runner().invoke(args=["import-catalog", str(bad)]).exit_code != 0
+
+
+def test_lookups_are_cached_including_misses(app, db):
+    from cdx_web_scan.web_scan.catalog import get_catalog, upsert_entries
+
+    upsert_entries([{"gtin": upc(1).zfill(14), "title": "First", "artist": None, "label": None}], "import")
+    db.session.commit()
+    catalog = get_catalog()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        assert catalog.lookup(upc(1).zfill(14)).title == "First"
+        assert catalog.lookup(upc(2).zfill(14)) is None
+        assert len(statements) == 2
+        assert catalog.lookup(upc(1).zfill(14)).title == "First"
+        assert catalog.lookup(upc(2).zfill(14)) is None
+        assert len(statements) == 2
+        # Writes through this process invalidate its cached miss.
+        upsert_entries([{"gtin": upc(2).zfill(14), "title": "Second", "artist": None, "label": None}], "import")
+        assert catalog.lookup(upc(2).zfill(14)).title == "Second"
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+
+def test_scans_and_batch_fragment_get_catalog_titles(app, client, db):
+    from cdx_web_scan.models import Scan
+    from cdx_web_scan.web_scan.catalog import upsert_entries
+
+    client.post("/submit", data={"barcode": upc(3), "source": "manual"})
+    assert "-- UNTITLED --" in client.get("/batch").get_data(as_text=True)
+
+    upsert_entries(
+        [{"gtin": upc(n).zfill(14), "title": f"Catalog {n}", "artist": None, "label": None} for n in (3, 4, 5)], "import"
+    )
+    db.session.commit()
+    # The earlier item is shown with its catalog title now.
+    assert "Catalog 3" in client.get("/batch?page=1").get_data(as_text=True)
+
+    client.post("/submit", data={"barcode": upc(4), "source": "manual"})
+    client.post("/submit", data={"barcode": upc(6), "title": "Typed", "source": "manual"})
+    client.post("/submit/bulk", data={"barcode": [upc(5), upc(8)], "source": "wedge"})
+    notes = {scan.notes for scan in db.session.query(Scan)}
+    assert {"Catalog 4", "Typed", "Catalog 5", " -- UNTITLED -- "} <= notes
+    assert "Catalog 3" not in notes  # Stored scans keep what was entered at the time.
+
+
+def test_intake_responses_teach_the_catalog_without_overriding_imports(app, db):
+    from cdx_web_scan.intake.client import IntakeResponse
+    from cdx_web_scan.intake.outbox import learn_titles, record_response
+    from cdx_web_scan.models import AwsIntakeCall, CatalogEntry
+    from cdx_web_scan.web_scan.catalog import upsert_entries
+
+    upsert_entries([{"gtin": upc(1).zfill(14), "title": "Imported", "artist": None, "label": None}], "import")
+    call = AwsIntakeCall(idempotency_key="k1")
+    db.session.add(call)
+    body = {
+        "items": [
+            {"code": upc(1), "title": "From API"},
+            {"code": upc(2), "title": "Resolved", "artist": "Band"},
+            {"code": upc(9), "title": " -- UNTITLED -- "},
+        ]
+    }
+    record_response(call, IntakeResponse(202, json.dumps(body)))
+    db.session.commit()
+    learn_titles(call)
+
+    entries = {e.gtin: e for e in db.session.query(CatalogEntry)}
+    assert entries[upc(1).zfill(14)].title == "Imported"
+    assert (entries[upc(2).zfill(14)].title, entries[upc(2).zfill(14)].source) == ("Resolved", "intake")
+    assert upc(9).zfill(14) not in entries
+
+    failed = AwsIntakeCall(idempotency_key="k2")
+    db.session.add(failed)
+    record_response(failed, IntakeResponse(400, json.dumps({"code": upc(3), "title": "Nope"})))
+    db.session.commit()
+    learn_titles(failed)
+    assert db.session.get(CatalogEntry, upc(3).zfill(14)) is None
+
+
+def test_a_catalog_failure_does_not_undo_a_delivered_call(app, db, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+
+    from cdx_web_scan.intake import outbox
+    from cdx_web_scan.intake.client import IntakeResponse
+    from cdx_web_scan.models import AwsIntakeCall, IntakeStatus
+
+    def missing_table(body):
+        raise OperationalError("INSERT INTO catalog_entry", {}, Exception("no such table: catalog_entry"))
+
+    monkeypatch.setattr(outbox, "learn_from_response", missing_table)
+    call = AwsIntakeCall(idempotency_key="k1")
+    db.session.add(call)
+    outbox.record_response(call, IntakeResponse(202, json.dumps({"code": upc(1), "title": "Resolved"})))
+    db.session.commit()
+    outbox.learn_titles(call)
+
+    db.session.expire_all()
+    assert db.session.get(AwsIntakeCall, call.id).status == IntakeStatus.success
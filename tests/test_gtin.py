@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+
+def test_parse_gtin_classifies_and_normalizes(app):
+    from cdx_web_scan.web_scan.gtin import expand_upce, parse_gtin
+
+    assert expand_upce("04252614") == "042100005264"
+    cases = {
+        "04252614": ("UPC_E", "00042100005264", True),
+        "012345678905": ("UPC_A", "00012345678905", True),
+        "4006381333931": ("EAN_13", "04006381333931", True),
+        "96385074": ("EAN_8", "00000096385074", True),
+        "10012345678902": ("GTIN_14", "10012345678902", True),
+        "012345678906": ("UPC_A", "00012345678906", False),
+    }
+    for code, expected in cases.items():
+        gtin = parse_gtin(code)
+        assert (gtin.symbology, gtin.gtin14, gtin.checksum_valid) == expected, code
+    assert parse_gtin("1234567890") is None
+    assert parse_gtin("１２３４５６７８") is None
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_parse_many_matches_scalar(app, use_numpy):
+    from cdx_web_scan.web_scan.gtin import parse_gtin, parse_many
+
+    rng = random.Random(12)
+    codes = ["".join(rng.choice("0123456789") for _ in range(rng.choice([7, 8, 8, 12, 13, 14]))) for _ in range(3000)]
+    codes += ["", "abc", "04252614"]
+    assert parse_many(codes, use_numpy=use_numpy) == [parse_gtin(c) for c in codes]
+
+
+def test_submit_rejects_check_digit_mismatch(app, client):
+    from cdx_web_scan import db
+    from cdx_web_scan.models import BarcodeCapture
+
+    resp = client.post("/submit", data={"barcode": "012345678906", "source": "manual"})
+    assert "Check digit mismatch" in resp.get_data(as_text=True)
+
+    client.post("/submit", data={"barcode": "04252614", "source": "wedge"})
+    with app.app_context():
+        rows = db.session.execute(db.select(BarcodeCapture)).scalars().all()
+        assert [(r.symbology, r.value_normalized, r.checksum_valid) for r in rows] == [("UPC_E", "00042100005264", True)]
+
+
+def test_backfill_normalizes_existing_rows(app, db):
+    from cdx_web_scan.models import BarcodeCapture, CaptureMethod, Scan, ScanSource
+    from cdx_web_scan.web_scan.gtin_backfill import backfill_gtin
+
+    for value in ("012345678905", "012345678906", "123"):
+        scan = Scan(source=ScanSource.manual)
+        db.session.add(scan)
+        db.session.flush()
+        db.session.add(
+            BarcodeCapture(scan_id=scan.id, symbology="UPC", value_raw=value, value_normalized=value, capture_method=CaptureMethod.manual)
+        )
+    db.session.commit()
+
+    assert backfill_gtin(batch_size=2) == (3, 2)
+    rows = {r.value_raw: r for r in db.session.execute(db.select(BarcodeCapture)).scalars()}
+    assert (rows["012345678905"].value_normalized, rows["012345678905"].checksum_valid) == ("00012345678905", True)
+    assert rows["012345678906"].checksum_valid is False
+    assert rows["123"].value_normalized == "123"
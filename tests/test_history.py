@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from sqlalchemy import event, text
+
+from helpers import upc
+
+
+def _seed(count, source=None, created_at=None):
+    from cdx_web_scan.models import CaptureMethod, ScanSource, utcnow
+    from cdx_web_scan.web_scan.scan_writer import PendingScan, write_scans_now
+
+    base = created_at or utcnow()
+    pending = [
+        PendingScan(
+            value=upc(n),
+            symbology="UPC_A",
+            source=source or ScanSource.manual,
+            capture_method=CaptureMethod.manual,
+            # Pairs share a timestamp so the id tie-break is exercised.
+            created_at=base - timedelta(seconds=n // 2),
+        )
+        for n in range(count)
+    ]
+    write_scans_now(pending)
+    return pending
+
+
+def test_keyset_pages_cover_every_scan_once_with_constant_queries(app, db):
+    from cdx_web_scan.web_scan.history import HistoryFilters, history_page
+
+    _seed(23)
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        seen, cursor, per_page = [], None, []
+        while True:
+            statements.clear()
+            page = history_page(HistoryFilters(), cursor=cursor, limit=5)
+            for scan in page.scans:
+                assert scan.barcodes[0].value_raw  # already loaded, no lazy query
+            per_page.append(len(statements))
+            seen.extend(s.id for s in page.scans)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert len(seen) == len(set(seen)) == 23
+    # keys + scans + barcodes (no intake lookup: nothing was submitted)
+    assert set(per_page) == {3}
+
+
+def test_key_queries_are_index_range_scans(app, db):
+    from cdx_web_scan.models import ScanSource
+    from cdx_web_scan.web_scan.history import HistoryFilters, _key_query, encode_cursor
+    from cdx_web_scan.models import utcnow
+
+    cursor = encode_cursor(utcnow(), "x")
+    for filters, index in [
+        (HistoryFilters(), "ix_scan_created_id"),
+        (HistoryFilters(source=ScanSource.camera), "ix_scan_source_created_id"),
+        (HistoryFilters(operator="ed"), "ix_scan_operator_created_id"),
+        (HistoryFilters(session_id="abc"), "ix_scan_session_created_id"),
+    ]:
+        sql = _key_query(filters, cursor, 50).compile(db.engine, compile_kwargs={"literal_binds": True})
+        plan = " ".join(str(row[-1]) for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert f"COVERING INDEX {index}" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+
+def test_history_endpoint_filters_and_formats(app, client, db):
+    from cdx_web_scan.models import AwsIntakeCall, IntakeStatus, Scan, ScanSource, ScanSession
+
+    _seed(3, source=ScanSource.manual)
+    camera = _seed(2, source=ScanSource.camera)
+    batch = ScanSession()
+    db.session.add(batch)
+    db.session.flush()
+    db.session.get(Scan, camera[0].scan_id).session_id = batch.id
+    db.session.add(AwsIntakeCall(session_id=batch.id, idempotency_key="k", status=IntakeStatus.failed))
+    db.session.commit()
+
+    data = client.get("/history?format=json&source=camera").get_json()
+    assert [s["source"] for s in data["scans"]] == ["camera", "camera"]
+    assert data["next_cursor"] is None
+
+    data = client.get("/history?intake=failed", headers={"Accept": "application/json"}).get_json()
+    assert [s["id"] for s in data["scans"]] == [camera[0].scan_id]
+    assert data["scans"][0]["intake_status"] == "failed"
+    assert data["scans"][0]["barcodes"][0]["value_raw"] == camera[0].value
+    assert len(client.get("/history?format=json&intake=none").get_json()["scans"]) == 4
+
+    # The filter follows the displayed (worst-chunk) status, not "any chunk".
+    db.session.add(AwsIntakeCall(session_id=batch.id, idempotency_key="k2", status=IntakeStatus.success))
+    db.session.commit()
+    assert client.get("/history?format=json&intake=success").get_json()["scans"] == []
+    assert len(client.get("/history?format=json&intake=failed").get_json()["scans"]) == 1
+
+    page = client.get("/history?limit=2").get_data(as_text=True)
+    assert "Scan History" in page and 'id="history-more"' in page
+    cursor = client.get("/history?format=json&limit=2").get_json()["next_cursor"]
+    rows = client.get(f"/history?limit=2&cursor={cursor}", headers={"HX-Request": "true"}).get_data(as_text=True)
+    assert "<html" not in rows and rows.count('class="batch-item"') == 2
+
+    assert client.get("/history?format=json&source=bogus").status_code == 400
+    assert client.get("/history?format=json&cursor=!!").status_code == 400
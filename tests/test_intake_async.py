@@ -0,0 +1,128 @@
+import socket
+import threading
+from concurrent.futures import wait
+
+from benchmarks.stub_intake import StubIntakeServer
+
+
+def test_concurrent_submits_share_a_few_connections(app):
+    from cdx_web_scan.intake.async_engine import AsyncIntakeEngine
+
+    server = StubIntakeServer(latency_ms=20).start()
+    engine = AsyncIntakeEngine(pool_size=3, gzip_requests=True, gzip_min_bytes=64).start()
+    try:
+        payload = {"barcodes": [f"{n:012d}" for n in range(10)]}
+        futures = [engine.submit(server.url, payload) for _ in range(60)]
+        done, _ = wait(futures, timeout=30)
+        assert len(done) == 60
+        assert all(f.result().status == 202 for f in futures)
+        assert server.connections <= 3
+        assert server.items == 600
+    finally:
+        engine.stop()
+        server.stop()
+
+
+def test_duration_excludes_waiting_for_a_pooled_connection(app, monkeypatch):
+    import atexit
+
+    from cdx_web_scan.intake.async_engine import AsyncIntakeEngine, _started_engines
+
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    server = StubIntakeServer(latency_ms=50).start()
+    engine = AsyncIntakeEngine(pool_size=1)
+    try:
+        engine.start()
+        engine.stop()
+        engine.start()
+        # One module-level hook stops every engine; starting one registers nothing.
+        assert registered == []
+        assert engine in _started_engines
+        # Four calls over one connection: the last waits ~150 ms but its own exchange takes ~50.
+        futures = [engine.submit(server.url, {"barcodes": []}) for _ in range(4)]
+        wait(futures, timeout=30)
+        assert all(f.result().status == 202 for f in futures)
+        assert max(f.result().duration_ms for f in futures) < 140
+    finally:
+        engine.stop()
+        server.stop()
+
+
+def test_transport_errors_resolve_as_status_zero(app):
+    from cdx_web_scan.intake.async_engine import AsyncIntakeEngine
+
+    engine = AsyncIntakeEngine(connect_timeout=1).start()
+    try:
+        resp = engine.post_json("http://127.0.0.1:9/intake", {"barcodes": []})
+        assert resp.status == 0
+        assert resp.error
+    finally:
+        engine.stop()
+
+
+def test_timeout_covers_sending_the_body(app):
+    from cdx_web_scan.intake.async_engine import AsyncIntakeEngine
+
+    # Accepts the connection but never reads, so the write side stalls once the socket buffers fill.
+    listener = socket.create_server(("127.0.0.1", 0))
+    accepted = []
+    acceptor = threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True)
+    acceptor.start()
+    engine = AsyncIntakeEngine(read_timeout=0.5).start()
+    try:
+        future = engine.submit(f"http://127.0.0.1:{listener.getsockname()[1]}/intake", {"blob": "x" * (32 << 20)})
+        resp = future.result(timeout=10)
+        assert resp.status == 0 and resp.error
+    finally:
+        engine.stop()
+        acceptor.join(1)
+        for conn, _ in accepted:
+            conn.close()
+        listener.close()
+
+
+def test_stop_cancels_requests_in_flight(app):
+    from cdx_web_scan.intake.async_engine import AsyncIntakeEngine
+
+    # Accepts connections but never answers.
+    listener = socket.create_server(("127.0.0.1", 0))
+    accepted = []
+    acceptor = threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True)
+    acceptor.start()
+    engine = AsyncIntakeEngine(read_timeout=60).start()
+    try:
+        future = engine.submit(f"http://127.0.0.1:{listener.getsockname()[1]}/intake", {"barcodes": []})
+        engine.stop(timeout=5)
+        assert future.cancelled()
+        assert not engine.running
+    finally:
+        acceptor.join(1)
+        for conn, _ in accepted:
+            conn.close()
+        listener.close()
+
+
+def test_dispatcher_sends_through_the_async_engine(app):
+    from cdx_web_scan import db
+    from cdx_web_scan.intake.dispatcher import IntakeDispatcher
+    from cdx_web_scan.intake.outbox import enqueue_batch
+    from cdx_web_scan.models import AwsIntakeCall, IntakeStatus
+
+    server = StubIntakeServer(latency_ms=10).start()
+    dispatcher = IntakeDispatcher(app)
+    try:
+        assert dispatcher.use_async
+        with app.app_context():
+            for n in range(20):
+                enqueue_batch([], [{"barcodes": [f"{n:012d}"]}], server.url)
+
+        assert dispatcher.dispatch_once(wait_for_sends=True) == 20
+        with app.app_context():
+            statuses = db.session.scalars(db.select(AwsIntakeCall.status)).all()
+        assert statuses == [IntakeStatus.success] * 20
+        assert server.connections <= app.config["INTAKE_POOL_SIZE"]
+        assert not dispatcher._inflight
+    finally:
+        dispatcher.stop()
+        server.stop()
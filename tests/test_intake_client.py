@@ -0,0 +1,37 @@
+from benchmarks.stub_intake import StubIntakeServer
+
+
+def test_pooled_client_reuses_connection_and_gzips(app):
+    from cdx_web_scan.intake.client import IntakeClient
+
+    server = StubIntakeServer().start()
+    client = IntakeClient(pool_size=2, gzip_requests=True, gzip_min_bytes=64)
+    try:
+        payload = {"barcodes": [f"{n:012d}" for n in range(50)]}
+        for _ in range(3):
+            resp = client.post_json(server.url, payload)
+            assert resp.status == 202
+        assert server.connections == 1
+        # The stub decoded gzip bodies, so every barcode was counted.
+        assert server.items == 150
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_pooled_client_reports_transport_errors(app):
+    from cdx_web_scan.intake.client import IntakeClient
+
+    resp = IntakeClient(connect_timeout=1).post_json("http://127.0.0.1:9/intake", {"barcodes": []})
+    assert resp.status == 0
+    assert resp.error
+
+
+def test_gzip_is_opt_in(app):
+    from cdx_web_scan.intake.async_engine import AsyncIntakeEngine
+    from cdx_web_scan.intake.client import IntakeClient, get_intake_client
+
+    # Only gzip-aware intake APIs accept compressed bodies.
+    assert app.config["INTAKE_GZIP_REQUESTS"] is False
+    assert not get_intake_client(app).gzip_requests
+    assert not IntakeClient().gzip_requests and not AsyncIntakeEngine().gzip_requests
@@ -0,0 +1,131 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from helpers import upc
+
+
+class _StubIntake(BaseHTTPRequestHandler):
+    received: list[dict] = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        _StubIntake.received.append(
+            {"body": json.loads(self.rfile.read(length)), "headers": dict(self.headers.items())}
+        )
+        payload = json.dumps({"intake_id": "abc-123"}).encode()
+        self.send_response(202)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def intake_url(app, monkeypatch):
+    _StubIntake.received = []
+    server = HTTPServer(("127.0.0.1", 0), _StubIntake)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}/prod/intake"
+    monkeypatch.setitem(app.config, "INTAKE_API_URL", url)
+    monkeypatch.setitem(app.config, "INTAKE_API_TOKEN", "secret")
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_batch_submit_enqueues_and_dispatcher_delivers(app, client, intake_url):
+    from cdx_web_scan import db
+    from cdx_web_scan.intake.dispatcher import IntakeDispatcher
+    from cdx_web_scan.models import AwsIntakeCall, IntakeStatus
+
+    client.post("/submit", data={"barcode": "012345678905", "source": "manual"})
+    resp = client.post("/batch/submit")
+    assert "Queued 1 item(s)" in resp.get_data(as_text=True)
+    assert _StubIntake.received == []
+
+    with app.app_context():
+        call = db.session.execute(db.select(AwsIntakeCall)).scalar_one()
+        assert call.status == IntakeStatus.pending
+        assert "Authorization" not in (call.request_headers or {})
+        call_id, batch_id = call.id, call.session_id
+
+    assert IntakeDispatcher(app).dispatch_once(wait_for_sends=True) == 1
+
+    with app.app_context():
+        call = db.session.get(AwsIntakeCall, call_id)
+        assert call.status == IntakeStatus.success
+        assert call.http_status == 202
+        assert call.correlation_id == "abc-123"
+        assert call.duration_ms is not None
+
+    sent = _StubIntake.received[0]
+    assert sent["body"]["barcodes"] == ["012345678905"]
+    # The default "full" payload keeps the original keys; no chunk envelope.
+    assert set(sent["body"]) == {"source", "submitted_at", "barcodes", "items"}
+    assert sent["headers"]["Authorization"] == "Bearer secret"
+    assert "0 items" in client.get("/batch").get_data(as_text=True)
+    assert "Submitted to intake" in client.get(f"/batch/submit/{batch_id}").get_data(as_text=True)
+
+
+def test_only_one_dispatcher_holds_the_lease(app):
+    from cdx_web_scan.intake.dispatcher import IntakeDispatcher
+
+    first, second = IntakeDispatcher(app), IntakeDispatcher(app)
+    with app.app_context():
+        assert first.acquire_lease()
+        assert not second.acquire_lease()
+        assert first.acquire_lease()
+
+
+def test_large_batch_is_split_into_chunk_calls(app, client, intake_url, monkeypatch):
+    from cdx_web_scan import db
+    from cdx_web_scan.intake.dispatcher import IntakeDispatcher
+    from cdx_web_scan.models import AwsIntakeCall, IntakeStatus
+
+    monkeypatch.setitem(app.config, "INTAKE_CHUNK_MAX_ITEMS", 4)
+    monkeypatch.setitem(app.config, "INTAKE_PAYLOAD_MODE", "compact")
+    for n in range(10):
+        client.post("/submit", data={"barcode": upc(n), "source": "manual"})
+    client.post("/batch/submit")
+
+    with app.app_context():
+        calls = db.session.execute(db.select(AwsIntakeCall)).scalars().all()
+        assert len(calls) == 3
+        assert len({c.idempotency_key for c in calls}) == 3
+
+    IntakeDispatcher(app).dispatch_once(wait_for_sends=True)
+    bodies = sorted((r["body"] for r in _StubIntake.received), key=lambda b: b["chunk"]["index"])
+    assert [len(b["items"]) for b in bodies] == [4, 4, 2]
+    assert {b["chunk"]["count"] for b in bodies} == {3} and len({b["batch_id"] for b in bodies}) == 1
+    assert all("barcodes" not in b for b in bodies)
+
+    with app.app_context():
+        statuses = db.session.execute(db.select(AwsIntakeCall.status)).scalars().all()
+        assert set(statuses) == {IntakeStatus.success}
+
+
+def test_chunks_respect_byte_budget(app):
+    from cdx_web_scan.intake.chunking import build_payloads
+
+    items = [{"code": f"{n:012d}", "source": "wedge", "title": "x" * 200} for n in range(20)]
+    payloads = build_payloads(items, "2026-01-01T00:00:00+00:00", max_items=100, max_bytes=2048)
+    assert len(payloads) > 1
+    assert all(len(json.dumps(p)) <= 2048 for p in payloads)
+    assert [i["code"] for p in payloads for i in p["items"]] == [i["code"] for i in items]
+
+
+def test_batches_are_not_chunked_by_default(app):
+    from cdx_web_scan.intake.chunking import build_payloads
+
+    assert not app.config["INTAKE_CHUNK_MAX_ITEMS"] and not app.config["INTAKE_CHUNK_MAX_BYTES"]
+    items = [{"code": f"{n:012d}", "source": "wedge", "title": "x" * 200} for n in range(500)]
+    payloads = build_payloads(items, "2026-01-01T00:00:00+00:00")
+    assert len(payloads) == 1
+    assert sorted(payloads[0]) == ["barcodes", "items", "source", "submitted_at"]
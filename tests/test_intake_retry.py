@@ -0,0 +1,61 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+
+def test_backoff_is_capped_and_honors_retry_after(app):
+    from cdx_web_scan.intake.retry import RetryPolicy
+
+    policy = RetryPolicy(max_attempts=5, base_seconds=2, max_delay_seconds=10)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rng = random.Random(7)
+
+    for attempt in range(1, 5):
+        delay = (policy.next_attempt_at(attempt, now, rng=rng) - now).total_seconds()
+        assert 0 <= delay <= min(10, 2 ** attempt)
+
+    delay = (policy.next_attempt_at(1, now, retry_after="120", rng=rng) - now).total_seconds()
+    assert 120 <= delay <= 122
+    http_date = "Thu, 01 Jan 2026 00:01:00 GMT"
+    assert policy.next_attempt_at(1, now, retry_after=http_date, rng=rng) >= now + timedelta(seconds=60)
+
+    assert policy.next_attempt_at(5, now) is None
+
+    # A huge attempt count (say, a raised INTAKE_RETRY_MAX_ATTEMPTS) stays at the cap;
+    # from_app makes base_seconds a float, which 2 ** 4999 would overflow.
+    assert 0 <= RetryPolicy(base_seconds=2.0, max_delay_seconds=10).backoff(5000, rng) <= 10
+
+
+def test_transient_failure_is_rescheduled_then_delivered(app):
+    from benchmarks.stub_intake import StubIntakeServer
+    from cdx_web_scan import db
+    from cdx_web_scan.intake.dispatcher import IntakeDispatcher
+    from cdx_web_scan.intake.outbox import enqueue_batch
+    from cdx_web_scan.models import AwsIntakeCall, IntakeStatus
+
+    server = StubIntakeServer(error_rate=1.0).start()
+    try:
+        with app.app_context():
+            _, calls = enqueue_batch([], [{"barcodes": ["012345678905"]}], server.url)
+            call_id = calls[0].id
+
+        dispatcher = IntakeDispatcher(app)
+        assert dispatcher.dispatch_once(wait_for_sends=True) == 1
+
+        with app.app_context():
+            call = db.session.get(AwsIntakeCall, call_id)
+            assert call.status == IntakeStatus.retrying
+            assert call.attempt == 2
+            assert call.http_status == 503
+            # The stub sent Retry-After: 1, so nothing is due yet.
+            assert dispatcher.dispatch_once(wait_for_sends=True) == 0
+            call.next_attempt_at = call.next_attempt_at - timedelta(minutes=5)
+            db.session.commit()
+
+        server.error_rate = 0
+        assert dispatcher.dispatch_once(wait_for_sends=True) == 1
+        with app.app_context():
+            call = db.session.get(AwsIntakeCall, call_id)
+            assert call.status == IntakeStatus.success
+            assert call.next_attempt_at is None
+    finally:
+        server.stop()
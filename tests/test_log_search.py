@@ -0,0 +1,108 @@
+import json
+from datetime import datetime, timedelta
+
+from cdx_web_scan import log_search
+
+START = datetime(2026, 10, 1, 8, 0, 0)
+
+
+def _write_text_log(path, first: int, count: int) -> None:
+    """One record per second from ``START + first`` seconds; every 100th is an ERROR with a traceback."""
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(first, first + count):
+            stamp = (START + timedelta(seconds=n)).strftime("%Y-%m-%d %H:%M:%S") + f",{n % 1000:03d}"
+            level = "ERROR" if n % 100 == 0 else "INFO"
+            f.write(f"{stamp} {level} : [IP: 10.0.0.{n % 7}] scan {n:012d} accepted\n")
+            if level == "ERROR":
+                f.write("Traceback (most recent call last):\n  ValueError: bad batch\n")
+
+
+def _iso(seconds: int) -> float:
+    return (START + timedelta(seconds=seconds)).timestamp()
+
+
+def test_time_window_reads_only_the_indexed_region(tmp_path):
+    path = tmp_path / "app.log"
+    _write_text_log(path, 0, 20000)
+    index = log_search.LogIndex(stride=4096)
+
+    result = log_search.search([str(path)], index, since=_iso(10000), until=_iso(10010))
+    texts = [r["text"] for r in result["results"]]
+    assert len(texts) == 10 and "scan 000000010009" in texts[0] and "scan 000000010000" in texts[-1]
+    # The ERROR record keeps its traceback lines.
+    assert texts[-1].endswith("ValueError: bad batch") and result["results"][-1]["level"] == "ERROR"
+    assert result["scanned_bytes"] < path.stat().st_size / 50
+
+
+def test_index_grows_with_the_file_and_follows_rotation(tmp_path):
+    path = tmp_path / "app.log"
+    _write_text_log(path, 0, 5000)
+    index = log_search.LogIndex(stride=4096)
+    log_search.search([str(path)], index, text="nothing")
+    (file_index,) = index._files.values()
+    sampled = len(file_index.offsets)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write((START + timedelta(seconds=6000)).strftime("%Y-%m-%d %H:%M:%S") + ",000 WARNING : late entry\n")
+    result = log_search.search([str(path)], index, levels={"WARNING"})
+    assert [r["text"].split(" : ")[1] for r in result["results"]] == ["late entry"]
+    assert len(file_index.offsets) in (sampled, sampled + 1) and file_index.indexed_to == path.stat().st_size
+
+    path.rename(tmp_path / "app.log.1")
+    _write_text_log(path, 7000, 10)
+    files = log_search.log_files(str(path), backup_count=5)
+    assert files == [str(path), str(tmp_path / "app.log.1")]
+    result = log_search.search(files, index, text="scan 000000000042")
+    assert [r["file"] for r in result["results"]] == ["app.log.1"]
+    assert file_index in index._files.values()  # Same inode, same index.
+
+
+def test_ip_level_and_limit_filters(tmp_path):
+    path = tmp_path / "app.log"
+    _write_text_log(path, 0, 3000)
+    index = log_search.LogIndex(stride=4096)
+
+    result = log_search.search([str(path)], index, client_ip="10.0.0.3", levels={"ERROR"})
+    numbers = [int(r["text"].split("scan ")[1][:12]) for r in result["results"]]
+    assert numbers and all(n % 7 == 3 and n % 100 == 0 for n in numbers)
+    assert numbers == sorted(numbers, reverse=True)
+
+    limited = log_search.search([str(path)], index, client_ip="10.0.0.3", limit=5)
+    assert len(limited["results"]) == 5 and limited["truncated"]
+    assert limited["results"][0]["text"].startswith("2026-10-01 08:49:5")
+
+
+def test_json_lines_and_the_endpoint(make_app, tmp_path):
+    app = make_app(LOG_FORMAT="json")
+    log = tmp_path / "test.log"
+    with open(log, "a", encoding="utf-8") as f:
+        for n in range(50):
+            ts = (START + timedelta(seconds=n)).astimezone().isoformat(timespec="milliseconds")
+            record = {"ts": ts, "level": "INFO", "message": f"intake {n}", "client_ip": f"192.0.2.{n % 2}"}
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    client = app.test_client()
+    resp = client.get("/get-log/search", query_string={"ip": "192.0.2.1", "since": START.isoformat(), "limit": 3})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert [json.loads(r["text"])["message"] for r in body["results"]] == ["intake 49", "intake 47", "intake 45"]
+    assert client.get("/get-log/search?q=intake+7").get_json()["results"][0]["client_ip"] == "192.0.2.1"
+
+    assert client.get("/get-log/search?level=LOUD").status_code == 400
+    assert client.get("/get-log/search?since=yesterday").status_code == 400
+
+
+def test_window_is_computed_under_the_index_lock(tmp_path, monkeypatch):
+    path = tmp_path / "app.log"
+    _write_text_log(path, 0, 2000)
+    index = log_search.LogIndex(stride=4096)
+    window = log_search.FileIndex.window
+    held = []
+
+    def checked(self, *args):
+        held.append(index._lock.locked())
+        return window(self, *args)
+
+    monkeypatch.setattr(log_search.FileIndex, "window", checked)
+    log_search.search([str(path)], index, since=_iso(100), until=_iso(110))
+    assert held == [True]
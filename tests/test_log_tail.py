@@ -0,0 +1,156 @@
+import os
+
+
+def _write(path, text):
+    with open(path, "ab") as f:
+        f.write(text.encode("utf-8"))
+
+
+def test_tail_lines_reads_backwards_across_blocks(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "".join(f"line {n}\n" for n in range(1000)))
+
+    text, offset, _ = log_tail.tail_lines(str(path), 3, block_size=16)
+
+    assert text == "line 997\nline 998\nline 999\n"
+    assert offset == path.stat().st_size
+
+
+def test_tail_lines_skips_partial_last_line(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "a\nb\nhalf-writ")
+
+    text, offset, _ = log_tail.tail_lines(str(path), 5)
+
+    assert text == "a\nb\n"
+    assert offset == 4
+
+
+def test_read_since_returns_only_new_complete_lines(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "one\n")
+    _, offset, inode = log_tail.tail_lines(str(path), 10)
+
+    _write(path, "two\nthr")
+    text, offset, reset, _ = log_tail.read_since(str(path), offset, inode)
+    assert (text, reset) == ("two\n", False)
+
+    _write(path, "ee\n")
+    text, offset, reset, _ = log_tail.read_since(str(path), offset, inode)
+    assert text == "three\n"
+    assert log_tail.read_since(str(path), offset, inode) == ("", offset, False, inode)
+
+
+def test_read_since_restarts_after_truncation(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "old line\n" * 10)
+    path.write_text("new\n")
+
+    text, offset, reset, _ = log_tail.read_since(str(path), 90)
+
+    assert (text, offset, reset) == ("new\n", 4, True)
+
+
+def test_read_since_restarts_after_rotation_to_a_longer_file(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "old\n")
+    _, offset, inode = log_tail.tail_lines(str(path), 10)
+    path.rename(tmp_path / "app.log.1")
+    # The new file is already past the old offset, so only the inode gives it away.
+    _write(path, "fresh one\nfresh two\n")
+
+    text, offset, reset, new_inode = log_tail.read_since(str(path), offset, inode)
+
+    assert (text, reset) == ("fresh one\nfresh two\n", True)
+    assert (offset, new_inode) == (path.stat().st_size, path.stat().st_ino)
+
+
+def test_follow_resets_when_the_file_is_rotated(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "old\n")
+    _, offset, inode = log_tail.tail_lines(str(path), 0)
+    path.rename(tmp_path / "app.log.1")
+    _write(path, "fresh\n")
+
+    events = list(log_tail.follow(str(path), offset, inode, poll_seconds=0, max_seconds=0.01))
+    new_inode = path.stat().st_ino
+
+    assert events[1] == f"event: reset\nid: {new_inode}:0\ndata: \n\n"
+    assert events[2] == f"id: {new_inode}:6\ndata: fresh\n\n"
+    # Last-Event-ID round-trips; a bare offset (older clients) still parses.
+    assert log_tail.parse_event_id(f"{new_inode}:6") == (new_inode, 6)
+    assert log_tail.parse_event_id("6") == (None, 6)
+
+
+def test_follow_emits_sse_events_with_offsets(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "x\ny\n")
+
+    events = list(log_tail.follow(str(path), 0, poll_seconds=0, max_seconds=0.01))
+
+    assert events[0].startswith("retry:")
+    assert f"id: {path.stat().st_ino}:4\ndata: x\ndata: y\n\n" in events
+
+
+def test_get_log_since_returns_increment(app, client):
+    log_file = app.config["CDX_WEB_SCAN_LOG_FILE"]
+    _write(log_file, "marker-one\n")
+
+    resp = client.get("/get-log")
+    assert resp.status_code == 200
+    assert "marker-one" in resp.get_data(as_text=True)
+    offset = int(resp.headers["X-Log-Offset"])
+
+    _write(log_file, "marker-two\n")
+    resp = client.get(f"/get-log?since={offset}")
+    body = resp.get_data(as_text=True)
+    assert "marker-two" in body
+    assert "marker-one" not in body
+    assert int(resp.headers["X-Log-Offset"]) > offset
+    assert resp.headers["X-Log-Inode"] == str(os.stat(log_file).st_ino)
+
+
+def test_read_since_hands_out_an_overlong_line_in_pieces(app, tmp_path):
+    from cdx_web_scan import log_tail
+
+    path = tmp_path / "app.log"
+    _write(path, "é" * 10 + "\n")  # 20 bytes of two-byte characters, then a newline
+
+    text, offset, _, _ = log_tail.read_since(str(path), 0, max_bytes=7)
+    assert (text, offset) == ("ééé", 6)  # Cut before the split character.
+    pieces = [text]
+    while offset < path.stat().st_size:
+        text, offset, _, _ = log_tail.read_since(str(path), offset, max_bytes=7)
+        pieces.append(text)
+    assert "".join(pieces) == "é" * 10 + "\n"
+
+
+def test_log_stream_is_opt_in_and_capped(app, client, monkeypatch):
+    log_file = app.config["CDX_WEB_SCAN_LOG_FILE"]
+    _write(log_file, "x\n")
+    assert client.get("/get-log/stream").status_code == 404
+    assert 'data-stream="off"' in client.get("/view-log").get_data(as_text=True)
+
+    monkeypatch.setitem(app.config, "LOG_STREAM_ENABLED", True)
+    monkeypatch.setitem(app.config, "LOG_STREAM_MAX_CONCURRENT", 1)
+    monkeypatch.setitem(app.config, "LOG_STREAM_MAX_SECONDS", 0)
+    first = client.get("/get-log/stream", buffered=False)
+    assert first.status_code == 200
+    assert client.get("/get-log/stream").status_code == 503
+    first.close()
+    with client.get("/get-log/stream") as again:
+        assert again.status_code == 200
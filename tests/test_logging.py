@@ -0,0 +1,90 @@
+import json
+import logging
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_json_records_carry_request_id_and_client_ip(make_app, tmp_path):
+    from cdx_web_scan import log_setup
+
+    app = make_app(LOG_FORMAT="json", LOG_REQUESTS=True)
+    client = app.test_client()
+    resp = client.get("/batch", headers={"X-Forwarded-For": "203.0.113.9, 10.0.0.1", "X-Request-ID": "req-123"})
+    assert resp.headers["X-Request-ID"] == "req-123"
+    generated = client.get("/nope").headers["X-Request-ID"]
+    assert len(generated) == 32
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("cdx_web_scan.test").exception("outside a request")
+    log_setup.flush()
+
+    records = _records(tmp_path / "test.log")
+    batch = next(r for r in records if r["message"].startswith("GET /batch"))
+    assert batch["request_id"] == "req-123" and batch["client_ip"] == "203.0.113.9"
+    assert batch["level"] == "INFO" and "-> 200" in batch["message"]
+    missing = [r for r in records if r.get("request_id") == generated]
+    assert any("404 Error" in r["message"] for r in missing)
+    failure = next(r for r in records if r["message"] == "outside a request")
+    assert "request_id" not in failure and "ValueError: boom" in failure["exc"]
+
+
+def test_text_format_prefixes_the_client_ip_once(make_app, tmp_path):
+    from cdx_web_scan import log_setup
+
+    app = make_app(LOG_REQUESTS=True)
+    app.test_client().get("/batch", headers={"X-Forwarded-For": "198.51.100.7"})
+    log_setup.flush()
+    line = next(l for l in (tmp_path / "test.log").read_text().splitlines() if "GET /batch" in l)
+    assert " INFO : [IP: 198.51.100.7] GET /batch -> 200 (" in line
+
+
+def test_handlers_in_two_processes_share_one_rotation(tmp_path):
+    from cdx_web_scan.log_setup import SharedRotatingFileHandler
+
+    path = tmp_path / "app.log"
+    # Two handlers on one file stand in for two worker processes.
+    first, second = (SharedRotatingFileHandler(str(path), max_bytes=200, backup_count=2) for _ in range(2))
+    logger = logging.getLogger("cdx_web_scan.test.rotation")
+    logger.propagate = False
+    for handler in (first, second):
+        handler.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        for n in range(40):
+            logger.addHandler(first if n % 2 else second)
+            logger.warning("record %03d %s", n, "x" * 20)
+            logger.handlers.clear()
+    finally:
+        first.close()
+        second.close()
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["app.log", "app.log.1", "app.log.2", "app.log.lock"]
+    kept = [line for name in ("app.log.2", "app.log.1", "app.log") for line in (tmp_path / name).read_text().splitlines()]
+    # Nothing lost or duplicated across rotations, and the newest records are in app.log.
+    numbers = [int(line.split()[1]) for line in kept]
+    assert numbers == list(range(numbers[0], 40))
+    assert all(p.stat().st_size <= 200 + 40 for p in tmp_path.glob("app.log*") if p.suffix != ".lock")
+
+
+def test_time_rotation_happens_once_per_period(tmp_path):
+    from cdx_web_scan.log_setup import SharedRotatingFileHandler
+
+    path = tmp_path / "app.log"
+    handler = SharedRotatingFileHandler(str(path), rotate_seconds=3600)
+    record = logging.makeLogRecord({"msg": "line"})
+    handler.emit(record)
+    period = handler._current_period()
+    assert (tmp_path / "app.log.lock").read_text() == str(period)
+
+    # As if this file (and the lock) were from the previous hour.
+    (tmp_path / "app.log.lock").write_text(str(period - 1))
+    handler._period = period - 1
+    handler.emit(record)
+    handler.emit(record)
+    handler.close()
+    assert (tmp_path / "app.log.1").read_text() == "line\n"
+    assert path.read_text() == "line\nline\n"
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+
+def _sample(body: str, name: str, **labels) -> float:
+    for line in body.splitlines():
+        if not line.startswith(name + "{") and not line.startswith(name + " "):
+            continue
+        if all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} {labels} not in output")
+
+
+def test_metrics_cover_routes_and_database(app, client):
+    client.get("/batch")
+    client.post("/submit", data={"barcode": "036000291452", "source": "manual"})
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert "# TYPE cdx_http_request_duration_seconds histogram" in body
+    assert _sample(body, "cdx_http_request_duration_seconds_count", route="/batch", method="GET", status="200") >= 1
+    assert _sample(body, "cdx_http_request_duration_seconds_bucket", route="/batch", le="+Inf") >= 1
+    # The scrape itself is in flight while the body is rendered.
+    assert _sample(body, "cdx_http_requests_in_flight", route="/metrics") == 1
+    assert _sample(body, "cdx_db_commit_seconds_count") >= 1
+    assert _sample(body, "cdx_db_statement_seconds_count", kind="write") >= 1
+
+
+def test_intake_calls_are_counted_by_status(app):
+    from cdx_web_scan import metrics
+    from cdx_web_scan.intake.client import IntakeResponse
+    from cdx_web_scan.intake.outbox import record_response
+    from cdx_web_scan.models import AwsIntakeCall
+
+    before = metrics.collect(metrics.REGISTRY, None)["cdx_intake_call_duration_seconds"].get(("503",))
+    record_response(AwsIntakeCall(idempotency_key="k", attempt=1), IntakeResponse(503, "", duration_ms=120))
+    after = metrics.collect(metrics.REGISTRY, None)["cdx_intake_call_duration_seconds"][("503",)]
+    assert after[-1] - (before[-1] if before else 0) == pytest.approx(0.12)
+
+
+def test_snapshots_from_other_workers_are_merged(app, tmp_path):
+    from cdx_web_scan import metrics
+
+    registry = metrics.Registry()
+    requests = registry.counter("t_requests_total", "", ("route",))
+    busy = registry.gauge("t_busy", "")
+    latency = registry.histogram("t_seconds", "", buckets=(0.1, 1.0))
+    requests.inc("/a")
+    latency.observe(0.05)
+
+    # A worker that has exited (its pid is gone) and one that is still running.
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    for pid in (dead.pid, os.getppid()):
+        snapshot = {"t_requests_total": [[["/a"], 2]], "t_busy": [[[], 1]], "t_seconds": [[[], [0, 1, 0, 0.5]]]}
+        (tmp_path / f"metrics-{pid}.json").write_text(json.dumps({"pid": pid, "metrics": snapshot}))
+
+    merged = metrics.collect(registry, tmp_path)
+    assert merged["t_requests_total"][("/a",)] == 5
+    assert merged["t_busy"][()] == 1  # only the live worker's gauge
+    assert merged["t_seconds"][()] == [1, 2, 0, 1.05]
+
+    text = metrics.render(registry, merged)
+    assert 't_seconds_bucket{le="0.1"} 1' in text
+    assert 't_seconds_bucket{le="1.0"} 3' in text
+    assert 't_seconds_bucket{le="+Inf"} 3' in text
+    assert "t_seconds_count 3" in text
+    assert re.search(r"^t_seconds_sum 1\.05", text, re.M)
+
+
+def test_flusher_writes_atomic_snapshot(app, tmp_path):
+    from cdx_web_scan import metrics
+
+    registry = metrics.Registry()
+    registry.counter("t_total", "").inc()
+    flusher = metrics._Flusher(registry, tmp_path, interval=60)
+    flusher.flush()
+    data = json.loads(flusher.path.read_text())
+    assert data == {"pid": os.getpid(), "process": registry.process, "metrics": {"t_total": [[[], 1]]}}
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # A later process with the same pid (a replaced worker) writes its own file.
+    successor = metrics._Flusher(metrics.Registry(), tmp_path, interval=60)
+    successor.registry.counter("t_total", "")
+    successor.flush()
+    assert successor.path != flusher.path
+    assert metrics.collect(successor.registry, tmp_path)["t_total"][()] == 1
+
+
+def test_each_run_gets_a_fresh_directory_and_finished_runs_are_removed(app, tmp_path, monkeypatch):
+    from cdx_web_scan import metrics
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    for name, pid in (("boot-old", dead.pid), ("boot-running", os.getppid())):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"metrics-{pid}-abcd1234.json").write_text("{}")
+    (tmp_path / f"metrics-{dead.pid}.json").write_text("{}")
+
+    monkeypatch.delenv(metrics.BOOT_ID_ENV, raising=False)
+    directory = metrics.boot_directory(tmp_path)
+    assert directory.name == f"boot-{os.environ[metrics.BOOT_ID_ENV]}"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["boot-running"]
+    # Workers forked from this process (same environment) share the directory.
+    assert metrics.boot_directory(tmp_path) == directory
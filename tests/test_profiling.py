@@ -0,0 +1,29 @@
+import json
+
+
+def test_profiles_split_time_and_list_slowest_requests(make_app, tmp_path):
+    # Profiling hooks are installed by create_app, so this uses its own app
+    # rather than the session-wide test app.
+    app = make_app(PROFILING_ENABLED=True, PROFILING_CPROFILE_RATE=1, PROFILING_SLOW_MS=0)
+    client = app.test_client()
+    client.get("/batch")
+    client.post("/submit", data={"barcode": "036000291452", "source": "manual"})
+    page = client.get("/debug/profile").get_data(as_text=True)
+
+    profiles = tmp_path / "profiles"
+    (log_file,) = profiles.glob("requests-*.jsonl")
+    records = {r["endpoint"]: r for r in map(json.loads, log_file.read_text().splitlines())}
+
+    batch = records["web_scan.batch_view"]
+    assert batch["status"] == 200 and batch["render_ms"] > 0 and batch["session_ms"] > 0
+    parts = batch["db_ms"] + batch["render_ms"] + batch["session_ms"] + batch["other_ms"]
+    assert abs(parts - batch["wall_ms"]) < 0.05
+
+    submit = records["web_scan.submit_barcode"]
+    assert submit["sql_count"] == len(submit["sql"]) > 0
+    assert any("INTO scan " in s for s in submit["sql"])
+    assert submit["db_ms"] > 0
+
+    # Every request was sampled and over the 0 ms threshold, so each kept a dump.
+    assert (profiles / submit["profile"]).is_file()
+    assert "Request Profiles" in page and "POST /submit" in page and submit["profile"] in page
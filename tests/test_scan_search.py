@@ -0,0 +1,117 @@
+from sqlalchemy import text
+
+from helpers import upc
+
+
+def test_search_ranks_prefix_matches_and_highlights(app, client, db):
+    from cdx_web_scan.models import Scan
+
+    client.post("/submit", data={"barcode": upc(1), "title": "Abbey Road <remaster>", "source": "manual"})
+    client.post("/submit", data={"barcode": upc(2), "title": "Road to Nowhere", "source": "manual"})
+    client.post("/submit", data={"barcode": upc(3), "source": "manual"})  # Untitled
+    scan = db.session.query(Scan).filter(Scan.notes == "Road to Nowhere").one()
+
+    body = client.get("/search?q=road").get_json()
+    assert [r["notes"] for r in body["results"]] == ["Abbey Road <remaster>", "Road to Nowhere"]
+    top = client.get("/search?q=abb").get_json()["results"][0]
+    assert top["notes_html"] == "<mark>Abbey</mark> Road &lt;remaster&gt;"
+    assert top["barcodes"][0]["value_raw"] == upc(1) and top["score"] > 0
+
+    # Every word must match; FTS5 syntax in the input is only text.
+    assert [r["notes"] for r in client.get("/search?q=road+nowh").get_json()["results"]] == ["Road to Nowhere"]
+    assert client.get('/search?q=notes:"road" OR -x').status_code == 200
+    assert client.get("/search?q=untitled").get_json()["results"] == []
+    assert client.get("/search?q=+--+").status_code == 400
+
+    # Deletes and edits reach the index through the triggers.
+    scan.notes = "Remain in Light"
+    db.session.commit()
+    assert [r["notes"] for r in client.get("/search?q=remain").get_json()["results"]] == ["Remain in Light"]
+    db.session.delete(scan)
+    db.session.commit()
+    assert client.get("/search?q=remain").get_json()["results"] == []
+
+
+def test_backfill_indexes_rows_written_before_the_index(app, db):
+    from cdx_web_scan.models import CaptureMethod, ScanSource
+    from cdx_web_scan.web_scan.scan_search import backfill_scan_search, search_scans
+    from cdx_web_scan.web_scan.scan_writer import PendingScan, write_scans_now
+
+    write_scans_now(
+        [
+            PendingScan(value=upc(n), symbology="UPC_A", source=ScanSource.scanner, capture_method=CaptureMethod.scanner, notes=f"Disc {n}")
+            for n in range(1, 26)
+        ]
+    )
+    assert len(search_scans("disc", limit=100)) == 25
+    # Simulate a database from before the index: empty it, then backfill in small batches.
+    db.session.execute(text("DELETE FROM scan_search"))
+    db.session.commit()
+    assert search_scans("disc") == []
+
+    assert backfill_scan_search(batch_size=7) == 25
+    assert backfill_scan_search(batch_size=7) == 0
+    assert len(search_scans("disc", limit=100)) == 25
+    assert app.test_cli_runner().invoke(args=["backfill-scan-search"]).output.strip() == "Indexed 0 scan(s)."
+
+
+def test_only_the_newest_matches_are_ranked(app, db):
+    from cdx_web_scan.models import CaptureMethod, ScanSource
+    from cdx_web_scan.web_scan.scan_search import search_scans
+    from cdx_web_scan.web_scan.scan_writer import PendingScan, write_scans_now
+
+    # The oldest scan is the best match, but falls outside a 5-row window.
+    titles = ["live live live"] + [f"live session {n}" for n in range(9)]
+    write_scans_now(
+        [
+            PendingScan(value=upc(n), symbology="UPC_A", source=ScanSource.scanner, capture_method=CaptureMethod.scanner, notes=title)
+            for n, title in enumerate(titles, 1)
+        ]
+    )
+    assert search_scans("live", limit=3, rank_window=100)[0]["notes"] == "live live live"
+    windowed = search_scans("live", limit=3, rank_window=5)
+    assert len(windowed) == 3 and "live live live" not in {r["notes"] for r in windowed}
+
+
+def test_results_survive_scan_rowids_being_renumbered(app, db):
+    from cdx_web_scan.models import CaptureMethod, ScanSource
+    from cdx_web_scan.web_scan.scan_search import search_scans
+    from cdx_web_scan.web_scan.scan_writer import PendingScan, write_scans_now
+
+    write_scans_now(
+        [
+            PendingScan(value=upc(n), symbology="UPC_A", source=ScanSource.scanner, capture_method=CaptureMethod.scanner, notes=title)
+            for n, title in enumerate(["Blue Train", "Kind of Blue", "Harvest"], 1)
+        ]
+    )
+    # What VACUUM may do to a table without an INTEGER PRIMARY KEY.
+    db.session.execute(text("UPDATE scan SET rowid = 1000 - rowid"))
+    db.session.commit()
+
+    assert {r["notes"] for r in search_scans("blue")} == {"Blue Train", "Kind of Blue"}
+    assert [r["notes"] for r in search_scans("harvest")] == ["Harvest"]
+
+
+def test_init_db_replaces_the_rowid_keyed_index(make_app):
+    from cdx_web_scan import db
+    from cdx_web_scan.web_scan.scan_search import backfill_scan_search, search_scans
+
+    app = make_app()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for name in ("scan_search_after_insert", "scan_search_after_delete", "scan_search_after_update"):
+                conn.exec_driver_sql(f"DROP TRIGGER {name}")
+            conn.exec_driver_sql("DROP TABLE scan_fts")
+            conn.exec_driver_sql("DROP TABLE scan_search")
+            conn.exec_driver_sql("CREATE VIRTUAL TABLE scan_fts USING fts5(notes, raw_input)")
+            conn.exec_driver_sql(
+                "CREATE TRIGGER scan_fts_after_insert AFTER INSERT ON scan BEGIN "
+                "INSERT INTO scan_fts(rowid, notes) VALUES (new.rowid, new.notes); END"
+            )
+        app.test_client().post("/submit", data={"barcode": upc(1), "title": "Pet Sounds", "source": "manual"})
+
+    assert app.test_cli_runner().invoke(args=["init-db"]).exit_code == 0
+    with app.app_context():
+        assert "content=" in db.session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'scan_fts'")).scalar()
+        assert backfill_scan_search() == 1
+        assert [r["notes"] for r in search_scans("pet")] == ["Pet Sounds"]
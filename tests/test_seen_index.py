@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+
+def test_bloom_filter_has_no_false_negatives(app):
+    from cdx_web_scan.web_scan.seen_index import BloomFilter
+
+    bloom = BloomFilter(1000, 0.01)
+    values = [f"{n:014d}" for n in range(1000)]
+    for v in values:
+        bloom.add(v)
+    assert all(v in bloom for v in values)
+    false_positives = sum(f"{n:014d}" in bloom for n in range(1000, 11000))
+    assert false_positives < 300
+
+
+def _pending(value, created_at=None):
+    from cdx_web_scan.models import CaptureMethod, ScanSource
+    from cdx_web_scan.web_scan.gtin import parse_gtin
+    from cdx_web_scan.web_scan.scan_writer import PendingScan
+
+    gtin = parse_gtin(value)
+    pending = PendingScan(
+        value=value,
+        symbology=gtin.symbology,
+        source=ScanSource.manual,
+        capture_method=CaptureMethod.manual,
+        value_normalized=gtin.gtin14,
+        checksum_valid=True,
+    )
+    if created_at is not None:
+        pending.created_at = created_at
+    return pending
+
+
+def test_never_seen_is_answered_without_sql_and_other_workers_are_synced(app, db):
+    from cdx_web_scan.web_scan.scan_writer import write_scans_now
+    from cdx_web_scan.web_scan.seen_index import SeenIndex
+
+    write_scans_now([_pending("012345678905")])
+    index = SeenIndex(app)
+    assert index.warm() == 1
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        assert index.last_seen("00036000291452") is None
+        assert statements == []
+        first = index.last_seen("00012345678905")
+        assert first is not None
+        assert index.last_seen("00012345678905") == first
+        assert len(statements) == 1
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    # Written by "another worker": invisible until the background rowid catch-up runs.
+    write_scans_now([_pending("036000291452")])
+    assert index.last_seen("00036000291452") is None
+    index.sync()
+    assert index.last_seen("00036000291452") is not None
+
+
+def test_background_thread_warms_and_syncs(app, db, monkeypatch):
+    import time
+
+    from cdx_web_scan.web_scan.scan_writer import write_scans_now
+    from cdx_web_scan.web_scan.seen_index import SeenIndex
+
+    monkeypatch.setitem(app.config, "SEEN_INDEX_SYNC_SECONDS", 0.05)
+    index = SeenIndex(app)
+    index.start()
+    try:
+        write_scans_now([_pending("036000291452")])
+        deadline = time.monotonic() + 5
+        while not (index.ready and "00036000291452" in index._bloom) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert index.last_seen("00036000291452") is not None
+    finally:
+        index.stop()
+
+
+def test_submit_shows_prior_scan_and_can_reject(app, client, monkeypatch):
+    from cdx_web_scan.models import utcnow
+    from cdx_web_scan.web_scan.scan_writer import write_scans_now
+
+    assert not app.config["SEEN_BEFORE_WINDOW_DAYS"]  # Opt-in.
+    monkeypatch.setitem(app.config, "SEEN_BEFORE_WINDOW_DAYS", 30)
+    with app.app_context():
+        write_scans_now([_pending("4006381333931", created_at=utcnow() - timedelta(days=2))])
+        write_scans_now([_pending("036000291452", created_at=utcnow() - timedelta(days=400))])
+
+    html = client.post("/submit", data={"barcode": "4006381333931", "source": "manual"}).get_data(as_text=True)
+    assert "Added to batch" in html
+    assert "Previously scanned" in html
+
+    # Outside the window: not flagged.
+    html = client.post("/submit", data={"barcode": "036000291452", "source": "manual"}).get_data(as_text=True)
+    assert "Previously scanned" not in html
+
+    monkeypatch.setitem(app.config, "SEEN_BEFORE_REJECT", True)
+    other = app.test_client()
+    html = other.post("/submit", data={"barcode": "4006381333931", "source": "manual"}).get_data(as_text=True)
+    assert "Already scanned: 4006381333931" in html
+    assert "Previously scanned" in html
+
+
+def test_sync_rewarms_after_the_newest_rows_are_deleted(app, db):
+    from sqlalchemy import delete
+
+    from cdx_web_scan.models import BarcodeCapture
+    from cdx_web_scan.web_scan.scan_writer import write_scans_now
+    from cdx_web_scan.web_scan.seen_index import SeenIndex
+
+    write_scans_now([_pending("012345678905")])
+    tail = _pending("4006381333931")
+    write_scans_now([tail])
+    index = SeenIndex(app)
+    assert index.warm() == 2
+
+    # SQLite hands the deleted tail's rowid to the next insert, below the high-water mark.
+    db.session.execute(delete(BarcodeCapture).where(BarcodeCapture.id == tail.barcode_id))
+    db.session.commit()
+    write_scans_now([_pending("036000291452")])
+    index.sync()
+    assert index.last_seen("00036000291452") is not None
+
+
+def test_sync_rebuilds_a_filter_that_outgrew_its_capacity(app, db, monkeypatch):
+    from cdx_web_scan.web_scan.scan_writer import write_scans_now
+    from cdx_web_scan.web_scan.seen_index import SeenIndex
+
+    monkeypatch.setitem(app.config, "SEEN_INDEX_CAPACITY", 1)
+    index = SeenIndex(app)
+    index.warm()
+    assert index._bloom.capacity == 1
+    write_scans_now([_pending("012345678905"), _pending("036000291452")])
+    index.sync()
+    index.sync()
+    assert index._bloom.capacity >= 4
+    assert index.last_seen("00036000291452") is not None
+
+
+def test_warm_refuses_rows_that_need_the_gtin_backfill(app, db):
+    from cdx_web_scan.web_scan.scan_writer import write_scans_now
+    from cdx_web_scan.web_scan.seen_index import SeenIndex
+
+    legacy = _pending("012345678905")
+    legacy.value_normalized = legacy.checksum_valid = None  # As captured before the GTIN engine.
+    write_scans_now([legacy])
+    with pytest.raises(RuntimeError, match="backfill-gtin"):
+        SeenIndex(app).warm()
+
+    result = app.test_cli_runner().invoke(args=["init-db"])
+    assert "normalized 1" in result.output
+    index = SeenIndex(app)
+    assert index.warm() == 1
+    assert index.last_seen("00012345678905") is not None
@@ -0,0 +1,46 @@
+def test_bulk_submit_validates_dedupes_and_inserts(app, client):
+    from cdx_web_scan import db
+    from cdx_web_scan.models import Scan
+
+    client.post("/submit", data={"barcode": "012345678905", "source": "manual"})
+    resp = client.post(
+        "/submit/bulk",
+        data={
+            "barcode": ["012345678905", "036000291452", "abc", "036000291452", "4006381333931"],
+            "source": "wedge",
+        },
+    )
+    html = resp.get_data(as_text=True)
+    assert resp.status_code == 200
+    assert "Added 2 of 5 scan(s) to batch" in html
+    assert "Already in batch" in html
+    assert "Duplicate in this scan burst" in html
+    assert "digits only" in html
+    # Both regions are delivered out-of-band in one response.
+    assert 'id="batch" hx-swap-oob="true"' in html
+    assert "3 items" in html
+
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(Scan)).scalar() == 3
+
+
+def test_bulk_submit_reports_rows_a_concurrent_request_added_first(app, client, monkeypatch):
+    import re
+
+    from cdx_web_scan.web_scan.batch_store import get_batch_store
+
+    client.post("/submit", data={"barcode": "012345678905", "source": "manual"})
+    with app.test_request_context():
+        store = get_batch_store()
+    # As if another request added the code after this one's duplicate check.
+    monkeypatch.setattr(store, "codes_present", lambda ref, codes: set())
+
+    html = client.post(
+        "/submit/bulk", data={"barcode": ["0360 0029 1452", "012345678905 "], "source": "wedge"}
+    ).get_data(as_text=True)
+    assert "Added 1 of 2 scan(s) to batch" in html
+    rows = re.findall(r'<span class="mono">(\d+)</span> ([^<\n]+)', html)
+    assert [(code, message.strip()) for code, message in rows] == [
+        ("036000291452", "Added to batch"),
+        ("012345678905", "Already in batch"),
+    ]
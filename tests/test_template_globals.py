@@ -0,0 +1,27 @@
+import os
+
+
+def test_template_globals_cached_until_recheck(app, tmp_path):
+    from cdx_web_scan.template_globals import TemplateGlobals
+
+    project = tmp_path / "pyproject.toml"
+    project.write_text('[project]\nversion = "1.0.0"\n')
+    asset = tmp_path / "app.js"
+    asset.write_text("")
+    os.utime(asset, (1000, 1000))
+
+    cached = TemplateGlobals(project_file=project, static_dir=tmp_path, asset_files=("app.js",))
+    watched = TemplateGlobals(project_file=project, static_dir=tmp_path, asset_files=("app.js",), recheck_seconds=1e-9)
+    assert cached.get() == {"version": "1.0.0", "asset_rev": 1000}
+
+    project.write_text('[project]\nversion = "1.0.1"\n')
+    os.utime(project, (2000, 2000))
+    os.utime(asset, (3000, 3000))
+
+    assert cached.get() == {"version": "1.0.0", "asset_rev": 1000}
+    assert watched.get() == {"version": "1.0.1", "asset_rev": 3000}
+
+
+def test_pages_render_version(client):
+    resp = client.get("/")
+    assert b"Version: " in resp.data